@@ -1,10 +1,29 @@
 from flask import (
-    Flask, render_template, redirect, request, url_for, g, make_response
+    Flask, render_template, redirect, request, url_for, g, make_response,
+    jsonify, stream_template
 )
+from markupsafe import Markup, escape
+from . import autocompletion
 from . import base_de_donnees
+from . import cache
+from . import coherence
+from . import compression
+from . import gel
+from . import images
+from . import instrumentation
+from . import jetons
+from . import maintenance
+from . import migrations
+from . import taches
+from . import transfert
+import importlib
 import os
 import hashlib
+import threading
+import time
 import uuid
+import click
+from datetime import datetime, timezone
 from functools import wraps
 from dotenv import load_dotenv
 
@@ -17,6 +36,135 @@ if not SECRET:
     raise RuntimeError("La variable SECRET_KEY n'est pas définie !")
 app.secret_key = SECRET
 
+app.config.from_mapping(
+    BD_TAILLE_POOL=int(os.getenv("BD_TAILLE_POOL", 5)),
+    BD_ECRIVAIN=os.getenv("BD_ECRIVAIN") == "1",
+    BD_ECRIVAIN_LATENCE_MS=float(os.getenv("BD_ECRIVAIN_LATENCE_MS", 2)),
+    BD_ECRIVAIN_LOT=int(os.getenv("BD_ECRIVAIN_LOT", 100)),
+    CACHE_SESSIONS_TAILLE=int(os.getenv("CACHE_SESSIONS_TAILLE", 10000)),
+    CACHE_SESSIONS_TTL=float(os.getenv("CACHE_SESSIONS_TTL", 60)),
+    CACHE_PAGES_TAILLE=int(os.getenv("CACHE_PAGES_TAILLE", 500)),
+    CACHE_AUTEURS_TAILLE=int(os.getenv("CACHE_AUTEURS_TAILLE", 1000)),
+    CACHE_RECHERCHES_TAILLE=int(os.getenv("CACHE_RECHERCHES_TAILLE", 1000)),
+    CACHE_RECHERCHES_OCTETS=int(os.getenv("CACHE_RECHERCHES_OCTETS",
+                                          16 * 1024 * 1024)),
+    CACHE_COMPRESSIONS_TAILLE=int(os.getenv("CACHE_COMPRESSIONS_TAILLE",
+                                            1000)),
+    AUTOCOMPLETION=os.getenv("AUTOCOMPLETION", "1") == "1",
+    # Recherches simultanées par processus au-delà desquelles on répond 503,
+    # et temps maximal d'une recherche dans SQLite
+    RECHERCHE_CONCURRENCE=int(os.getenv("RECHERCHE_CONCURRENCE", 4)),
+    RECHERCHE_DELAI_MS=float(os.getenv("RECHERCHE_DELAI_MS", 500)),
+    RECHERCHE_RETRY_AFTER=int(os.getenv("RECHERCHE_RETRY_AFTER", 1)),
+    # Caches tenus à jour des écritures des autres processus
+    COHERENCE=os.getenv("COHERENCE", "1") == "1",
+    COMPRESSION_SEUIL=int(os.getenv("COMPRESSION_SEUIL", 1024)),
+    # « bd » : sessions en base ; « jeton » : jeton signé sans accès à la base
+    MODE_SESSION=os.getenv("MODE_SESSION", "bd"),
+    SESSION_DUREE=int(os.getenv("SESSION_DUREE",
+                                base_de_donnees.DUREE_SESSION)),
+    TACHES_PLANIFIEES=os.getenv("TACHES_PLANIFIEES", "1") == "1",
+    SESSIONS_PURGE_INTERVALLE=int(os.getenv("SESSIONS_PURGE_INTERVALLE",
+                                            3600)),
+    SESSIONS_PURGE_LOT=int(os.getenv("SESSIONS_PURGE_LOT", 500)),
+    # Heure (locale) de la maintenance quotidienne ; vide pour la désactiver
+    MAINTENANCE_HEURE=(int(os.getenv("MAINTENANCE_HEURE", 4))
+                       if os.getenv("MAINTENANCE_HEURE", "4") else None),
+    MAINTENANCE_MINUTE=int(os.getenv("MAINTENANCE_MINUTE", 30)),
+    INSTRUMENTATION_SQL=os.getenv("INSTRUMENTATION_SQL") == "1",
+    INSTRUMENTATION_SEUIL_LENT_MS=float(
+        os.getenv("INSTRUMENTATION_SEUIL_LENT_MS", 100)),
+    INSTRUMENTATION_JOURNAL=os.getenv("INSTRUMENTATION_JOURNAL"),
+)
+base_de_donnees.configurer_pool(taille=app.config["BD_TAILLE_POOL"])
+migrations.migrer()
+if app.config["BD_ECRIVAIN"]:
+    base_de_donnees.configurer_ecrivain(
+        latence=app.config["BD_ECRIVAIN_LATENCE_MS"] / 1000,
+        taille_lot=app.config["BD_ECRIVAIN_LOT"])
+cache.sessions.configurer(taille_max=app.config["CACHE_SESSIONS_TAILLE"],
+                          ttl=app.config["CACHE_SESSIONS_TTL"])
+cache.pages.configurer(taille_max=app.config["CACHE_PAGES_TAILLE"])
+cache.auteurs.configurer(taille_max=app.config["CACHE_AUTEURS_TAILLE"])
+cache.auteurs_articles.configurer(
+    taille_max=app.config["CACHE_AUTEURS_TAILLE"])
+cache.recherches.configurer(
+    taille_max=app.config["CACHE_RECHERCHES_TAILLE"],
+    octets_max=app.config["CACHE_RECHERCHES_OCTETS"])
+cache.compressions.configurer(
+    taille_max=app.config["CACHE_COMPRESSIONS_TAILLE"])
+if app.config["INSTRUMENTATION_SQL"]:
+    instrumentation.activer(
+        app,
+        seuil_lent=app.config["INSTRUMENTATION_SEUIL_LENT_MS"] / 1000,
+        fichier_journal=app.config["INSTRUMENTATION_JOURNAL"])
+if app.config["MODE_SESSION"] == "jeton" or app.config["AUTOCOMPLETION"]:
+    _database = base_de_donnees.Database()
+    try:
+        if app.config["MODE_SESSION"] == "jeton":
+            jetons.charger(_database)
+        if app.config["AUTOCOMPLETION"]:
+            autocompletion.construire(_database)
+    finally:
+        _database.deconnecter()
+if app.config["TACHES_PLANIFIEES"]:
+    # À la première requête servie, et non à l'import : ni les commandes
+    # flask ni les processus de rendu de geler ne les démarrent
+    @app.before_request
+    def demarrer_taches():
+        taches.demarrer(app)
+
+
+_verrou_autocompletion = threading.Lock()
+_autocompletion_en_attente = threading.Event()
+
+
+def _rafraichir_autocompletion():
+    # Hors de la requête ; une mise à jour à la fois. Les écritures
+    # arrivées pendant qu'une mise à jour attend son tour sont lues par
+    # elle : une rafale d'écritures ne coûte qu'une ou deux mises à jour
+    if _autocompletion_en_attente.is_set():
+        return
+    _autocompletion_en_attente.set()
+
+    def rafraichir():
+        with _verrou_autocompletion:
+            _autocompletion_en_attente.clear()
+            database = base_de_donnees.Database()
+            try:
+                autocompletion.rafraichir(database)
+            finally:
+                database.deconnecter()
+    threading.Thread(target=rafraichir, daemon=True).start()
+
+
+def _charger_revocations():
+    database = base_de_donnees.Database()
+    try:
+        jetons.charger(database)
+    finally:
+        database.deconnecter()
+
+
+if app.config["COHERENCE"]:
+    coherence.abonner("articles", cache.article_modifie)
+    coherence.abonner("utilisateurs", cache.auteur_modifie,
+                      cache.sessions.vider)
+    coherence.abonner("sessions", cache.sessions.vider)
+    if app.config["AUTOCOMPLETION"]:
+        coherence.abonner("articles", _rafraichir_autocompletion)
+    if app.config["MODE_SESSION"] == "jeton":
+        coherence.abonner("revocations", _charger_revocations)
+    coherence.verifier()
+
+    @app.before_request
+    def verifier_coherence():
+        coherence.verifier()
+
+
+_recherches = threading.BoundedSemaphore(app.config["RECHERCHE_CONCURRENCE"])
+_verrou_recherches = threading.Lock()
+_stats_recherches = {"executees": 0, "refusees": 0, "delais_depasses": 0}
 
 
 def get_db():
@@ -33,37 +181,276 @@ def close_connection(exception):
         db.deconnecter()
 
 
+@app.template_filter("surligner")
+def surligner(extrait):
+    # Échapper l'extrait avant d'y insérer les balises de surlignage
+    return (escape(extrait)
+            .replace(base_de_donnees.DEBUT_SURLIGNAGE, Markup("<mark>"))
+            .replace(base_de_donnees.FIN_SURLIGNAGE, Markup("</mark>")))
+
+
+def utilisateur_courant():
+    """
+    Retourne le username de la session de la requête courante (ou None).
+    Le résultat est mémorisé le temps de la requête.
+    """
+    if "_utilisateur" not in g:
+        id_session = request.cookies.get("id_session")
+        duree = app.config["SESSION_DUREE"]
+        if not id_session:
+            g._utilisateur = None
+        elif app.config["MODE_SESSION"] == "jeton":
+            g._utilisateur = None
+            jeton = jetons.lire_jeton(app.secret_key, id_session, duree)
+            if jeton is not None:
+                g._utilisateur, emis_a, identifiant = jeton
+                # Expiration glissante : nouveau jeton à mi-parcours, avec
+                # le même identifiant (la déconnexion révoque les deux)
+                if time.time() - emis_a > duree / 2:
+                    g._nouveau_jeton = jetons.creer_jeton(
+                        app.secret_key, g._utilisateur, identifiant)
+        else:
+            g._utilisateur = get_db().get_session(id_session, duree)
+    return g._utilisateur
+
+
+@app.after_request
+def renouveler_jeton(response):
+    nouveau_jeton = g.pop("_nouveau_jeton", None)
+    if nouveau_jeton is not None:
+        response.set_cookie("id_session", nouveau_jeton)
+    return response
+
+
 @app.context_processor
 def inject_user():
-    id_session = request.cookies.get("id_session")
-    username = get_db().get_session(id_session) if id_session else None
+    username = utilisateur_courant()
     return dict(logged_in=(username is not None), current_user=username)
 
 
+def page_en_cache(cle, lire_version, rendre, introuvable=None,
+                  expire_a=None):
+    """
+    Répond avec la page en cache pour `cle`, sous la version (ETag) et la
+    date de modification gardées avec elle : ni la page ni sa version ne
+    sont lues en base. Sinon, lire_version() retourne (version,
+    derniere_modification) et la page rendue par rendre() est mise en
+    cache. Le menu dépend de la connexion : la clé en tient compte.
+    lire_version() et rendre() peuvent retourner None (page introuvable) :
+    la réponse est alors `introuvable`.
+    """
+    cle = cle + (utilisateur_courant() is not None,)
+    entree = cache.pages.get(cle)
+    if entree is not None:
+        version, derniere_modification, page = entree
+        return reponse_conditionnelle(version, derniere_modification,
+                                      lambda: page)
+    version_articles = cache.version_articles()
+    version_auteurs = cache.version_auteurs()
+    lue = lire_version()
+    if lue is None:
+        return introuvable
+    version, derniere_modification = lue
+
+    def produire():
+        page = rendre()
+        if page is None:
+            return introuvable
+        cache.definir_page(cle, (version, derniere_modification, page),
+                           version_articles, expire_a, version_auteurs)
+        return page
+    return reponse_conditionnelle(version, derniere_modification, produire)
+
+
+def date_bd(texte):
+    """
+    Convertit une date DATETIME('now') de SQLite (UTC) en datetime.
+    """
+    return datetime.fromisoformat(texte).replace(tzinfo=timezone.utc)
+
+
+def reponse_conditionnelle(version, derniere_modification, produire):
+    """
+    Répond 304 sans appeler produire() si le client possède déjà cette
+    `version` de la page (If-None-Match, à défaut If-Modified-Since).
+    Sinon, la réponse de produire() reçoit l'ETag et le Last-Modified,
+    et est compressée une fois par version (voir compression.py).
+    Le menu dépend de la connexion : l'ETag en tient compte.
+    """
+    version = version + (utilisateur_courant() is not None,)
+    etag = hashlib.sha256(repr(version).encode("utf-8")).hexdigest()[:32]
+
+    def valider(response):
+        response.set_etag(etag)
+        response.last_modified = derniere_modification
+        # Toujours revalider : la page peut changer à tout moment
+        response.cache_control.no_cache = True
+        response.vary.add("Cookie")
+        return response
+
+    response = valider(make_response(""))
+    # Le client peut détenir une variante compressée
+    for variante in compression.etags_variantes(etag):
+        if request.if_none_match.contains(variante):
+            response.set_etag(variante)
+            break
+    response = response.make_conditional(request)
+    if response.status_code == 304:
+        return response
+    response = make_response(produire())
+    if response.status_code == 200:
+        valider(response)
+    return compression.compresser_reponse(
+        response, request, etag, app.config["COMPRESSION_SEUIL"])
+
+
 @app.route("/")
 def page_acceuil():
-    cinq_articles = get_db().get_derniers_articles()
-    return render_template("index.html", cinq_articles=cinq_articles)
+    def rendre():
+        cinq_articles = get_db().get_derniers_articles()
+        return render_template("index.html", cinq_articles=cinq_articles)
+
+    def lire_version():
+        # La sélection dépend de DATE('now') : la page change aussi à
+        # minuit, et ne reste pas en cache au-delà
+        generation, date_modification = (
+            get_db().get_generations()["articles"])
+        aujourd_hui = datetime.now(timezone.utc).replace(
+            hour=0, minute=0, second=0, microsecond=0)
+        return (("accueil", generation, aujourd_hui.date().isoformat()),
+                max(date_bd(date_modification), aujourd_hui))
+    return page_en_cache(("accueil",), lire_version, rendre,
+                         expire_a=cache.prochain_minuit())
+
+
+def rechercher_limite(recherche, pagination):
+    """
+    Fait la recherche si moins de RECHERCHE_CONCURRENCE recherches sont en
+    cours. Les recherches coûteuses ne doivent pas occuper tous les fils :
+    au-delà de la limite, retourne None tout de suite.
+
+    Raises:
+        base_de_donnees.DelaiDepasse: La recherche a dépassé
+            RECHERCHE_DELAI_MS.
+    """
+    if not _recherches.acquire(blocking=False):
+        with _verrou_recherches:
+            _stats_recherches["refusees"] += 1
+        return None
+    try:
+        page = get_db().rechercher_article(
+            recherche, **pagination,
+            delai=app.config["RECHERCHE_DELAI_MS"] / 1000)
+    except base_de_donnees.DelaiDepasse:
+        with _verrou_recherches:
+            _stats_recherches["delais_depasses"] += 1
+        raise
+    finally:
+        _recherches.release()
+    with _verrou_recherches:
+        _stats_recherches["executees"] += 1
+    return page
 
 
 @app.route("/recherche", methods=["GET", "POST"])
 def rechercher():
     recherche = request.args.get('q', '')
-    articles = []
-    if recherche:
-        articles = get_db().rechercher_article(recherche)
-    return render_template("/recherche.html",
-                           articles=articles, recherche=recherche)
+
+    # Recherche sans mot assez long : rien à chercher
+    trop_courte = bool(recherche) and (
+        base_de_donnees.requete_fts(recherche) is None)
+
+    def rendre():
+        page = {"articles": [], "suivant": None, "precedent": None}
+        if recherche and not trop_courte:
+            pagination = {
+                "apres": request.args.get("apres"),
+                "avant": request.args.get("avant"),
+                "limite": request.args.get("taille",
+                                           base_de_donnees.TAILLE_PAGE)}
+            # Déjà calculée : ni base ni place parmi les recherches en cours
+            try:
+                page = (base_de_donnees.recherche_en_cache(recherche,
+                                                           **pagination)
+                        or rechercher_limite(recherche, pagination))
+            except base_de_donnees.DelaiDepasse:
+                return (
+                    "La recherche a pris trop de temps. Précisez-la (mots "
+                    "plus longs ou plus nombreux) ou réessayez plus tard.",
+                    503, {"Retry-After": app.config["RECHERCHE_RETRY_AFTER"]})
+            if page is None:
+                return (
+                    "Trop de recherches en cours, réessayez dans un instant.",
+                    503, {"Retry-After": app.config["RECHERCHE_RETRY_AFTER"]})
+        return render_template(
+            "/recherche.html", articles=page["articles"], page=page,
+            recherche=recherche, trop_courte=trop_courte,
+            longueur_min=base_de_donnees.LONGUEUR_RECHERCHE_MIN)
+    if request.method != "GET":
+        return rendre()
+    generation, date_modification = get_db().get_generations()["articles"]
+    return reponse_conditionnelle(
+        ("recherche", generation, sorted(request.args.items(multi=True))),
+        date_bd(date_modification), rendre)
+
+
+@app.route("/autocompletion")
+def completer_titres():
+    try:
+        limite = min(max(int(request.args.get("limite", 10)), 1), 50)
+    except ValueError:
+        limite = 10
+    return jsonify([
+        {"identifiant": identifiant, "titre": titre,
+         "date_publication": date_publication,
+         "url": url_for("page_article", identifiant=identifiant)}
+        for identifiant, titre, date_publication
+        in autocompletion.completer(request.args.get("q", ""), limite)])
 
 
 @app.route("/article/<identifiant>")
 def page_article(identifiant):
-    article = get_db().get_article(identifiant)
-    if article is None:
-        return "Article non trouvé", 404
-    # Récupérer info auteur
-    auteur = get_db().get_info_utilisateurs(article["auteur"])
-    return render_template("article.html", article=article, auteur=auteur)
+    def rendre():
+        # L'article, et le résumé de son auteur s'il n'est pas en cache
+        resultat = get_db().get_article_et_auteur(identifiant)
+        if resultat is None:
+            return None
+        article, auteur = resultat
+        return render_template("article.html", article=article,
+                               auteur=auteur)
+
+    def lire_version():
+        version = get_db().get_version_article(identifiant)
+        if version is None:
+            return None
+        revision, generation_utilisateurs, date_modification = version
+        return (("article", identifiant, revision, generation_utilisateurs),
+                date_bd(date_modification))
+    return page_en_cache(("article", identifiant), lire_version, rendre,
+                         introuvable=("Article non trouvé", 404))
+
+
+@app.route("/photo/<username>")
+@app.route("/photo/<username>/miniature", defaults={"miniature": True})
+def photo_profil(username, miniature=False):
+    photo = get_db().get_photo_profil(username, miniature)
+    if photo is None:
+        return "Photo non trouvée", 404
+    response = make_response(photo["donnees"])
+    response.headers["Content-Type"] = photo["type"]
+    # Les photos sont rangées par hash de leur contenu
+    response.set_etag(photo["hash"])
+    if request.args.get("v") == photo["version"]:
+        # L'URL porte le hash de la photo : une nouvelle photo aura une
+        # autre URL, celle-ci ne change plus
+        response.cache_control.public = True
+        response.cache_control.max_age = 31536000
+        response.cache_control.immutable = True
+    else:
+        # Sans version (ou avec une ancienne), revalider à chaque fois
+        response.cache_control.no_cache = True
+    # Répond 304 si le navigateur possède déjà cette version
+    return response.make_conditional(request)
 
 
 # Page de connexion
@@ -95,8 +482,12 @@ def admin():
             str(password + salt).encode("utf-8")
         ).hexdigest()
         if password_hash == user[1]:
-            id_session = uuid.uuid4().hex
-            get_db().save_session(id_session, username)
+            if app.config["MODE_SESSION"] == "jeton":
+                id_session = jetons.creer_jeton(app.secret_key, username)
+            else:
+                id_session = uuid.uuid4().hex
+                get_db().save_session(id_session, username,
+                                      app.config["SESSION_DUREE"])
             # cookie session
             response = make_response(redirect(url_for("page_articles")))
             response.set_cookie("id_session", id_session)
@@ -113,8 +504,7 @@ def admin():
 def authentication_required(f):
     @wraps(f)
     def decorated_function(*args, **kwargs):
-        id_session = request.cookies.get("id_session")
-        if not id_session or get_db().get_session(id_session) is None:
+        if utilisateur_courant() is None:
             # flash("Vous devez être connecté pour accéder à cette page.")
             return redirect(url_for("admin"))
         return f(*args, **kwargs)
@@ -126,8 +516,13 @@ def authentication_required(f):
 @authentication_required
 def page_articles():
     message = request.args.get("message")
-    return render_template("/liste-articles.html",
-                           articles=get_db().get_articles(), message=message)
+    page = get_db().parcourir_articles(
+        apres=request.args.get("apres"),
+        avant=request.args.get("avant"),
+        limite=request.args.get("taille", base_de_donnees.TAILLE_PAGE))
+    # Les articles sont envoyés au fur et à mesure de leur lecture
+    return stream_template("/liste-articles.html", articles=page["articles"],
+                           page=page, message=message)
 
 
 # Modiifer un article
@@ -197,8 +592,7 @@ def page_ajout_admin():
                                    message=message)
 
         # Auteur selon session
-        id_session = request.cookies.get("id_session")
-        auteur = get_db().get_session(id_session)
+        auteur = utilisateur_courant()
 
         # Ajouter l'article
         get_db().ajout_article(titre, identifiant, auteur,
@@ -222,8 +616,8 @@ def supprimer_article(identifiant):
 @app.route("/utilisateurs")
 @authentication_required
 def page_utilisateurs():
-    utilisateurs = get_db().get_utilisateurs()
-    return render_template("utilisateurs.html", utilisateurs=utilisateurs)
+    utilisateurs = get_db().parcourir_utilisateurs()
+    return stream_template("utilisateurs.html", utilisateurs=utilisateurs)
 
 
 @app.route("/changer_etat_utilisateur/<username>", methods=["POST"])
@@ -235,6 +629,10 @@ def changer_etat_utilisateur(username):
     except (ValueError, TypeError):
         nouvel_etat = 1
     get_db().changer_etat_utilisateur(username, nouvel_etat)
+    if nouvel_etat != 1:
+        # Les jetons déjà émis ne passent plus par la base
+        jetons.revoquer_utilisateur(get_db(), username,
+                                    app.config["SESSION_DUREE"])
     return redirect(url_for("page_utilisateurs"))
 
 
@@ -247,14 +645,16 @@ def page_ajout_utilisateur():
         prenom = request.form.get("prenom").title()
         nom = request.form.get("nom").title()
         photo_fichier = request.files.get("photo_profil")
-        # Gérer photo
+        # Gérer photo : validée, réduite et accompagnée d'une miniature
         if photo_fichier and photo_fichier.filename != "":
-            photo_profil = photo_fichier.read()
+            try:
+                photo_profil = images.preparer(
+                    photo_fichier.read(images.OCTETS_MAX + 1))
+            except images.ImageInvalide as e:
+                return render_template("form-utilisateurs.html",
+                                       message=f"Photo refusée : {e}"), 400
         else:
-            photo_par_defaut = f"""{os.path.dirname(os.path.abspath(__file__))}
-            /static/robot.jpeg"""
-            with open(photo_par_defaut, "rb") as fichier_photo:
-                photo_profil = fichier_photo.read()
+            photo_profil = images.photo_par_defaut()
 
         # Gérer mot de passe
         salt = uuid.uuid4().hex
@@ -271,12 +671,48 @@ def page_ajout_utilisateur():
     return render_template("form-utilisateurs.html")
 
 
+@app.route("/admin/statistiques")
+@authentication_required
+def statistiques():
+    ecrivain = base_de_donnees.get_ecrivain()
+    return jsonify({
+        "pool": base_de_donnees.get_pool().statistiques(),
+        "cache_sessions": cache.sessions.statistiques(),
+        "cache_pages": cache.pages.statistiques(),
+        "cache_auteurs": cache.auteurs.statistiques(),
+        "cache_auteurs_articles": cache.auteurs_articles.statistiques(),
+        "cache_recherches": cache.recherches.statistiques(),
+        "compression": compression.statistiques(),
+        "jetons": jetons.statistiques(),
+        "autocompletion": autocompletion.statistiques(),
+        "recherches": dict(_stats_recherches,
+                           limite=app.config["RECHERCHE_CONCURRENCE"]),
+        "coherence": (coherence.statistiques()
+                      if app.config["COHERENCE"] else None),
+        "ecrivain": ecrivain.statistiques() if ecrivain else None,
+    })
+
+
+@app.route("/admin/sql")
+@authentication_required
+def statistiques_sql():
+    if not app.config["INSTRUMENTATION_SQL"]:
+        return "Instrumentation désactivée (INSTRUMENTATION_SQL=1)", 404
+    return jsonify(instrumentation.statistiques())
+
+
 @app.route("/logout")
 def logout():
     # Récupérer l'identifiant de session depuis le cookie
     id_session = request.cookies.get("id_session")
     if id_session:
-        get_db().delete_session(id_session)
+        if app.config["MODE_SESSION"] == "jeton":
+            jetons.revoquer_jeton(get_db(), app.secret_key, id_session,
+                                  app.config["SESSION_DUREE"])
+            g.pop("_nouveau_jeton", None)
+        else:
+            get_db().delete_session(id_session)
+        g.pop("_utilisateur", None)
     # Créer une réponse de redirection
     response = make_response(redirect("/"))
     # Supprimer le cookie "id_session"
@@ -284,5 +720,216 @@ def logout():
     return response
 
 
+@app.cli.command("reconstruire-recherche")
+def reconstruire_recherche():
+    """Construit l'index de recherche plein texte des articles."""
+    nombre = base_de_donnees.reconstruire_index_recherche()
+    print(f"{nombre} article(s) indexé(s).")
+
+
+class GroupeDiffere(click.Group):
+    """
+    Groupe de commandes importé à sa première utilisation (module.attribut,
+    relatif au paquet) : l'application ne dépend pas de ce module.
+    """
+
+    def __init__(self, name, module, attribut, **kwargs):
+        super().__init__(name, **kwargs)
+        self._module = module
+        self._attribut = attribut
+
+    def _groupe(self):
+        module = importlib.import_module(self._module, __package__)
+        return getattr(module, self._attribut)
+
+    def list_commands(self, ctx):
+        return self._groupe().list_commands(ctx)
+
+    def get_command(self, ctx, cmd_name):
+        return self._groupe().get_command(ctx, cmd_name)
+
+
+# Mesures de charge : benchmark.charge dépend de modules propres à Unix
+# et du serveur de développement de werkzeug
+app.cli.add_command(GroupeDiffere(
+    "bench", ".benchmark.cli", "bench",
+    help="Base synthétique et mesures de charge."))
+
+
+@app.cli.command("migrer")
+@click.option("--cible", type=int, default=None,
+              help="Version du schéma à atteindre.")
+def migrer(cible):
+    """Applique les migrations du schéma de la base."""
+    for version, description in migrations.migrer(cible=cible):
+        print(f"Migration {version} appliquée : {description}")
+    print("Schéma à jour.")
+
+
+@app.cli.command("verifier-plans")
+def verifier_plans():
+    """Échoue si une requête de Database parcourt toute une table."""
+    problemes = migrations.verifier_plans()
+    for nom, requete, plan in problemes:
+        print(f"Balayage complet dans {nom} :\n{requete}")
+        for ligne in plan:
+            print(f"    {ligne}")
+    if problemes:
+        raise SystemExit(1)
+    print("Aucun balayage complet.")
+
+
+def _afficher_import(nombre, erreurs, quoi):
+    for numero, erreur in erreurs:
+        print(f"Ligne {numero} : {erreur}")
+    print(f"{nombre} {quoi} importé(s), {len(erreurs)} ligne(s) en erreur.")
+    if erreurs:
+        raise SystemExit(1)
+
+
+@app.cli.command("importer-articles")
+@click.argument("fichier", type=click.File("r", encoding="utf-8"))
+@click.option("--format", "format_demande",
+              type=click.Choice(["jsonl", "csv"]),
+              help="Par défaut d'après l'extension du fichier.")
+@click.option("--taille-lot", default=1000, show_default=True)
+@click.option("--strict", is_flag=True,
+              help="N'importer aucune ligne si une ligne est en erreur.")
+def importer_articles(fichier, format_demande, taille_lot, strict):
+    """Ajoute en masse les articles d'un fichier JSONL ou CSV."""
+    lignes = transfert.lire_lignes(
+        fichier, transfert.format_fichier(fichier.name, format_demande))
+    database = base_de_donnees.Database()
+    try:
+        nombre, erreurs = database.importer_articles(
+            transfert.valider(lignes, transfert.valider_article),
+            taille_lot=taille_lot, strict=strict)
+    finally:
+        database.deconnecter()
+    _afficher_import(nombre, erreurs, "article(s)")
+
+
+@app.cli.command("importer-utilisateurs")
+@click.argument("fichier", type=click.File("r", encoding="utf-8"))
+@click.option("--format", "format_demande",
+              type=click.Choice(["jsonl", "csv"]),
+              help="Par défaut d'après l'extension du fichier.")
+@click.option("--taille-lot", default=1000, show_default=True)
+@click.option("--strict", is_flag=True,
+              help="N'importer aucune ligne si une ligne est en erreur.")
+def importer_utilisateurs(fichier, format_demande, taille_lot, strict):
+    """Ajoute en masse les utilisateurs d'un fichier JSONL ou CSV."""
+    lignes = transfert.lire_lignes(
+        fichier, transfert.format_fichier(fichier.name, format_demande))
+    photo_defaut = images.photo_par_defaut()
+    database = base_de_donnees.Database()
+    try:
+        nombre, erreurs = database.importer_utilisateurs(
+            transfert.valider(lignes, lambda ligne: transfert.
+                              valider_utilisateur(ligne, photo_defaut)),
+            taille_lot=taille_lot, strict=strict)
+    finally:
+        database.deconnecter()
+    _afficher_import(nombre, erreurs, "utilisateur(s)")
+
+
+@app.cli.command("exporter-articles")
+@click.argument("fichier", type=click.File("w", encoding="utf-8"))
+@click.option("--format", "format_demande",
+              type=click.Choice(["jsonl", "csv"]),
+              help="Par défaut d'après l'extension du fichier.")
+def exporter_articles(fichier, format_demande):
+    """Écrit tous les articles dans un fichier JSONL ou CSV (- : sortie)."""
+    database = base_de_donnees.Database()
+    try:
+        nombre = transfert.ecrire_lignes(
+            fichier, transfert.format_fichier(fichier.name, format_demande),
+            transfert.CHAMPS_ARTICLE, database.exporter_articles())
+    finally:
+        database.deconnecter()
+    click.echo(f"{nombre} article(s) exporté(s).", err=True)
+
+
+@app.cli.command("exporter-utilisateurs")
+@click.argument("fichier", type=click.File("w", encoding="utf-8"))
+@click.option("--format", "format_demande",
+              type=click.Choice(["jsonl", "csv"]),
+              help="Par défaut d'après l'extension du fichier.")
+@click.option("--avec-photos", is_flag=True,
+              help="Inclure les photos de profil (base64).")
+def exporter_utilisateurs(fichier, format_demande, avec_photos):
+    """Écrit tous les utilisateurs dans un fichier JSONL ou CSV."""
+    database = base_de_donnees.Database()
+    try:
+        nombre = transfert.ecrire_lignes(
+            fichier, transfert.format_fichier(fichier.name, format_demande),
+            transfert.CHAMPS_UTILISATEUR,
+            database.exporter_utilisateurs(avec_photos=avec_photos))
+    finally:
+        database.deconnecter()
+    click.echo(f"{nombre} utilisateur(s) exporté(s).", err=True)
+
+
+@app.cli.command("geler")
+@click.argument("dossier", type=click.Path(file_okay=False))
+@click.option("--processus", type=int,
+              help="Processus de rendu (par défaut un par cœur).")
+@click.option("--complet", is_flag=True,
+              help="Tout refaire, et retirer toute page d'article qui "
+              "n'est plus publié.")
+def geler(dossier, processus, complet):
+    """Écrit l'accueil et les articles publiés en pages statiques."""
+    resultat = gel.geler(app, dossier, processus=processus, complet=complet)
+    print(f"{resultat['rendus']} article(s) rendu(s), "
+          f"{resultat['supprimes']} supprimé(s), accueil "
+          f"{'refait' if resultat['accueil'] else 'inchangé'}.")
+
+
+@app.cli.command("purger-sessions")
+@click.option("--taille-lot", default=500, show_default=True)
+def purger_sessions(taille_lot):
+    """Supprime tout de suite les sessions expirées."""
+    print(f"{taches.purger_sessions(taille_lot)} session(s) supprimée(s).")
+
+
+@app.cli.command("taches")
+def lancer_taches():
+    """Fait les tâches de fond dans ce processus, jusqu'à Ctrl+C."""
+    if not taches.demarrer(app):
+        print("Un autre processus fait déjà les tâches de fond : attente "
+              "du verrou.")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        taches.arreter()
+
+
+@app.cli.command("maintenir")
+@click.option("--sans-analyse", is_flag=True,
+              help="Ne pas mettre à jour les statistiques (ANALYZE).")
+@click.option("--pages-par-etape", default=200, show_default=True)
+@click.option("--convertir", is_flag=True,
+              help="Passer d'abord la base en auto_vacuum incrémental "
+              "(VACUUM complet, une seule fois).")
+def maintenir(sans_analyse, pages_par_etape, convertir):
+    """ANALYZE, vacuum incrémental et point de contrôle du WAL."""
+    if convertir:
+        converti = maintenance.convertir_vacuum_incremental()
+        print("Base passée en auto_vacuum incrémental." if converti
+              else "Base déjà en auto_vacuum incrémental.")
+    resultat = maintenance.maintenir(analyser=not sans_analyse,
+                                     pages_par_etape=pages_par_etape)
+    avant, apres = resultat["avant"], resultat["apres"]
+    print(f"Maintenance en {resultat['duree_s']} s "
+          f"(auto_vacuum {apres['auto_vacuum']}).")
+    print(f"Taille : {avant['taille']} -> {apres['taille']} octets, "
+          f"WAL : {avant['taille_wal']} -> {apres['taille_wal']} octets.")
+    print(f"Pages libres : {avant['pages_libres']} -> "
+          f"{apres['pages_libres']}.")
+    if resultat["checkpoint"]["bloque"]:
+        print("Point de contrôle incomplet : lectures en cours.")
+
+
 if __name__ == '__main__':
     app.run(debug=True)
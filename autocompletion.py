@@ -0,0 +1,220 @@
+import heapq
+import threading
+import unicodedata
+from bisect import bisect_left, bisect_right, insort
+from datetime import datetime, timezone
+
+# Index en mémoire des titres et identifiants d'articles : une liste triée
+# de (clé normalisée, identifiant), où chaque titre est indexé à partir de
+# chacun de ses mots. Une recherche par préfixe est une recherche
+# dichotomique suivie d'un court parcours.
+_cles = []
+# identifiant -> (titre, date_publication, id), pour l'affichage et le tri
+_articles = {}
+# (date_publication, id, identifiant), du plus ancien au plus récent
+_recents = []
+_verrou = threading.Lock()
+
+# identifiant -> (titre normalisé, identifiant normalisé)
+_textes = {}
+# Au-delà de ce nombre de clés correspondant au préfixe (préfixes très
+# courts), les articles sont d'abord parcourus du plus récent au plus
+# ancien jusqu'à en trouver assez, au lieu de trier toutes les
+# correspondances
+BALAYAGE_MAX = 500
+# Fin de l'intervalle des clés qui commencent par un préfixe
+_APRES_PREFIXE = chr(0x10FFFF)
+
+
+def _aujourd_hui():
+    # Comme DATE('now') de SQLite : les articles dont la date de
+    # publication est passée sont publiés
+    return datetime.now(timezone.utc).date().isoformat()
+
+
+def normaliser(texte):
+    """
+    Retourne `texte` sans accents ni majuscules (« École » -> « ecole »).
+    """
+    decompose = unicodedata.normalize("NFKD", texte)
+    return "".join(c for c in decompose
+                   if not unicodedata.combining(c)).casefold()
+
+
+def _cles_article(identifiant, titre):
+    mots = normaliser(titre).split()
+    cles = {" ".join(mots[i:]) for i in range(len(mots))}
+    cles.add(normaliser(identifiant))
+    return [(cle, identifiant) for cle in cles]
+
+
+def _supprimer_trie(liste, entree):
+    position = bisect_left(liste, entree)
+    if position < len(liste) and liste[position] == entree:
+        del liste[position]
+
+
+def _texte(identifiant, titre):
+    return " ".join(normaliser(titre).split()), normaliser(identifiant)
+
+
+def _correspond(texte, prefixe):
+    # Une clé de l'article commence par le préfixe (voir _cles_article)
+    titre, identifiant = texte
+    return (titre.startswith(prefixe) or " " + prefixe in titre
+            or identifiant.startswith(prefixe))
+
+
+def _ajouter(identifiant, titre, date_publication, id_article):
+    _articles[identifiant] = (titre, date_publication, id_article)
+    _textes[identifiant] = _texte(identifiant, titre)
+    for entree in _cles_article(identifiant, titre):
+        insort(_cles, entree)
+    insort(_recents, (date_publication, id_article, identifiant))
+
+
+def _retirer(identifiant):
+    article = _articles.pop(identifiant, None)
+    if article is None:
+        return None
+    del _textes[identifiant]
+    for entree in _cles_article(identifiant, article[0]):
+        _supprimer_trie(_cles, entree)
+    _supprimer_trie(_recents, (article[1], article[2], identifiant))
+    return article
+
+
+def construire(database):
+    """
+    Cette fonction (re)construit l'index à partir de la table articles.
+
+    Returns:
+        int: Le nombre d'articles indexés.
+    """
+    cles, articles = [], {}
+    for article in database.parcourir_titres():
+        articles[article["identifiant"]] = (article["titre"],
+                                            article["date_publication"],
+                                            article["id"])
+        cles.extend(_cles_article(article["identifiant"], article["titre"]))
+    cles.sort()
+    recents = sorted((date_publication, id_article, identifiant)
+                     for identifiant, (_, date_publication, id_article)
+                     in articles.items())
+    textes = {identifiant: _texte(identifiant, titre)
+              for identifiant, (titre, _, _) in articles.items()}
+    with _verrou:
+        _cles[:] = cles
+        _recents[:] = recents
+        _articles.clear()
+        _articles.update(articles)
+        _textes.clear()
+        _textes.update(textes)
+    return len(articles)
+
+
+def rafraichir(database):
+    """
+    Cette fonction met l'index à jour d'après la table articles, modifiée
+    par un autre processus : seuls les articles ajoutés, modifiés ou
+    supprimés depuis sont réindexés. La table est relue en entier, mais ni
+    les titres inchangés ne sont normalisés ni les clés triées à nouveau.
+
+    Returns:
+        int: Le nombre d'articles réindexés ou retirés.
+    """
+    # L'index avant la lecture : un article écrit par ce processus pendant
+    # la lecture a changé depuis, et garde sa nouvelle valeur
+    with _verrou:
+        avant = dict(_articles)
+    lus = {article["identifiant"]: (article["titre"],
+                                    article["date_publication"],
+                                    article["id"])
+           for article in database.parcourir_titres()}
+    changes = [(identifiant, article) for identifiant, article in lus.items()
+               if avant.get(identifiant) != article]
+    changes.extend((identifiant, None) for identifiant in avant
+                   if identifiant not in lus)
+    with _verrou:
+        for identifiant, article in changes:
+            if _articles.get(identifiant) != avant.get(identifiant):
+                continue
+            _retirer(identifiant)
+            if article is not None:
+                _ajouter(identifiant, *article)
+    return len(changes)
+
+
+def article_ajoute(identifiant, titre, date_publication, id_article):
+    with _verrou:
+        _retirer(identifiant)
+        _ajouter(identifiant, titre, date_publication, id_article)
+
+
+def article_modifie(identifiant_courant, nouveau_identifiant, nouveau_titre):
+    with _verrou:
+        article = _retirer(identifiant_courant)
+        if article is not None:
+            _ajouter(nouveau_identifiant, nouveau_titre, article[1],
+                     article[2])
+
+
+def article_supprime(identifiant):
+    with _verrou:
+        _retirer(identifiant)
+
+
+def completer(saisie, limite=10):
+    """
+    Cette fonction retourne les articles dont le titre (ou un mot du
+    titre à partir duquel on lit la suite) ou l'identifiant commence par
+    `saisie`, sans tenir compte des accents ni de la casse, du plus récent
+    au plus ancien. Les articles à paraître (date de publication à venir)
+    restent dans l'index mais ne sont pas proposés.
+
+    Returns:
+        list: Les (identifiant, titre, date_publication).
+    """
+    prefixe = " ".join(normaliser(saisie).split())
+    if not prefixe:
+        return []
+    aujourd_hui = _aujourd_hui()
+    with _verrou:
+        debut = bisect_left(_cles, (prefixe,))
+        fin = bisect_left(_cles, (prefixe + _APRES_PREFIXE,), lo=debut)
+        plus_recents = None
+        if fin - debut > BALAYAGE_MAX:
+            plus_recents = _parcourir_recents(prefixe, limite, fin - debut,
+                                              aujourd_hui)
+        if plus_recents is None:
+            trouves = {_cles[position][1]: _articles[_cles[position][1]]
+                       for position in range(debut, fin)}
+            plus_recents = heapq.nlargest(
+                limite, ((identifiant, article) for identifiant, article
+                         in trouves.items() if article[1] <= aujourd_hui),
+                key=lambda i: (i[1][1], i[1][2]))
+    return [(identifiant, titre, date_publication)
+            for identifiant, (titre, date_publication, _) in plus_recents]
+
+
+def _parcourir_recents(prefixe, limite, balayage_max, aujourd_hui):
+    # Les correspondances sont nombreuses : les plus récentes se trouvent
+    # en général après peu d'articles. None si elles sont trop dispersées
+    # (plus de `balayage_max` articles lus), pour trier les clés à la place.
+    # Le parcours commence au dernier article publié
+    publies = bisect_right(_recents, (aujourd_hui, float("inf")))
+    trouves = []
+    for lus, position in enumerate(range(publies - 1, -1, -1)):
+        if len(trouves) == limite:
+            break
+        if lus == balayage_max:
+            return None
+        identifiant = _recents[position][2]
+        if _correspond(_textes[identifiant], prefixe):
+            trouves.append((identifiant, _articles[identifiant]))
+    return trouves
+
+
+def statistiques():
+    with _verrou:
+        return {"articles": len(_articles), "cles": len(_cles)}
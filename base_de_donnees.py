@@ -2,88 +2,748 @@ import sqlite3
 import os
 import hashlib
 import base64
+import json
+import math
 import uuid
+import re
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+from . import autocompletion
+from . import cache
+
+# Distingue une entrée absente du cache d'une entrée qui vaut None.
+_ABSENT = object()
 
 CHEMIN_BD = f"{os.path.dirname(os.path.abspath(__file__))}/database.db"
 
+# Pragmas appliqués une seule fois, à la création de chaque connexion.
+PRAGMAS_PAR_DEFAUT = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "cache_size": -16000,          # en Kio (valeur négative), soit ~16 Mo
+    "mmap_size": 64 * 1024 * 1024,
+    "busy_timeout": 5000,
+}
+
+# Marqueurs entourant les termes trouvés dans les extraits de recherche.
+DEBUT_SURLIGNAGE = "\x02"
+FIN_SURLIGNAGE = "\x03"
+
+# Index plein texte synchronisé avec la table articles. Le tokenizer
+# unicode61 avec remove_diacritics rend la recherche insensible aux
+# accents et à la casse (« ecole » trouve « École »).
+TABLE_RECHERCHE = """
+    CREATE VIRTUAL TABLE IF NOT EXISTS articles_fts USING fts5(
+        titre, auteur, contenu,
+        content='articles', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    );
+"""
+
+DECLENCHEURS_RECHERCHE = [
+    """
+    CREATE TRIGGER IF NOT EXISTS articles_fts_insertion
+    AFTER INSERT ON articles BEGIN
+        INSERT INTO articles_fts(rowid, titre, auteur, contenu)
+        VALUES (new.id, new.titre, new.auteur, new.contenu);
+    END;
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS articles_fts_suppression
+    AFTER DELETE ON articles BEGIN
+        INSERT INTO articles_fts(articles_fts, rowid, titre, auteur, contenu)
+        VALUES ('delete', old.id, old.titre, old.auteur, old.contenu);
+    END;
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS articles_fts_modification
+    AFTER UPDATE OF titre, auteur, contenu ON articles BEGIN
+        INSERT INTO articles_fts(articles_fts, rowid, titre, auteur, contenu)
+        VALUES ('delete', old.id, old.titre, old.auteur, old.contenu);
+        INSERT INTO articles_fts(rowid, titre, auteur, contenu)
+        VALUES (new.id, new.titre, new.auteur, new.contenu);
+    END;
+    """,
+]
+
+
+# Une recherche doit contenir au moins un mot de LONGUEUR_RECHERCHE_MIN
+# caractères ; les mots plus courts sont cherchés tels quels, pas comme
+# préfixes (« e »* correspondrait à presque tous les articles).
+LONGUEUR_RECHERCHE_MIN = 3
+# Seuls les RESULTATS_RECHERCHE_MAX articles correspondants les plus
+# récents sont classés : borne le coût des termes très fréquents.
+RESULTATS_RECHERCHE_MAX = 1000
+
+
+class DelaiDepasse(sqlite3.OperationalError):
+    """
+    Une requête a été interrompue faute de temps (voir rechercher_article).
+    """
+
+
+def requete_fts(recherche):
+    """
+    Cette fonction transforme la saisie de l'utilisateur en requête FTS5.
+    Chaque mot devient un préfixe entre guillemets, ce qui neutralise
+    la syntaxe FTS5 (opérateurs, colonnes, guillemets).
+
+    Args:
+        recherche (str): La saisie de l'utilisateur.
+    Returns:
+        str: La requête FTS5 ou None si la saisie ne contient aucun mot
+        d'au moins LONGUEUR_RECHERCHE_MIN caractères.
+    """
+    mots = re.findall(r"\w+", recherche)
+    if not any(len(mot) >= LONGUEUR_RECHERCHE_MIN for mot in mots):
+        return None
+    return " ".join(f'"{mot}"*' if len(mot) >= LONGUEUR_RECHERCHE_MIN
+                    else f'"{mot}"' for mot in mots)
+
+
+# Extrait des articles affiché dans les listes, en caractères, et vitesse
+# de lecture retenue pour le temps de lecture.
+LONGUEUR_EXTRAIT = 200
+MOTS_PAR_MINUTE = 200
+
+
+def resumer_contenu(contenu):
+    """
+    Cette fonction calcule les colonnes gardées avec chaque article pour
+    les listes, qui ne lisent pas le contenu.
+
+    Returns:
+        tuple: (extrait, nombre de mots, temps de lecture en minutes)
+    """
+    mots = contenu.split()
+    extrait = " ".join(mots)
+    if len(extrait) > LONGUEUR_EXTRAIT:
+        # Couper à la fin d'un mot
+        coupe = extrait.rfind(" ", 0, LONGUEUR_EXTRAIT + 1)
+        extrait = extrait[:coupe if coupe > 0 else LONGUEUR_EXTRAIT] + "…"
+    return extrait, len(mots), max(1, round(len(mots) / MOTS_PAR_MINUTE))
+
+
+# Durée de vie d'une session sans activité, en secondes.
+DUREE_SESSION = 7 * 24 * 3600
+
+# Pagination par clé (keyset) : taille par défaut et maximale d'une page.
+TAILLE_PAGE = 20
+TAILLE_PAGE_MAX = 100
+
+
+def encoder_curseur(valeurs):
+    """
+    Cette fonction encode la clé de tri d'une ligne en curseur opaque,
+    utilisable dans une URL.
+    """
+    texte = json.dumps(list(valeurs), separators=(",", ":"))
+    return base64.urlsafe_b64encode(texte.encode("utf-8")).decode("ascii")
+
+
+def decoder_curseur(curseur):
+    """
+    Cette fonction décode un curseur produit par encoder_curseur.
+
+    Returns:
+        list: Les valeurs de la clé ou None si le curseur est invalide
+        (un curseur forgé ne doit jamais atteindre SQLite).
+    """
+    if not curseur:
+        return None
+    try:
+        valeurs = json.loads(base64.urlsafe_b64decode(curseur.encode("ascii")))
+    except (ValueError, UnicodeError):
+        return None
+    if not isinstance(valeurs, list) or len(valeurs) != 2:
+        return None
+    # bool est un int pour Python, mais n'est jamais une clé de tri ;
+    # json accepte aussi NaN et Infinity
+    if not all(isinstance(valeur, (str, int, float))
+               and not isinstance(valeur, bool)
+               and (not isinstance(valeur, float) or math.isfinite(valeur))
+               for valeur in valeurs):
+        return None
+    return valeurs
+
+
+def borner_limite(limite):
+    try:
+        limite = int(limite)
+    except (TypeError, ValueError):
+        return TAILLE_PAGE
+    return max(1, min(limite, TAILLE_PAGE_MAX))
+
+
+def construire_page(lignes, limite, cle, apres, avant):
+    """
+    Cette fonction construit une page à partir des lignes lues
+    (limite + 1 au plus, pour savoir s'il reste des lignes).
+
+    Args:
+        lignes (list): Les lignes lues, dans l'ordre de la requête.
+        limite (int): La taille de la page.
+        cle (callable): Retourne la clé de tri d'une ligne.
+        apres (list): Le curseur de départ vers l'avant, s'il y en a un.
+        avant (list): Le curseur de départ vers l'arrière, s'il y en a un.
+    Returns:
+        dict: Les lignes de la page, le curseur de la page suivante et
+        celui de la page précédente (None s'il n'y en a pas).
+    """
+    encore = len(lignes) > limite
+    lignes = lignes[:limite]
+    if avant is not None:
+        # Les lignes ont été lues à rebours
+        lignes.reverse()
+        a_precedent, a_suivant = encore, True
+    else:
+        a_precedent, a_suivant = apres is not None, encore
+    return {
+        "lignes": lignes,
+        "suivant": encoder_curseur(cle(lignes[-1]))
+        if lignes and a_suivant else None,
+        "precedent": encoder_curseur(cle(lignes[0]))
+        if lignes and a_precedent else None,
+    }
+
+
+def parcourir_page(curseur, limite, cle, apres, avant, page):
+    """
+    Variante paresseuse de construire_page : les lignes sont produites
+    au fur et à mesure de la lecture du curseur, et les curseurs de
+    pagination sont écrits dans `page` ("suivant", "precedent") une fois
+    la page parcourue.
+
+    Une page lue à rebours (`avant`) doit être retournée : elle est lue
+    d'un coup, ce qui reste borné par `limite`.
+    """
+    if avant is not None:
+        resultat = construire_page(curseur.fetchall(), limite, cle,
+                                   apres, avant)
+        page["suivant"] = resultat["suivant"]
+        page["precedent"] = resultat["precedent"]
+        yield from resultat["lignes"]
+        return
+
+    derniere = None
+    for nombre, ligne in enumerate(curseur):
+        if nombre == limite:
+            page["suivant"] = encoder_curseur(cle(derniere))
+            break
+        if nombre == 0 and apres is not None:
+            page["precedent"] = encoder_curseur(cle(ligne))
+        yield ligne
+        derniere = ligne
+    curseur.close()
+
+
+def resume_auteur(ligne):
+    """
+    Cette fonction retourne le résumé d'un auteur affiché avec ses
+    articles (None s'il n'y a pas d'utilisateur).
+    """
+    if ligne is None:
+        return None
+    return {
+        "username": ligne["username"],
+        "nom": ligne["nom"],
+        "prenom": ligne["prenom"],
+        "a_photo": ligne["photo_hash"] is not None,
+        "photo_hash": ligne["photo_hash"],
+        "etat": ligne["etat"]
+    }
+
+
+def _cle_article(ligne):
+    return ligne["date_publication"], ligne["id"]
+
+
+def enregistrer_photo(connexion, photo, miniature):
+    """
+    Cette fonction range une image et sa miniature (voir
+    images.preparer) dans la table photos, si elles n'y sont pas déjà.
+
+    Returns:
+        str: Le hash de l'image, à mettre dans utilisateurs.photo_hash.
+    """
+    connexion.executemany("""INSERT OR IGNORE INTO photos(hash, type,
+     donnees, miniature) VALUES (?, ?, ?, ?)""",
+                          [(miniature["hash"], miniature["type"],
+                            miniature["donnees"], miniature["hash"]),
+                           (photo["hash"], photo["type"], photo["donnees"],
+                            miniature["hash"])])
+    return photo["hash"]
+
+
+def creer_index_recherche(connexion):
+    """
+    Cette fonction crée l'index plein texte et ses déclencheurs
+    s'ils n'existent pas déjà.
+    """
+    connexion.execute(TABLE_RECHERCHE)
+    for declencheur in DECLENCHEURS_RECHERCHE:
+        connexion.execute(declencheur)
+
+
+def reconstruire_index_recherche():
+    """
+    Cette fonction (re)construit l'index plein texte à partir de la table
+    articles. Elle sert à initialiser l'index d'une base existante.
+
+    Returns:
+        int: Le nombre d'articles indexés.
+    """
+    connexion = sqlite3.connect(get_pool().chemin)
+    try:
+        creer_index_recherche(connexion)
+        connexion.execute(
+            "INSERT INTO articles_fts(articles_fts) VALUES ('rebuild')")
+        connexion.commit()
+        return connexion.execute(
+            "SELECT COUNT(*) FROM articles").fetchone()[0]
+    finally:
+        connexion.close()
+
 
 def creer_bd():
     """
     Cette méthode permet de créer la base de données.
     De plus, elle crée aussi les tables articles, utilisateurs et sessions
-    si elles n'existent pas déjà.
+    si elles n'existent pas déjà, en appliquant les migrations du schéma
+    (voir migrations.py).
 
     Returns:
         str: Le chemin absolu de la base de données.
     """
+    from . import migrations
+
     try:
-        connexion = sqlite3.connect(CHEMIN_BD)
-        curseur = connexion.cursor()
+        migrations.migrer(CHEMIN_BD)
+    except sqlite3.Error as e:
+        print("Erreur lors de la création de la table:", e)
+    return CHEMIN_BD
 
-        table_articles = """
-            CREATE TABLE IF NOT EXISTS articles (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            titre TEXT NOT NULL,
-            identifiant TEXT UNIQUE NOT NULL CHECK(
-                identifiant GLOB '[A-Za-z0-9_ éèàçôù-][A-Za-z0-9_ éèàçôù-]*'
-                AND TRIM(identifiant) != ''
-                AND LENGTH(TRIM(identifiant)) >= 2
-            ),
-            auteur TEXT NOT NULL,
-            date_publication DATE NOT NULL,
-            contenu TEXT NOT NULL,
-            FOREIGN KEY (auteur) REFERENCES utilisateurs(username)
-            );
-            """
-
-        table_utilisateurs = """
-            CREATE TABLE IF NOT EXISTS utilisateurs (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                username TEXT UNIQUE NOT NULL,
-                password_hash TEXT NOT NULL,
-                salt varchar(32),
-                nom TEXT NOT NULL,
-                prenom TEXT NOT NULL,
-                photo_profil BLOB,
-                etat INTEGER NOT NULL DEFAULT 1
-            );
-        """
-
-        table_sessions = """
-            CREATE TABLE IF NOT EXISTS sessions(
-                id_session TEXT UNIQUE NOT NULL,
-                username TEXT UNIQUE NOT NULL
-            );
-            """
-
-        curseur.execute(table_articles)
-        connexion.commit()
 
-        curseur.execute(table_utilisateurs)
-        connexion.commit()
+# Fonctions appelées avec le texte de chaque requête SQL exécutée par
+# les connexions du pool (mesures, instrumentation).
+_traceurs = []
 
-        curseur.execute(table_sessions)
-        connexion.commit()
 
-    except sqlite3.Error as e:
-        print("Erreur lors de la création de la table:", e)
-    finally:
-        curseur.close()
-        connexion.close()
+def _tracer(requete):
+    for traceur in _traceurs:
+        traceur(requete)
+
+
+def ajouter_traceur(traceur):
+    """
+    Cette fonction abonne `traceur` aux requêtes SQL du pool. Seules les
+    connexions créées après le premier abonnement sont tracées : il faut
+    donc l'appeler avant configurer_pool() ou avant la première requête.
+    """
+    if traceur not in _traceurs:
+        _traceurs.append(traceur)
+
+
+def retirer_traceur(traceur):
+    if traceur in _traceurs:
+        _traceurs.remove(traceur)
+
+
+# Fonctions appelées après chaque transaction d'écriture de ce processus,
+# avec les générations (voir get_generations) lues à son début et à sa
+# fin : coherence.py ignore ainsi ses propres écritures.
+_suivis_ecritures = []
+
+
+def suivre_ecritures(fonction):
+    """
+    Cette fonction abonne fonction(avant, apres) aux écritures de ce
+    processus. Les deux dictionnaires domaine -> valeur sont lus pendant
+    que la transaction tient le verrou d'écriture : les générations entre
+    les deux sont toutes dues à cette transaction.
+    """
+    if fonction not in _suivis_ecritures:
+        _suivis_ecritures.append(fonction)
+
+
+def _lire_generations(connexion):
+    # « -- » : requête interne, non comptée par les traceurs
+    return dict(connexion.execute("""-- generations
+     SELECT domaine, valeur FROM generations""").fetchall())
+
+
+def _ecriture_suivie(avant, apres):
+    for fonction in _suivis_ecritures:
+        fonction(avant, apres)
+
+
+class PoolConnexions:
+    """
+    Pool de connexions SQLite persistantes.
+
+    Les connexions sont créées à la demande jusqu'à `taille`, puis
+    réutilisées. Un fil d'exécution récupère de préférence la dernière
+    connexion qu'il a rendue, ce qui garde les caches de page SQLite chauds.
+    """
+
+    def __init__(self, chemin=None, taille=5, delai_attente=10.0,
+                 pragmas=None):
+        self.chemin = chemin or CHEMIN_BD
+        self.taille = taille
+        self.delai_attente = delai_attente
+        self.pragmas = dict(PRAGMAS_PAR_DEFAUT if pragmas is None
+                            else pragmas)
+        self._libres = []
+        self._toutes = []
+        self._condition = threading.Condition()
+        self._local = threading.local()
+        self._stats = {"acquises": 0, "creees": 0, "attentes": 0}
+
+    def _creer_connexion(self):
+        connexion = sqlite3.connect(self.chemin, check_same_thread=False)
+        connexion.row_factory = sqlite3.Row
+        for nom, valeur in self.pragmas.items():
+            connexion.execute(f"PRAGMA {nom} = {valeur}")
+        if _traceurs:
+            connexion.set_trace_callback(_tracer)
+        return connexion
+
+    def acquerir(self):
+        """
+        Retourne une connexion du pool, en attendant qu'une connexion
+        se libère si la taille maximale est atteinte.
+
+        Raises:
+            sqlite3.OperationalError: aucune connexion libérée à temps.
+        """
+        with self._condition:
+            self._stats["acquises"] += 1
+            a_attendu = False
+            limite = time.monotonic() + self.delai_attente
+            while True:
+                preferee = getattr(self._local, "connexion", None)
+                if preferee is not None and preferee in self._libres:
+                    self._libres.remove(preferee)
+                    return preferee
+                if self._libres:
+                    connexion = self._libres.pop()
+                    self._local.connexion = connexion
+                    return connexion
+                if len(self._toutes) < self.taille:
+                    break
+                if not a_attendu:
+                    a_attendu = True
+                    self._stats["attentes"] += 1
+                restant = limite - time.monotonic()
+                if restant <= 0:
+                    raise sqlite3.OperationalError(
+                        "Aucune connexion disponible dans le pool")
+                self._condition.wait(restant)
+            # Réserver la place avant de créer la connexion hors du verrou
+            self._toutes.append(None)
+
+        try:
+            connexion = self._creer_connexion()
+        except Exception:
+            with self._condition:
+                self._toutes.remove(None)
+                self._condition.notify()
+            raise
+        with self._condition:
+            self._toutes[self._toutes.index(None)] = connexion
+            self._stats["creees"] += 1
+        self._local.connexion = connexion
+        return connexion
+
+    def liberer(self, connexion):
+        """
+        Rend une connexion au pool. Une transaction restée ouverte
+        est annulée pour ne pas la transmettre au prochain utilisateur.
+        """
+        if connexion.in_transaction:
+            connexion.rollback()
+        with self._condition:
+            self._libres.append(connexion)
+            self._condition.notify()
+
+    def fermer(self):
+        """
+        Ferme toutes les connexions libres du pool.
+        """
+        with self._condition:
+            for connexion in self._libres:
+                connexion.close()
+                self._toutes.remove(connexion)
+            self._libres = []
+
+    def statistiques(self):
+        with self._condition:
+            return dict(self._stats,
+                        ouvertes=len(self._toutes),
+                        libres=len(self._libres),
+                        taille=self.taille)
+
+
+_pool = None
+_verrou_pool = threading.Lock()
+
+
+def configurer_pool(**options):
+    """
+    Remplace le pool de connexions global.
+
+    Args:
+        **options: Arguments transmis à PoolConnexions
+            (chemin, taille, delai_attente, pragmas).
+    Returns:
+        PoolConnexions: Le nouveau pool.
+    """
+    global _pool
+    with _verrou_pool:
+        if _pool is not None:
+            _pool.fermer()
+        _pool = PoolConnexions(**options)
+        return _pool
+
+
+def get_pool():
+    global _pool
+    if _pool is None:
+        with _verrou_pool:
+            if _pool is None:
+                _pool = PoolConnexions()
+    return _pool
+
+
+class EcrivainUnique:
+    """
+    Fil d'exécution unique qui fait les écritures de toute l'application
+    sur sa propre connexion, pour éviter que les requêtes se disputent le
+    verrou d'écriture de SQLite (« database is locked »).
+
+    Les opérations soumises sont groupées : la première attend au plus
+    `latence` secondes que d'autres la rejoignent (au plus `taille_lot`),
+    puis toutes sont faites dans une seule transaction, chacune sous son
+    propre SAVEPOINT pour qu'une opération en erreur n'annule pas les
+    autres. Le résultat de chacune est transmis par un Future une fois la
+    transaction validée.
+    """
+
+    def __init__(self, chemin=None, latence=0.002, taille_lot=100,
+                 pragmas=None):
+        self.chemin = chemin or CHEMIN_BD
+        self.latence = latence
+        self.taille_lot = taille_lot
+        self.pragmas = dict(PRAGMAS_PAR_DEFAUT if pragmas is None
+                            else pragmas)
+        self._file = queue.Queue()
+        self._verrou = threading.Lock()
+        self._stats = {"operations": 0, "transactions": 0, "erreurs": 0,
+                       "profondeur_max": 0}
+        self._fil = threading.Thread(target=self._boucle,
+                                     name="ecrivain-sqlite", daemon=True)
+        self._fil.start()
+
+    def soumettre(self, operation):
+        """
+        Confie operation(connexion) au fil d'écriture.
+
+        Returns:
+            Future: Le résultat de l'opération, une fois validée.
+        """
+        future = Future()
+        self._file.put((operation, future))
+        profondeur = self._file.qsize()
+        with self._verrou:
+            if profondeur > self._stats["profondeur_max"]:
+                self._stats["profondeur_max"] = profondeur
+        return future
+
+    def _boucle(self):
+        connexion = sqlite3.connect(self.chemin, isolation_level=None)
+        connexion.row_factory = sqlite3.Row
+        for nom, valeur in self.pragmas.items():
+            connexion.execute(f"PRAGMA {nom} = {valeur}")
+        if _traceurs:
+            connexion.set_trace_callback(_tracer)
+        try:
+            arret = False
+            while not arret:
+                element = self._file.get()
+                if element is None:
+                    return
+                lot = [element]
+                limite = time.monotonic() + self.latence
+                while len(lot) < self.taille_lot:
+                    try:
+                        element = self._file.get(
+                            timeout=max(limite - time.monotonic(), 0))
+                    except queue.Empty:
+                        break
+                    if element is None:
+                        arret = True
+                        break
+                    lot.append(element)
+                self._executer(connexion, lot)
+        finally:
+            connexion.close()
+
+    def _executer(self, connexion, lot):
+        resultats = []
+        suivie = bool(_suivis_ecritures)
+        try:
+            connexion.execute("BEGIN IMMEDIATE")
+            avant = _lire_generations(connexion) if suivie else None
+            for operation, future in lot:
+                connexion.execute("SAVEPOINT operation")
+                try:
+                    resultats.append((future, operation(connexion), None))
+                except Exception as e:
+                    connexion.execute("ROLLBACK TO operation")
+                    resultats.append((future, None, e))
+                connexion.execute("RELEASE operation")
+            apres = _lire_generations(connexion) if suivie else None
+            connexion.execute("COMMIT")
+        except Exception as e:
+            if connexion.in_transaction:
+                connexion.execute("ROLLBACK")
+            with self._verrou:
+                self._stats["erreurs"] += len(lot)
+            for _, future in lot:
+                future.set_exception(e)
+            return
+
+        if suivie:
+            _ecriture_suivie(avant, apres)
+        with self._verrou:
+            self._stats["operations"] += len(lot)
+            self._stats["transactions"] += 1
+            self._stats["erreurs"] += sum(1 for _, _, erreur in resultats
+                                          if erreur is not None)
+        for future, resultat, erreur in resultats:
+            if erreur is not None:
+                future.set_exception(erreur)
+            else:
+                future.set_result(resultat)
+
+    def fermer(self):
+        """
+        Termine le fil après les opérations déjà soumises.
+        """
+        self._file.put(None)
+        self._fil.join()
+
+    def statistiques(self):
+        with self._verrou:
+            stats = dict(self._stats, profondeur=self._file.qsize(),
+                         latence=self.latence, taille_lot=self.taille_lot)
+        stats["operations_par_transaction"] = (
+            stats["operations"] / stats["transactions"]
+            if stats["transactions"] else 0.0)
+        return stats
+
+
+_ecrivain = None
+
+
+def configurer_ecrivain(actif=True, **options):
+    """
+    Active (ou désactive) l'écrivain unique global, qui remplace alors les
+    écritures faites par chaque requête sur sa propre connexion.
+
+    Args:
+        actif (bool): False pour revenir aux écritures directes.
+        **options: Arguments transmis à EcrivainUnique
+            (chemin, latence, taille_lot, pragmas).
+    Returns:
+        EcrivainUnique: Le nouvel écrivain, ou None.
+    """
+    global _ecrivain
+    with _verrou_pool:
+        ancien, _ecrivain = _ecrivain, None
+        if ancien is not None:
+            ancien.fermer()
+        if actif:
+            _ecrivain = EcrivainUnique(**options)
+        return _ecrivain
+
+
+def get_ecrivain():
+    return _ecrivain
+
+
+def cle_recherche(recherche, apres=None, avant=None, limite=TAILLE_PAGE):
+    """
+    Cette fonction retourne la clé de cache.recherches d'une page de
+    résultats (voir Database.rechercher_article), ou None si la saisie n'a
+    aucun mot assez long.
+    """
+    requete = requete_fts(recherche.lower())
+    if requete is None:
+        return None
+    return (requete, apres, avant, borner_limite(limite))
+
+
+def recherche_en_cache(recherche, apres=None, avant=None,
+                       limite=TAILLE_PAGE):
+    """
+    Cette fonction retourne la page de résultats gardée en cache par
+    Database.rechercher_article, sans accès à la base, ou None.
+    """
+    cle = cle_recherche(recherche, apres, avant, limite)
+    return None if cle is None else cache.get_recherche(cle)
 
 
 class Database:
-    def __init__(self):
+    def __init__(self, pool=None):
+        self.pool = pool or get_pool()
         self.connexion = None
 
     def get_connexion(self):
-        connexion = sqlite3.connect(CHEMIN_BD)
-        connexion.row_factory = sqlite3.Row
-        return connexion
+        # Une seule connexion par instance (donc par requête),
+        # rendue au pool dans deconnecter().
+        if self.connexion is None:
+            self.connexion = self.pool.acquerir()
+        return self.connexion
 
     def deconnecter(self):
         if self.connexion is not None:
-            self.connexion.close()
+            self.pool.liberer(self.connexion)
+            self.connexion = None
+
+    def _ecrire(self, operation):
+        """
+        Exécute operation(connexion) dans une transaction et retourne son
+        résultat. L'opération ne doit pas valider elle-même.
+
+        Si l'écrivain unique est actif (voir configurer_ecrivain),
+        l'opération lui est confiée et cette méthode attend qu'elle soit
+        validée ; ses exceptions sont relancées ici.
+        """
+        ecrivain = get_ecrivain()
+        if ecrivain is not None:
+            return ecrivain.soumettre(operation).result()
+        connexion = self.get_connexion()
+        suivie = bool(_suivis_ecritures)
+        try:
+            if suivie:
+                # Prendre le verrou d'écriture avant de lire les générations
+                if not connexion.in_transaction:
+                    connexion.execute("BEGIN IMMEDIATE")
+                avant = _lire_generations(connexion)
+            resultat = operation(connexion)
+            if suivie:
+                apres = _lire_generations(connexion)
+            connexion.commit()
+        except Exception:
+            connexion.rollback()
+            raise
+        if suivie:
+            _ecriture_suivie(avant, apres)
+        return resultat
 
     def verifier_username_db(self, username):
         """
@@ -173,33 +833,36 @@ class Database:
         """
         Cette méthode créer un utilisateur dans la base de donnée.
 
-        Returns:
-            Bool:
-                - True => l'utilisateur existe
-                - False => l'utilisateur inexistant
+        Args:
+            photo_profil (tuple): (image, miniature) préparées par
+                images.preparer, ou None.
         """
-        connexion = self.get_connexion()
-
-        connexion.execute("""insert into utilisateurs(username, password_hash,
-        salt, nom, prenom, photo_profil)
+        def operation(connexion):
+            photo_hash = (enregistrer_photo(connexion, *photo_profil)
+                          if photo_profil else None)
+            connexion.execute(
+                """insert into utilisateurs(username, password_hash,
+        salt, nom, prenom, photo_hash)
             values(?, ?, ?, ?, ?, ?)""", (username, password_hash,
-                                          salt, nom, prenom, photo_profil))
-
-        connexion.commit()
+                                          salt, nom, prenom, photo_hash))
+        self._ecrire(operation)
+        cache.auteur_modifie(username)
 
     def ajout_article(self, titre, identifiant, auteur,
                       date_publication, contenu):
         """
         Cette méthode ajoute un article à la base de données.
         """
-        connexion = self.get_connexion()
-
-        connexion.execute("""INSERT INTO articles(titre, identifiant,
-         auteur, date_publication, contenu)
-            VALUES(?, ?, ?, ?, ?)""", (titre, identifiant,
-                                       auteur, date_publication, contenu))
-
-        connexion.commit()
+        curseur = self._ecrire(lambda connexion: connexion.execute(
+            """INSERT INTO articles(titre, identifiant,
+         auteur, date_publication, contenu, extrait, nombre_mots,
+         temps_lecture, date_modification)
+            VALUES(?, ?, ?, ?, ?, ?, ?, ?, DATETIME('now'))""",
+            (titre, identifiant, auteur, date_publication, contenu,
+             *resumer_contenu(contenu))))
+        cache.article_modifie(identifiant)
+        autocompletion.article_ajoute(identifiant, titre, date_publication,
+                                      curseur.lastrowid)
 
     def get_user_login_info(self, username):
         """
@@ -218,60 +881,202 @@ class Database:
         else:
             return user[0], user[1], user[2]
 
-    def save_session(self, id_session, username):
-        connexion = self.get_connexion()
-        connexion.execute(("""INSERT INTO sessions(id_session, username)
-         VALUES (?, ?)"""), (id_session, username))
-        connexion.commit()
+    def save_session(self, id_session, username, duree=DUREE_SESSION):
+        """
+        Cette méthode ouvre une session de `duree` secondes. Un utilisateur
+        peut avoir plusieurs sessions (plusieurs navigateurs).
+        """
+        maintenant = int(time.time())
+        self._ecrire(lambda connexion: connexion.execute(
+            """INSERT INTO sessions(id_session, username,
+         date_creation, date_expiration) VALUES (?, ?, ?, ?)""",
+            (id_session, username, maintenant, maintenant + duree)))
+        cache.sessions.supprimer(id_session)
 
     def delete_session(self, id_session):
-        connexion = self.get_connexion()
-        connexion.execute(("""DELETE FROM sessions WHERE id_session=?"""),
-                          (id_session,))
-        connexion.commit()
+        self._ecrire(lambda connexion: connexion.execute(
+            """DELETE FROM sessions WHERE id_session=?""", (id_session,)))
+        cache.sessions.supprimer(id_session)
 
-    def get_session(self, id_session):
+    def get_session(self, id_session, duree=DUREE_SESSION):
+        """
+        Cette méthode retourne le username associé à une session,
+        ou None si la session n'existe pas, a expiré ou si le compte est
+        désactivé. Les sessions valides sont gardées dans cache.sessions.
+        """
+        username = cache.sessions.get(id_session)
+        if username is not None:
+            return username
+
+        maintenant = int(time.time())
         curseur = self.get_connexion().cursor()
-        curseur.execute(("""SELECT username FROM sessions
-         WHERE id_session=?"""), (id_session,))
+        curseur.execute(("""SELECT s.username, s.date_expiration
+         FROM sessions s JOIN utilisateurs u ON u.username = s.username
+         WHERE s.id_session=? AND s.date_expiration > ? AND u.etat = 1"""),
+                        (id_session, maintenant))
         data = curseur.fetchone()
         if data is None:
             return None
-        else:
-            return data[0]
 
-    def get_articles(self):
+        expiration = data["date_expiration"]
+        # Expiration glissante : prolongée quand la moitié de la durée
+        # est écoulée, pour n'écrire qu'une fois de temps en temps.
+        if expiration - maintenant < duree / 2:
+            expiration = maintenant + duree
+            self._ecrire(lambda connexion: connexion.execute(
+                """UPDATE sessions SET date_expiration = ?
+             WHERE id_session = ?""", (expiration, id_session)))
+        if cache.sessions.ttl is not None:
+            expiration = min(expiration, maintenant + cache.sessions.ttl)
+        cache.sessions.definir(id_session, data["username"],
+                               expire_a=expiration)
+        return data["username"]
+
+    def purger_sessions(self, taille_lot=500):
+        """
+        Cette méthode supprime au plus `taille_lot` sessions expirées,
+        dans une transaction courte (voir taches.purger_sessions).
+
+        Returns:
+            int: Le nombre de sessions supprimées.
         """
-        Cette méthode retourne la liste des articles en ordre de sortie.
+        curseur = self._ecrire(lambda connexion: connexion.execute(
+            """DELETE FROM sessions WHERE rowid IN
+         (SELECT rowid FROM sessions WHERE date_expiration <= ? LIMIT ?)""",
+            (int(time.time()), taille_lot)))
+        return curseur.rowcount
+
+    def revoquer(self, type_revocation, cle, date_revocation,
+                 date_expiration):
+        """
+        Cette méthode enregistre la révocation d'un jeton de session
+        ("jeton", identifiant du jeton) ou de tous les jetons d'un
+        utilisateur ("utilisateur", username). Voir jetons.py.
+        """
+        self._ecrire(lambda connexion: connexion.execute(
+            """INSERT OR REPLACE INTO revocations(type, cle,
+         date_revocation, date_expiration) VALUES (?, ?, ?, ?)""",
+            (type_revocation, cle, date_revocation, date_expiration)))
+
+    def get_revocations(self):
+        """
+        Cette méthode retourne les révocations qui n'ont pas expiré.
+
+        Returns:
+            list: Les (type, cle, date_revocation, date_expiration).
         """
-        articles = []
         curseur = self.get_connexion().cursor()
+        curseur.execute("""SELECT type, cle, date_revocation,
+         date_expiration FROM revocations WHERE date_expiration > ?""",
+                        (int(time.time()),))
+        return [tuple(ligne) for ligne in curseur.fetchall()]
 
-        curseur.execute("""SELECT * FROM articles
-         ORDER BY date_publication DESC""")
+    def purger_revocations(self):
+        """
+        Cette méthode supprime les révocations expirées.
 
-        for i in curseur.fetchall():
+        Returns:
+            int: Le nombre de révocations supprimées.
+        """
+        curseur = self._ecrire(lambda connexion: connexion.execute(
+            "DELETE FROM revocations WHERE date_expiration <= ?",
+            (int(time.time()),)))
+        return curseur.rowcount
+
+    def get_articles(self, apres=None, avant=None, limite=TAILLE_PAGE):
+        """
+        Cette méthode retourne une page d'articles en ordre de sortie
+        (date de publication puis id, décroissants).
+
+        Args:
+            apres (str): Curseur « suivant » d'une page précédente.
+            avant (str): Curseur « précédent » d'une page précédente.
+            limite (int): Le nombre d'articles par page.
+        Returns:
+            dict: "articles", et les curseurs "suivant" et "precedent".
+        """
+        limite = borner_limite(limite)
+        apres, avant = decoder_curseur(apres), decoder_curseur(avant)
+        curseur = self._page_articles("""SELECT id, titre, identifiant, auteur,
+         date_publication, extrait, temps_lecture FROM articles""",
+                                      apres, avant, limite)
+
+        page = construire_page(curseur.fetchall(), limite, _cle_article,
+                               apres, avant)
+        articles = []
+        for i in page["lignes"]:
             article = {
                 "titre": i["titre"],
                 "identifiant": i["identifiant"],
                 "auteur": i["auteur"],
                 "date_publication": i["date_publication"],
-                "contenu": i["contenu"]
+                "extrait": i["extrait"],
+                "temps_lecture": i["temps_lecture"]
             }
             articles.append(article)
 
-        return articles
+        return {"articles": articles, "suivant": page["suivant"],
+                "precedent": page["precedent"]}
+
+    def _page_articles(self, colonnes, apres, avant, limite):
+        # limite + 1 lignes, pour savoir s'il reste des articles
+        curseur = self.get_connexion().cursor()
+        if avant is not None:
+            curseur.execute(colonnes + """
+             WHERE (date_publication, id) > (?, ?)
+             ORDER BY date_publication ASC, id ASC LIMIT ?""",
+                            (*avant, limite + 1))
+        elif apres is not None:
+            curseur.execute(colonnes + """
+             WHERE (date_publication, id) < (?, ?)
+             ORDER BY date_publication DESC, id DESC LIMIT ?""",
+                            (*apres, limite + 1))
+        else:
+            curseur.execute(colonnes + """
+             ORDER BY date_publication DESC, id DESC LIMIT ?""",
+                            (limite + 1,))
+        return curseur
+
+    def parcourir_articles(self, apres=None, avant=None, limite=TAILLE_PAGE):
+        """
+        Variante paresseuse de get_articles pour la liste de
+        l'administration : seules les colonnes affichées sont lues (pas le
+        contenu) et les articles sont lus au fil du rendu.
+
+        Returns:
+            dict: "articles" (un itérateur), et les curseurs "suivant" et
+            "precedent", connus une fois les articles parcourus.
+        """
+        limite = borner_limite(limite)
+        apres, avant = decoder_curseur(apres), decoder_curseur(avant)
+        page = {"suivant": None, "precedent": None}
+
+        def articles():
+            curseur = self._page_articles("""SELECT id, titre, identifiant,
+             auteur, date_publication FROM articles""", apres, avant, limite)
+            for i in parcourir_page(curseur, limite, _cle_article,
+                                    apres, avant, page):
+                yield {
+                    "titre": i["titre"],
+                    "identifiant": i["identifiant"],
+                    "auteur": i["auteur"],
+                    "date_publication": i["date_publication"]
+                }
+
+        page["articles"] = articles()
+        return page
 
     def get_utilisateurs(self):
         """
-        Cette méthode retourne les utilisateurs inscrits.
+        Cette méthode retourne les utilisateurs inscrits. Les photos ne sont
+        pas lues : elles sont servies par l'URL /photo/<username>, avec
+        leur hash (photo_hash) pour version.
         """
         utilisateurs = []
-        connexion = self.get_connexion()
-        connexion.row_factory = sqlite3.Row
-        curseur = connexion.cursor()
+        curseur = self.get_connexion().cursor()
 
-        curseur.execute("SELECT * FROM utilisateurs")
+        curseur.execute("""SELECT username, password_hash, salt, nom, prenom,
+         photo_hash, etat FROM utilisateurs""")
 
         for i in curseur.fetchall():
             utilisateur = {
@@ -280,14 +1085,34 @@ class Database:
                 "salt": i["salt"],
                 "nom": i["nom"],
                 "prenom": i["prenom"],
-                "photo_profil":
-                    base64.b64encode(i["photo_profil"]).decode("utf-8"),
+                "a_photo": i["photo_hash"] is not None,
+                "photo_hash": i["photo_hash"],
                 "etat": i["etat"]
             }
             utilisateurs.append(utilisateur)
 
         return utilisateurs
 
+    def parcourir_utilisateurs(self, taille_lot=100):
+        """
+        Variante paresseuse de get_utilisateurs : les utilisateurs sont lus
+        par lots au fil du rendu, avec les seules colonnes affichées.
+
+        Yields:
+            dict: username, nom, prenom, a_photo, photo_hash et etat.
+        """
+        for i in self._parcourir("""SELECT username, nom, prenom,
+         photo_hash, etat FROM utilisateurs""",
+                                 taille_lot):
+            yield {
+                "username": i["username"],
+                "nom": i["nom"],
+                "prenom": i["prenom"],
+                "a_photo": i["photo_hash"] is not None,
+                "photo_hash": i["photo_hash"],
+                "etat": i["etat"]
+            }
+
     def get_info_utilisateurs(self, username):
         """
         Cette méthode retourne les informations d'un utilisateurs.
@@ -297,34 +1122,54 @@ class Database:
         Returns:
             dictionnaire avec les informations
         """
+        resume = cache.auteurs.get(username, _ABSENT)
+        if resume is not _ABSENT:
+            return resume
+        version = cache.version_auteurs()
         connexion = self.get_connexion()
         curseur = connexion.cursor()
-        curseur.execute("""SELECT * FROM utilisateurs
+        curseur.execute("""SELECT username, nom, prenom,
+         photo_hash, etat FROM utilisateurs
          WHERE username=?""", (username,))
-        user = curseur.fetchone()
-        if user is None:
+        resume = resume_auteur(curseur.fetchone())
+        cache.definir_auteur(username, resume, version)
+        return resume
+
+    def get_photo_profil(self, username, miniature=False):
+        """
+        Cette méthode retourne la photo de profil d'un utilisateur.
+
+        Args:
+            username (str): Le username
+            miniature (bool): Retourner la miniature de la photo.
+        Returns:
+            dict: hash, type et donnees de l'image, et version (le hash
+            de la photo, même pour sa miniature), ou None s'il n'y en
+            a pas.
+        """
+        cle = "o.miniature" if miniature else "o.hash"
+        curseur = self.get_connexion().cursor()
+        curseur.execute(f"""SELECT o.hash AS version, p.hash, p.type,
+         p.donnees
+         FROM utilisateurs u JOIN photos o ON o.hash = u.photo_hash
+         JOIN photos p ON p.hash = {cle} WHERE u.username=?""", (username,))
+        photo = curseur.fetchone()
+        if photo is None:
             return None
-        else:
-            return {
-                "username": user["username"],
-                "nom": user["nom"],
-                "prenom": user["prenom"],
-                "photo_profil":
-                    base64.b64encode(user["photo_profil"]).decode("utf-8")
-                    if user["photo_profil"] else None,
-                "etat": user["etat"]
-            }
+        return {"hash": photo["hash"], "version": photo["version"],
+                "type": photo["type"], "donnees": bytes(photo["donnees"])}
 
     def get_derniers_articles(self):
         """
-        Cette méthode retournes les 5 derniers articles en date du jour.
+        Cette méthode retournes les 5 derniers articles en date du jour,
+        avec leur extrait (le contenu n'est pas lu).
         """
         articles = []
         curseur = self.get_connexion().cursor()
 
         curseur.execute("""SELECT id, titre, identifiant, auteur,
-         date_publication, contenu FROM articles WHERE date_publication
-          <= DATE('now')
+         date_publication, extrait, temps_lecture FROM articles
+          WHERE date_publication <= DATE('now')
           ORDER BY date_publication DESC LIMIT 5;""")
 
         for i in curseur.fetchall():
@@ -333,8 +1178,9 @@ class Database:
                 "titre": i["titre"],
                 "identifiant": i["identifiant"],
                 "auteur": i["auteur"],
-                "date_publicaiton": i["date_publication"],
-                "contenu": i["contenu"]
+                "date_publication": i["date_publication"],
+                "extrait": i["extrait"],
+                "temps_lecture": i["temps_lecture"]
             }
             articles.append(article)
 
@@ -361,47 +1207,233 @@ class Database:
                 "contenu": article["contenu"]
             }
 
-    def rechercher_article(self, recherche):
+    def get_article_et_auteur(self, identifiant_article):
         """
-        Cette méthode retourne tous les articles qui répondent à la recherche.
+        Cette méthode retourne un article et le résumé de son auteur
+        (voir get_info_utilisateurs). Si le résumé de l'auteur connu de
+        l'article est en cache, seul l'article est lu ; sinon l'article
+        et son auteur sont lus ensemble, et le résumé mis en cache.
+
+        Returns:
+            tuple: (article, résumé de l'auteur ou None), ou None si
+            l'article n'existe pas.
         """
-        articles = []
+        auteur = cache.auteurs_articles.get(identifiant_article)
+        resume = (_ABSENT if auteur is None
+                  else cache.auteurs.get(auteur, _ABSENT))
+        curseur = self.get_connexion().cursor()
+        if resume is _ABSENT:
+            version = cache.version_auteurs()
+            curseur.execute("""SELECT a.titre, a.identifiant, a.auteur,
+             a.date_publication, a.contenu, u.username, u.nom, u.prenom,
+             u.photo_hash, u.etat
+             FROM articles a LEFT JOIN utilisateurs u ON u.username = a.auteur
+             WHERE a.identifiant=?""", (identifiant_article,))
+            ligne = curseur.fetchone()
+            if ligne is None:
+                return None
+            resume = resume_auteur(
+                ligne if ligne["username"] is not None else None)
+            cache.definir_auteur(ligne["auteur"], resume, version)
+        else:
+            curseur.execute("""SELECT titre, identifiant, auteur,
+             date_publication, contenu FROM articles
+             WHERE identifiant=?""", (identifiant_article,))
+            ligne = curseur.fetchone()
+            if ligne is None:
+                return None
+            if ligne["auteur"] != auteur:
+                # L'article a changé d'auteur depuis
+                resume = self.get_info_utilisateurs(ligne["auteur"])
+        cache.auteurs_articles.definir(identifiant_article, ligne["auteur"])
+
+        article = {
+            "titre": ligne["titre"],
+            "identifiant": ligne["identifiant"],
+            "auteur": ligne["auteur"],
+            "date_publication": ligne["date_publication"],
+            "contenu": ligne["contenu"]
+        }
+        return article, resume
+
+    def get_version_article(self, identifiant_article):
+        """
+        Cette méthode retourne ce qui identifie la version affichée d'un
+        article : sa révision, la génération des utilisateurs (le résumé de
+        l'auteur) et la date de la dernière de ces modifications.
+
+        Returns:
+            tuple: (revision, generation_utilisateurs, date_modification),
+            ou None si l'article n'existe pas.
+        """
+        curseur = self.get_connexion().cursor()
+        curseur.execute("""SELECT a.revision, g.valeur,
+         MAX(COALESCE(a.date_modification, ''), g.date_modification)
+         FROM articles a, generations g
+         WHERE a.identifiant=? AND g.domaine='utilisateurs'""",
+                        (identifiant_article,))
+        version = curseur.fetchone()
+        return None if version is None else tuple(version)
+
+    def get_revisions_publiees(self):
+        """
+        Cette méthode retourne la révision et la date de publication de
+        chaque article publié (date de publication atteinte).
 
+        Returns:
+            dict: identifiant -> (revision, date_publication)
+        """
         curseur = self.get_connexion().cursor()
+        curseur.execute("""SELECT identifiant, revision, date_publication
+         FROM articles WHERE date_publication <= DATE('now')""")
+        return {ligne["identifiant"]: (ligne["revision"],
+                                       ligne["date_publication"])
+                for ligne in curseur.fetchall()}
 
-        recherche = f"%{recherche.lower()}%"
+    def get_generations(self):
+        """
+        Cette méthode retourne les générations du contenu : chaque écriture
+        dans une table incrémente la génération de son domaine.
 
-        curseur.execute("""SELECT * FROM articles
-             WHERE LOWER(titre) LIKE ?
-                OR LOWER(auteur) LIKE ?
-                OR LOWER(contenu) LIKE ?
-                ORDER BY date_publication DESC
-                """, (recherche, recherche, recherche))
+        Returns:
+            dict: domaine -> (valeur, date_modification)
+        """
+        curseur = self.get_connexion().cursor()
+        curseur.execute("""SELECT domaine, valeur, date_modification
+         FROM generations""")
+        return {ligne["domaine"]: (ligne["valeur"],
+                                   ligne["date_modification"])
+                for ligne in curseur.fetchall()}
+
+    def rechercher_article(self, recherche, apres=None, avant=None,
+                           limite=TAILLE_PAGE, delai=None):
+        """
+        Cette méthode retourne une page des articles qui répondent à la
+        recherche, du plus pertinent au moins pertinent (BM25). Chaque article
+        contient un extrait où les termes trouvés sont entourés de
+        DEBUT_SURLIGNAGE et FIN_SURLIGNAGE.
+
+        Les pages sont gardées dans cache.recherches, par requête FTS5 (la
+        casse et la ponctuation de la saisie n'y comptent pas) et
+        pagination, jusqu'à la prochaine écriture d'article.
+
+        Args:
+            recherche (str): La saisie de l'utilisateur.
+            apres (str): Curseur « suivant » d'une page précédente.
+            avant (str): Curseur « précédent » d'une page précédente.
+            limite (int): Le nombre d'articles par page.
+            delai (float): Le temps maximal passé dans SQLite, en secondes.
+        Returns:
+            dict: "articles", et les curseurs "suivant" et "precedent".
+        Raises:
+            DelaiDepasse: La recherche a dépassé `delai`.
+        """
+        cle = cle_recherche(recherche, apres, avant, limite)
+        if cle is None:
+            return {"articles": [], "suivant": None, "precedent": None}
+        resultat = cache.get_recherche(cle)
+        if resultat is not None:
+            return resultat
+        requete, limite = cle[0], cle[3]
+        version = cache.version_articles()
 
-        for article in curseur.fetchall():
+        connexion = self.get_connexion()
+        if delai is not None:
+            # SQLite appelle le gestionnaire toutes les 1000 instructions
+            # de sa machine virtuelle ; une valeur vraie interrompt
+            fin = time.monotonic() + delai
+            connexion.set_progress_handler(lambda: time.monotonic() > fin,
+                                           1000)
+        try:
+            resultat = self._rechercher(connexion.cursor(), requete,
+                                        decoder_curseur(apres),
+                                        decoder_curseur(avant), limite)
+        except sqlite3.OperationalError as e:
+            if delai is not None and time.monotonic() > fin:
+                raise DelaiDepasse(
+                    f"Recherche interrompue après {delai} s") from e
+            raise
+        finally:
+            if delai is not None:
+                connexion.set_progress_handler(None, 0)
+
+        # Taille estimée : les textes dominent
+        octets = len(requete) + sum(len(valeur or "")
+                                    for article in resultat["articles"]
+                                    for valeur in article.values())
+        cache.definir_recherche(cle, resultat, version, octets)
+        return resultat
+
+    def _rechercher(self, curseur, requete, apres, avant, limite):
+        # 1. Sélectionner les identifiants de la page selon leur rang BM25
+        #    (poids : titre > auteur > contenu), sans lire les contenus,
+        #    parmi les RESULTATS_RECHERCHE_MAX articles les plus récents.
+        classement = """SELECT id, rang FROM (
+             SELECT rowid AS id, bm25(articles_fts, 10.0, 5.0, 1.0) AS rang
+             FROM articles_fts WHERE articles_fts MATCH ?
+             ORDER BY rowid DESC LIMIT ?)"""
+        parametres = (requete, RESULTATS_RECHERCHE_MAX)
+        if avant is not None:
+            curseur.execute(classement + """
+             WHERE (rang, id) < (?, ?)
+             ORDER BY rang DESC, id DESC LIMIT ?""",
+                            (*parametres, *avant, limite + 1))
+        elif apres is not None:
+            curseur.execute(classement + """
+             WHERE (rang, id) > (?, ?)
+             ORDER BY rang ASC, id ASC LIMIT ?""",
+                            (*parametres, *apres, limite + 1))
+        else:
+            curseur.execute(classement + """
+             ORDER BY rang ASC, id ASC LIMIT ?""",
+                            (*parametres, limite + 1))
+
+        page = construire_page(curseur.fetchall(), limite,
+                               lambda i: (i["rang"], i["id"]), apres, avant)
+        ids = [i["id"] for i in page["lignes"]]
+        if not ids:
+            return {"articles": [], "suivant": None, "precedent": None}
+
+        # 2. Lire les articles de la page et leurs extraits surlignés (le
+        #    contenu n'est lu que par snippet, qui n'en garde qu'un passage)
+        marques = ", ".join("?" * len(ids))
+        curseur.execute(f"""SELECT a.id, a.titre, a.identifiant, a.auteur,
+             a.date_publication,
+             snippet(articles_fts, -1, ?, ?, '…', 16) AS surlignage
+             FROM articles_fts JOIN articles a ON a.id = articles_fts.rowid
+             WHERE articles_fts MATCH ? AND articles_fts.rowid IN ({marques})
+             """, (DEBUT_SURLIGNAGE, FIN_SURLIGNAGE, requete, *ids))
+        lignes = {i["id"]: i for i in curseur.fetchall()}
+
+        articles = []
+        for article in (lignes[i] for i in ids if i in lignes):
             article = {
                 "titre": article["titre"],
                 "identifiant": article["identifiant"],
                 "auteur": article["auteur"],
                 "date_publication": article["date_publication"],
-                "contenu": article["contenu"]
+                "surlignage": article["surlignage"]
             }
             articles.append(article)
 
-        return articles
+        return {"articles": articles, "suivant": page["suivant"],
+                "precedent": page["precedent"]}
 
     def modifier_article(self, identifiant_courant, nouveau_titre,
                          nouveau_identifiant, nouveau_contenu):
         """
         Cette méthode permet de modifier le contenu d'un article.
         """
-        connexion = self.get_connexion()
-        curseur = connexion.cursor()
-        curseur.execute("""UPDATE articles SET titre=?, identifiant=?,
-         contenu=? WHERE identifiant=?""",
-                        (nouveau_titre, nouveau_identifiant,
-                         nouveau_contenu, identifiant_courant))
-        connexion.commit()
+        self._ecrire(lambda connexion: connexion.execute(
+            """UPDATE articles SET titre=?, identifiant=?,
+         contenu=?, extrait=?, nombre_mots=?, temps_lecture=?,
+         revision=revision + 1, date_modification=DATETIME('now')
+         WHERE identifiant=?""",
+            (nouveau_titre, nouveau_identifiant, nouveau_contenu,
+             *resumer_contenu(nouveau_contenu), identifiant_courant)))
+        autocompletion.article_modifie(identifiant_courant,
+                                       nouveau_identifiant, nouveau_titre)
+        cache.article_modifie(identifiant_courant, nouveau_identifiant)
 
     def changer_etat_utilisateur(self, username, nouvel_etat):
         """
@@ -409,18 +1441,206 @@ class Database:
         1 = activé
         0 = désactivé
         """
-        connexion = self.get_connexion()
-        curseur = connexion.cursor()
-        curseur.execute("""UPDATE utilisateurs SET etat = ?
-         WHERE username = ?""", (nouvel_etat, username))
-        connexion.commit()
+        self._ecrire(lambda connexion: connexion.execute(
+            """UPDATE utilisateurs SET etat = ?
+         WHERE username = ?""", (nouvel_etat, username)))
+        # Les sessions de ce compte doivent être revérifiées
+        cache.sessions.supprimer_si(lambda cle, valeur: valeur == username)
+        cache.auteur_modifie(username)
 
     def supprimer_article(self, identifiant):
         """
         Cette méthode permet de supprimer un article de la bd.
         """
+        self._ecrire(lambda connexion: connexion.execute(
+            """DELETE FROM articles
+         WHERE identifiant = ?""", (identifiant,)))
+        cache.article_modifie(identifiant)
+        autocompletion.article_supprime(identifiant)
+
+    def _inserer_par_lots(self, requete, lignes, taille_lot, strict,
+                          preparer=None):
+        """
+        Insère les lignes par lots de `taille_lot` avec executemany, le tout
+        dans une seule transaction. Un lot refusé par la base est repris
+        ligne par ligne pour isoler les lignes fautives.
+
+        Args:
+            requete (str): L'INSERT à exécuter.
+            lignes (iterable): Les (numéro, valeurs ou None, erreur ou None).
+            strict (bool): Annuler tout l'import à la première erreur.
+            preparer (callable): preparer(connexion, valeurs) retourne les
+                valeurs de l'INSERT ; ses écritures sont annulées avec la
+                ligne (ou le lot) refusée.
+        Returns:
+            tuple: (nombre de lignes insérées, liste des (numéro, erreur))
+        """
         connexion = self.get_connexion()
-        curseur = connexion.cursor()
-        curseur.execute("""DELETE FROM articles
-         WHERE identifiant = ?""", (identifiant,))
+        inserees = 0
+        erreurs = []
+
+        def valeurs_inserees(valeurs):
+            if preparer is None:
+                return valeurs
+            return preparer(connexion, valeurs)
+
+        def inserer(lot):
+            nonlocal inserees
+            connexion.execute("SAVEPOINT lot")
+            try:
+                connexion.executemany(
+                    requete, [valeurs_inserees(v) for _, v in lot])
+                inserees += len(lot)
+            except sqlite3.IntegrityError:
+                connexion.execute("ROLLBACK TO lot")
+                for numero, valeurs in lot:
+                    connexion.execute("SAVEPOINT ligne")
+                    try:
+                        connexion.execute(requete, valeurs_inserees(valeurs))
+                        inserees += 1
+                    except sqlite3.IntegrityError as e:
+                        connexion.execute("ROLLBACK TO ligne")
+                        erreurs.append((numero, str(e)))
+                    connexion.execute("RELEASE ligne")
+            connexion.execute("RELEASE lot")
+
+        connexion.execute("BEGIN")
+        try:
+            lot = []
+            for numero, valeurs, erreur in lignes:
+                if erreur is not None:
+                    erreurs.append((numero, erreur))
+                else:
+                    lot.append((numero, valeurs))
+                if strict and erreurs:
+                    break
+                if len(lot) >= taille_lot:
+                    inserer(lot)
+                    lot = []
+            if lot and not (strict and erreurs):
+                inserer(lot)
+        except Exception:
+            connexion.rollback()
+            raise
+        if strict and erreurs:
+            connexion.rollback()
+            return 0, erreurs
         connexion.commit()
+        return inserees, erreurs
+
+    def importer_articles(self, lignes, taille_lot=1000, strict=False):
+        """
+        Cette méthode ajoute des articles en masse (voir transfert.py).
+
+        Args:
+            lignes (iterable): Les (numéro, (titre, identifiant, auteur,
+                date_publication, contenu) ou None, erreur ou None).
+        Returns:
+            tuple: (nombre d'articles ajoutés, liste des (numéro, erreur))
+        """
+        def avec_extraits():
+            for numero, valeurs, erreur in lignes:
+                if valeurs is not None:
+                    valeurs = (*valeurs, *resumer_contenu(valeurs[-1]))
+                yield numero, valeurs, erreur
+
+        resultat = self._inserer_par_lots(
+            """INSERT INTO articles(titre, identifiant, auteur,
+             date_publication, contenu, extrait, nombre_mots, temps_lecture,
+             date_modification)
+             VALUES (?, ?, ?, ?, ?, ?, ?, ?, DATETIME('now'))""",
+            avec_extraits(), taille_lot, strict)
+        cache.article_modifie()
+        return resultat
+
+    def importer_utilisateurs(self, lignes, taille_lot=1000, strict=False):
+        """
+        Cette méthode ajoute des utilisateurs en masse (voir transfert.py).
+
+        Args:
+            lignes (iterable): Les (numéro, (username, password_hash, salt,
+                nom, prenom, photo_profil, etat) ou None, erreur ou None),
+                où photo_profil est (image, miniature) ou None.
+        Returns:
+            tuple: (nombre d'utilisateurs ajoutés, liste des (numéro, erreur))
+        """
+        def avec_photo(connexion, valeurs):
+            # Dans le SAVEPOINT de l'utilisateur : la photo d'une ligne
+            # refusée n'est pas gardée
+            *champs, photo_profil, etat = valeurs
+            photo_hash = (enregistrer_photo(connexion, *photo_profil)
+                          if photo_profil else None)
+            return (*champs, photo_hash, etat)
+
+        resultat = self._inserer_par_lots(
+            """INSERT INTO utilisateurs(username, password_hash, salt, nom,
+             prenom, photo_hash, etat) VALUES (?, ?, ?, ?, ?, ?, ?)""",
+            lignes, taille_lot, strict, preparer=avec_photo)
+        cache.auteur_modifie()
+        return resultat
+
+    def _parcourir(self, requete, taille_lot):
+        # Curseur dédié et fetchmany : la mémoire reste bornée à un lot
+        curseur = self.get_connexion().cursor()
+        curseur.execute(requete)
+        try:
+            while True:
+                lot = curseur.fetchmany(taille_lot)
+                if not lot:
+                    return
+                yield from lot
+        finally:
+            curseur.close()
+
+    def parcourir_titres(self, taille_lot=1000):
+        """
+        Cette méthode parcourt l'id, l'identifiant, le titre et la date de
+        publication de tous les articles (voir autocompletion.py).
+        """
+        return self._parcourir("""SELECT id, identifiant, titre,
+         date_publication FROM articles""", taille_lot)
+
+    def exporter_articles(self, taille_lot=1000):
+        """
+        Cette méthode parcourt tous les articles sans les charger
+        en mémoire d'un coup.
+
+        Yields:
+            dict: Un article.
+        """
+        for article in self._parcourir("""SELECT titre, identifiant, auteur,
+         date_publication, contenu FROM articles ORDER BY id""", taille_lot):
+            yield {
+                "titre": article["titre"],
+                "identifiant": article["identifiant"],
+                "auteur": article["auteur"],
+                "date_publication": article["date_publication"],
+                "contenu": article["contenu"]
+            }
+
+    def exporter_utilisateurs(self, avec_photos=False, taille_lot=100):
+        """
+        Cette méthode parcourt tous les utilisateurs sans les charger
+        en mémoire d'un coup. Les mots de passe sont exportés hachés.
+
+        Yields:
+            dict: Un utilisateur (photo en base64 si avec_photos).
+        """
+        photo = "p.donnees" if avec_photos else "NULL"
+        for i in self._parcourir(f"""SELECT u.username, u.password_hash,
+         u.salt, u.nom, u.prenom, {photo} AS photo_profil, u.etat
+         FROM utilisateurs u LEFT JOIN photos p ON p.hash = u.photo_hash
+         ORDER BY u.id""", taille_lot):
+            utilisateur = {
+                "username": i["username"],
+                "password_hash": i["password_hash"],
+                "salt": i["salt"],
+                "nom": i["nom"],
+                "prenom": i["prenom"],
+                "etat": i["etat"]
+            }
+            if avec_photos:
+                utilisateur["photo_profil"] = (
+                    base64.b64encode(i["photo_profil"]).decode("utf-8")
+                    if i["photo_profil"] else None)
+            yield utilisateur
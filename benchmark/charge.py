@@ -0,0 +1,381 @@
+import http.client
+import json
+import random
+import os
+import resource
+import sqlite3
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlencode
+
+from flask import url_for
+from werkzeug.serving import WSGIRequestHandler, make_server
+
+from .. import base_de_donnees
+from .. import cache
+from .. import migrations
+from .donnees import MOT_DE_PASSE
+
+
+class CompteurSQL:
+    """
+    Compte les requêtes SQL envoyées par les connexions du pool
+    (sans les sous-programmes ni les requêtes internes de FTS5).
+    """
+
+    def __init__(self):
+        self.total = 0
+        self._verrou = threading.Lock()
+
+    def __call__(self, requete):
+        if migrations.REQUETE_INTERNE.search(requete):
+            return
+        with self._verrou:
+            self.total += 1
+
+
+def _echantillon(chemin, graine):
+    """
+    Lit dans la base les identifiants utilisés pour construire les URL.
+    """
+    connexion = sqlite3.connect(chemin)
+    try:
+        identifiants = [ligne[0] for ligne in connexion.execute(
+            "SELECT identifiant FROM articles")]
+        usernames = [ligne[0] for ligne in connexion.execute(
+            "SELECT username FROM utilisateurs WHERE etat = 1")]
+        sessions = [ligne for ligne in connexion.execute(
+            """SELECT s.id_session, s.username FROM sessions s
+             JOIN utilisateurs u ON u.username = s.username
+             WHERE u.etat = 1""")]
+    finally:
+        connexion.close()
+    if not identifiants or not sessions:
+        raise ValueError("La base doit contenir des articles et des sessions "
+                         "(voir « flask bench generer »).")
+    aleatoire = random.Random(graine)
+    aleatoire.shuffle(identifiants)
+    return {
+        "identifiants": identifiants,
+        "usernames": usernames,
+        "session_admin": sessions[0][0],
+        # Sessions consommées par le scénario « deconnexion »
+        "sessions": [id_session for id_session, _ in sessions[1:]],
+        # Utilisateurs sans session, pour le scénario « connexion »
+        "sans_session": sorted(set(usernames)
+                               - {username for _, username in sessions}),
+    }
+
+
+# Statut HTTP attendu de chaque scénario : tout autre statut est compté
+# comme une erreur (une redirection vers /admin, par exemple, signale une
+# session refusée et une mesure sans intérêt)
+STATUTS_ATTENDUS = {
+    "accueil": 200,
+    "recherche": 200,
+    "article": 200,
+    "photo": 200,
+    "connexion_formulaire": 200,
+    "connexion": 302,
+    "liste_articles": 200,
+    "modifier_formulaire": 200,
+    "modifier": 302,
+    "ajout_formulaire": 200,
+    "ajout": 302,
+    "supprimer": 302,
+    "utilisateurs": 200,
+    "changer_etat": 302,
+    "ajout_utilisateur_formulaire": 200,
+    "ajout_utilisateur": 302,
+    "statistiques": 200,
+    "deconnexion": 302,
+}
+
+
+def scenarios(echantillon):
+    """
+    Retourne, pour chaque route de app.py, une fonction qui construit la
+    i-ème requête : (méthode, url, données de formulaire, session).
+    Doit être appelée dans un contexte de requête Flask (url_for).
+    """
+    ids = echantillon["identifiants"]
+    usernames = echantillon["usernames"]
+    admin = echantillon["session_admin"]
+    sessions = echantillon["sessions"]
+    sans_session = echantillon["sans_session"] or usernames
+    mots = ["ville", "école", "énergie", "histoire", "données", "art"]
+    # Articles créés puis supprimés pendant la mesure
+    prefixe = f"bench-nouveau-{int(time.time())}"
+    cible_etat = usernames[-1]
+
+    return {
+        "accueil": lambda i: ("GET", url_for("page_acceuil"), None, None),
+        "recherche": lambda i: (
+            "GET", url_for("rechercher", q=mots[i % len(mots)]), None, None),
+        "article": lambda i: (
+            "GET", url_for("page_article", identifiant=ids[i % len(ids)]),
+            None, None),
+        "photo": lambda i: (
+            "GET", url_for("photo_profil",
+                           username=usernames[i % len(usernames)]),
+            None, None),
+        "connexion_formulaire": lambda i: (
+            "GET", url_for("admin"), None, None),
+        "connexion": lambda i: (
+            "POST", url_for("admin"),
+            {"username": sans_session[i % len(sans_session)],
+             "password": MOT_DE_PASSE}, None),
+        "liste_articles": lambda i: (
+            "GET", url_for("page_articles"), None, admin),
+        "modifier_formulaire": lambda i: (
+            "GET", url_for("modifier_article", identifiant=ids[i % len(ids)]),
+            None, admin),
+        "modifier": lambda i: (
+            "POST", url_for("modifier_article", identifiant=ids[i % len(ids)]),
+            {"titre": f"Titre modifié {i}", "identifiant": ids[i % len(ids)],
+             "contenu": f"Contenu modifié {i}"}, admin),
+        "ajout_formulaire": lambda i: (
+            "GET", url_for("page_ajout_admin"), None, admin),
+        "ajout": lambda i: (
+            "POST", url_for("page_ajout_admin"),
+            {"titre": f"Nouveau {i}", "identifiant": f"{prefixe}-{i}",
+             "date_publication": "2020-01-01", "contenu": f"Contenu {i}"},
+            admin),
+        "supprimer": lambda i: (
+            "POST", url_for("supprimer_article", identifiant=f"{prefixe}-{i}"),
+            None, admin),
+        "utilisateurs": lambda i: (
+            "GET", url_for("page_utilisateurs"), None, admin),
+        "changer_etat": lambda i: (
+            "POST", url_for("changer_etat_utilisateur", username=cible_etat),
+            {"etat": str(i % 2)}, admin),
+        "ajout_utilisateur_formulaire": lambda i: (
+            "GET", url_for("page_ajout_utilisateur"), None, admin),
+        "ajout_utilisateur": lambda i: (
+            "POST", url_for("page_ajout_utilisateur"),
+            {"username": f"{prefixe}-u{i}", "password": MOT_DE_PASSE,
+             "prenom": "bench", "nom": "bench"}, admin),
+        "statistiques": lambda i: (
+            "GET", url_for("statistiques"), None, admin),
+        "deconnexion": lambda i: (
+            "GET", url_for("logout"), None,
+            sessions[i] if i < len(sessions) else None),
+    }
+
+
+def _client_flask(app):
+    def envoyer(methode, url, donnees, id_session):
+        client = app.test_client()
+        if id_session:
+            client.set_cookie("id_session", id_session)
+        # Un contexte d'application neuf par requête, comme en production :
+        # sinon la requête reprend celui qui est déjà actif (celui de la
+        # commande flask), avec son g, et teardown_appcontext ne rend
+        # jamais la connexion au pool
+        with app.app_context():
+            return client.open(url, method=methode, data=donnees).status_code
+    return envoyer, lambda: None
+
+
+class _GestionnaireSilencieux(WSGIRequestHandler):
+    def log_request(self, *args, **kwargs):
+        pass
+
+
+def _client_http(app):
+    serveur = make_server("127.0.0.1", 0, app, threaded=True,
+                          request_handler=_GestionnaireSilencieux)
+    fil = threading.Thread(target=serveur.serve_forever, daemon=True)
+    fil.start()
+
+    def envoyer(methode, url, donnees, id_session):
+        connexion = http.client.HTTPConnection("127.0.0.1", serveur.port)
+        entetes = {}
+        corps = None
+        if id_session:
+            entetes["Cookie"] = f"id_session={id_session}"
+        if donnees is not None:
+            corps = urlencode(donnees)
+            entetes["Content-Type"] = "application/x-www-form-urlencoded"
+        try:
+            connexion.request(methode, url, body=corps, headers=entetes)
+            reponse = connexion.getresponse()
+            reponse.read()
+            return reponse.status
+        finally:
+            connexion.close()
+    return envoyer, serveur.shutdown
+
+
+def _centile(durees, centile):
+    if not durees:
+        return None
+    rang = max(int(round(centile / 100 * len(durees))) - 1, 0)
+    return durees[min(rang, len(durees) - 1)]
+
+
+def executer(app, chemin, mode="flask", requetes=200, fils=1,
+             routes=None, graine=0):
+    """
+    Cette fonction mesure chaque route de l'application sur une copie
+    jetable de la base `chemin` (les scénarios d'écriture la modifient),
+    une route après l'autre.
+
+    Args:
+        app (Flask): L'application.
+        mode (str): "flask" (client de test) ou "http" (serveur multifil).
+        requetes (int): Le nombre de requêtes par route.
+        fils (int): Le nombre de clients concurrents.
+        routes (list): Les scénarios à mesurer (par défaut tous).
+    Returns:
+        dict: Les mesures par route et la description de l'exécution.
+    """
+    with tempfile.TemporaryDirectory(prefix="bench-") as dossier:
+        copie = os.path.join(dossier, os.path.basename(chemin))
+        _copier(chemin, copie)
+        resultats = _mesurer(app, copie, mode, requetes, fils, routes, graine)
+
+    return {
+        "description": {
+            "base": chemin,
+            "mode": mode,
+            "requetes": requetes,
+            "fils": fils,
+            "date": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        "routes": resultats,
+    }
+
+
+def _copier(source, destination):
+    # backup() : copie cohérente, même d'une base en mode WAL
+    origine = sqlite3.connect(source)
+    copie = sqlite3.connect(destination)
+    try:
+        origine.backup(copie)
+    finally:
+        copie.close()
+        origine.close()
+
+
+def _mesurer(app, chemin, mode, requetes, fils, routes, graine):
+    pool = base_de_donnees.get_pool()
+    ecrivain = base_de_donnees.get_ecrivain()
+    compteur = CompteurSQL()
+    base_de_donnees.ajouter_traceur(compteur)
+    base_de_donnees.configurer_pool(chemin=chemin,
+                                    taille=app.config["BD_TAILLE_POOL"])
+    migrations.migrer(chemin)
+    if ecrivain is not None:
+        base_de_donnees.configurer_ecrivain(chemin=chemin,
+                                            latence=ecrivain.latence,
+                                            taille_lot=ecrivain.taille_lot)
+    _vider_caches()
+
+    echantillon = _echantillon(chemin, graine)
+    with app.test_request_context():
+        tous = scenarios(echantillon)
+        noms = routes or list(tous)
+        specs = {nom: [tous[nom](i) for i in range(requetes)]
+                 for nom in noms}
+
+    envoyer, arreter = (_client_http if mode == "http" else _client_flask)(app)
+    resultats = {}
+    try:
+        for nom in noms:
+            durees = []
+            erreurs = 0
+            statuts = {}
+            verrou = threading.Lock()
+
+            def mesurer(spec):
+                nonlocal erreurs
+                debut = time.perf_counter()
+                statut = envoyer(*spec)
+                duree = time.perf_counter() - debut
+                with verrou:
+                    durees.append(duree)
+                    statuts[statut] = statuts.get(statut, 0) + 1
+                    if statut != STATUTS_ATTENDUS.get(nom, 200):
+                        erreurs += 1
+
+            sql_avant = compteur.total
+            debut = time.perf_counter()
+            if fils > 1:
+                with ThreadPoolExecutor(max_workers=fils) as executeur:
+                    list(executeur.map(mesurer, specs[nom]))
+            else:
+                for spec in specs[nom]:
+                    mesurer(spec)
+            total = time.perf_counter() - debut
+
+            durees.sort()
+            resultats[nom] = {
+                "requetes": len(durees),
+                "erreurs": erreurs,
+                "statuts": {str(statut): nombre
+                            for statut, nombre in sorted(statuts.items())},
+                "debit": len(durees) / total if total else None,
+                "p50_ms": _centile(durees, 50) * 1000,
+                "p95_ms": _centile(durees, 95) * 1000,
+                "p99_ms": _centile(durees, 99) * 1000,
+                "sql_par_requete": (compteur.total - sql_avant) / len(durees),
+                # Pic de mémoire du processus depuis son démarrage
+                "rss_max_ko": resource.getrusage(
+                    resource.RUSAGE_SELF).ru_maxrss,
+            }
+    finally:
+        arreter()
+        base_de_donnees.retirer_traceur(compteur)
+        # Rendre à l'application sa base avant d'effacer la copie
+        if ecrivain is not None:
+            base_de_donnees.configurer_ecrivain(
+                chemin=ecrivain.chemin, latence=ecrivain.latence,
+                taille_lot=ecrivain.taille_lot)
+        base_de_donnees.configurer_pool(chemin=pool.chemin, taille=pool.taille)
+        _vider_caches()
+    return resultats
+
+
+def _vider_caches():
+    cache.sessions.vider()
+    cache.pages.vider()
+    cache.auteurs.vider()
+    cache.auteurs_articles.vider()
+    cache.recherches.vider()
+    cache.compressions.vider()
+
+
+def comparer(actuel, reference, tolerance=0.2):
+    """
+    Cette fonction compare deux exécutions et retourne les régressions :
+    p95 ou requêtes SQL en hausse, ou débit en baisse, de plus de
+    `tolerance` (20 % par défaut).
+    """
+    regressions = []
+    for nom, mesures in actuel["routes"].items():
+        avant = reference["routes"].get(nom)
+        if avant is None:
+            continue
+        for cle, sens in (("p95_ms", 1), ("sql_par_requete", 1),
+                          ("debit", -1)):
+            if not avant.get(cle) or mesures.get(cle) is None:
+                continue
+            ecart = (mesures[cle] - avant[cle]) / avant[cle]
+            if ecart * sens > tolerance:
+                regressions.append(
+                    f"{nom} : {cle} {avant[cle]:.2f} -> {mesures[cle]:.2f} "
+                    f"({ecart:+.0%})")
+    return regressions
+
+
+def enregistrer(resultats, chemin):
+    with open(chemin, "w", encoding="utf-8") as fichier:
+        json.dump(resultats, fichier, indent=2, ensure_ascii=False)
+
+
+def charger(chemin):
+    with open(chemin, encoding="utf-8") as fichier:
+        return json.load(fichier)
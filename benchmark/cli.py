@@ -0,0 +1,74 @@
+import click
+from flask.cli import AppGroup, pass_script_info
+
+from . import charge
+from . import donnees
+
+bench = AppGroup("bench", help="Base synthétique et mesures de charge.")
+
+
+@bench.command("generer")
+@click.argument("chemin", type=click.Path(dir_okay=False))
+@click.option("--articles", default=100000, show_default=True)
+@click.option("--utilisateurs", default=1000, show_default=True)
+@click.option("--sessions", default=10000, show_default=True)
+@click.option("--taille-photo", default=20000, show_default=True,
+              help="Taille de chaque photo de profil, en octets.")
+@click.option("--graine", default=0, show_default=True)
+def generer(chemin, articles, utilisateurs, sessions, taille_photo, graine):
+    """Crée une base synthétique dans CHEMIN."""
+    lignes = donnees.generer_base(chemin, articles=articles,
+                                  utilisateurs=utilisateurs,
+                                  sessions=sessions,
+                                  taille_photo=taille_photo, graine=graine)
+    print(", ".join(f"{nombre} {table}" for table, nombre in lignes.items()))
+
+
+# Chaque requête mesurée a son propre contexte d'application (voir
+# charge._client_flask), pas celui de la commande
+@bench.command("executer")
+@click.argument("chemin", type=click.Path(exists=True, dir_okay=False))
+@click.option("--mode", type=click.Choice(["flask", "http"]),
+              default="flask", show_default=True)
+@click.option("--requetes", default=200, show_default=True,
+              help="Nombre de requêtes par route.")
+@click.option("--fils", default=1, show_default=True,
+              help="Nombre de clients concurrents.")
+@click.option("--route", "routes", multiple=True,
+              help="Scénario à mesurer (répétable, tous par défaut).")
+@click.option("--sortie", type=click.Path(dir_okay=False),
+              help="Fichier JSON où enregistrer les mesures.")
+@click.option("--reference", type=click.Path(exists=True, dir_okay=False),
+              help="Mesures JSON de référence à comparer.")
+@click.option("--tolerance", default=0.2, show_default=True)
+@pass_script_info
+def executer(info, chemin, mode, requetes, fils, routes, sortie, reference,
+             tolerance):
+    """Mesure chaque route de l'application sur une copie de la base
+    CHEMIN."""
+    resultats = charge.executer(info.load_app(), chemin,
+                                mode=mode, requetes=requetes, fils=fils,
+                                routes=list(routes) or None)
+
+    print(f"{'route':<30}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}"
+          f"{'p99 ms':>9}{'sql/req':>9}{'erreurs':>9}")
+    for nom, mesures in resultats["routes"].items():
+        print(f"{nom:<30}{mesures['debit']:>9.1f}{mesures['p50_ms']:>9.2f}"
+              f"{mesures['p95_ms']:>9.2f}{mesures['p99_ms']:>9.2f}"
+              f"{mesures['sql_par_requete']:>9.1f}{mesures['erreurs']:>9}")
+    for nom, mesures in resultats["routes"].items():
+        if mesures["erreurs"]:
+            print(f"{nom} : statuts {mesures['statuts']}, attendu "
+                  f"{charge.STATUTS_ATTENDUS.get(nom, 200)}")
+    rss = max(m["rss_max_ko"] for m in resultats["routes"].values())
+    print(f"Pic de mémoire (RSS) : {rss} Ko")
+
+    if sortie:
+        charge.enregistrer(resultats, sortie)
+    if reference:
+        regressions = charge.comparer(resultats, charge.charger(reference),
+                                      tolerance)
+        for regression in regressions:
+            print(f"Régression : {regression}")
+        if regressions:
+            raise SystemExit(1)
@@ -0,0 +1,109 @@
+import hashlib
+import os
+import random
+import sqlite3
+import time
+import uuid
+from datetime import date, timedelta
+
+from .. import base_de_donnees
+from .. import images
+from .. import migrations
+
+# Mot de passe de tous les utilisateurs générés (bench0, bench1, ...)
+MOT_DE_PASSE = "motdepasse"
+
+_MOTS = """le la les un une des et en du au aux pour par sur dans avec
+article société histoire science école été économie énergie réseau ville
+culture politique santé numérique éducation français québec montréal
+recherche données environnement avenir développement projet étude monde
+technologie intelligence artificielle musique cinéma littérature sport
+""".split()
+
+
+def _texte(aleatoire, nombre_mots):
+    return " ".join(aleatoire.choice(_MOTS) for _ in range(nombre_mots))
+
+
+def _photo(aleatoire, taille):
+    # Signature JPEG suivie d'octets aléatoires : suffisant pour mesurer
+    # le transport des photos sans stocker de vraies images.
+    return b"\xff\xd8\xff\xe0" + aleatoire.randbytes(max(taille - 4, 0))
+
+
+def generer_base(chemin, articles=100000, utilisateurs=1000, sessions=10000,
+                 taille_photo=20000, graine=0, taille_lot=5000):
+    """
+    Cette fonction crée une base synthétique avec le schéma de
+    l'application (voir migrations.py).
+
+    Args:
+        chemin (str): Le fichier à créer (remplacé s'il existe).
+        articles (int): Le nombre d'articles.
+        utilisateurs (int): Le nombre d'utilisateurs, tous avec une photo.
+        sessions (int): Le nombre de sessions ouvertes.
+        taille_photo (int): La taille de chaque photo en octets.
+        graine (int): La graine aléatoire, pour des bases reproductibles.
+    Returns:
+        dict: Le nombre de lignes créées par table.
+    """
+    for suffixe in ("", "-wal", "-shm"):
+        if os.path.exists(chemin + suffixe):
+            os.remove(chemin + suffixe)
+    migrations.migrer(chemin)
+
+    aleatoire = random.Random(graine)
+    connexion = sqlite3.connect(chemin)
+    try:
+        lignes = []
+        for i in range(utilisateurs):
+            salt = uuid.UUID(int=aleatoire.getrandbits(128)).hex
+            password_hash = hashlib.sha512(
+                str(MOT_DE_PASSE + salt).encode("utf-8")).hexdigest()
+            # Pas une vraie image : elle est sa propre miniature
+            photo = images.empreinte(_photo(aleatoire, taille_photo))
+            lignes.append((f"bench{i}", password_hash, salt,
+                           _texte(aleatoire, 1).title(),
+                           _texte(aleatoire, 1).title(),
+                           base_de_donnees.enregistrer_photo(
+                               connexion, photo, photo)))
+        connexion.executemany("""INSERT INTO utilisateurs(username,
+         password_hash, salt, nom, prenom, photo_hash)
+         VALUES (?, ?, ?, ?, ?, ?)""", lignes)
+
+        # 5 % des articles sont publiés dans le futur
+        aujourdhui = date.today()
+        for debut in range(0, articles, taille_lot):
+            lignes = []
+            for i in range(debut, min(debut + taille_lot, articles)):
+                jours = aleatoire.randint(-3650, 180 if i % 20 == 0 else 0)
+                # Même ordre de tirages qu'avant l'ajout des extraits
+                titre = _texte(aleatoire,
+                               aleatoire.randint(4, 10)).capitalize()
+                auteur = f"bench{aleatoire.randrange(max(utilisateurs, 1))}"
+                contenu = _texte(aleatoire, aleatoire.randint(150, 600))
+                lignes.append((
+                    titre, f"article-{i}", auteur,
+                    (aujourdhui + timedelta(days=jours)).isoformat(),
+                    contenu, *base_de_donnees.resumer_contenu(contenu)))
+            connexion.executemany("""INSERT INTO articles(titre, identifiant,
+             auteur, date_publication, contenu, extrait, nombre_mots,
+             temps_lecture) VALUES (?, ?, ?, ?, ?, ?, ?, ?)""", lignes)
+            connexion.commit()
+
+        # Sessions réparties sur les utilisateurs, valides pendant 7 jours
+        if not utilisateurs:
+            sessions = 0
+        maintenant = int(time.time())
+        connexion.executemany("""INSERT INTO sessions(id_session, username,
+         date_creation, date_expiration) VALUES (?, ?, ?, ?)""",
+                              [(uuid.UUID(int=aleatoire.getrandbits(128)).hex,
+                                f"bench{i % utilisateurs}", maintenant,
+                                maintenant + 7 * 24 * 3600)
+                               for i in range(sessions)])
+        connexion.commit()
+    finally:
+        connexion.close()
+
+    return {"articles": articles, "utilisateurs": utilisateurs,
+            "sessions": sessions}
@@ -0,0 +1,252 @@
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+
+_ABSENT = object()
+
+
+class CacheLRU:
+    """
+    Cache en mémoire borné, partagé entre les fils d'exécution.
+
+    Quand le cache est plein (`taille_max` entrées, ou `octets_max`
+    octets pour les entrées dont la taille est donnée), l'entrée la moins
+    récemment utilisée est évincée. Chaque entrée peut expirer après `ttl`
+    secondes ou à une date précise (horloge time.time()).
+    """
+
+    def __init__(self, taille_max=1000, ttl=None, octets_max=None):
+        self.taille_max = taille_max
+        self.ttl = ttl
+        self.octets_max = octets_max
+        self._entrees = OrderedDict()
+        self._octets = {}
+        self._total_octets = 0
+        self._verrou = threading.Lock()
+        self._stats = {"succes": 0, "echecs": 0, "evictions": 0,
+                       "expirations": 0, "invalidations": 0}
+
+    def configurer(self, taille_max=None, ttl=None, octets_max=None):
+        with self._verrou:
+            if taille_max is not None:
+                self.taille_max = taille_max
+            if ttl is not None:
+                self.ttl = ttl
+            if octets_max is not None:
+                self.octets_max = octets_max
+            self._evincer()
+
+    def get(self, cle, defaut=None):
+        with self._verrou:
+            entree = self._entrees.get(cle, _ABSENT)
+            if entree is _ABSENT:
+                self._stats["echecs"] += 1
+                return defaut
+            valeur, expire_a = entree
+            if expire_a is not None and expire_a <= time.time():
+                self._retirer(cle)
+                self._stats["expirations"] += 1
+                self._stats["echecs"] += 1
+                return defaut
+            self._entrees.move_to_end(cle)
+            self._stats["succes"] += 1
+            return valeur
+
+    def definir(self, cle, valeur, ttl=None, expire_a=None, octets=0):
+        """
+        Ajoute ou remplace une entrée.
+
+        Args:
+            ttl (float): Durée de vie en secondes (par défaut self.ttl).
+            expire_a (float): Date d'expiration absolue, prioritaire sur ttl.
+            octets (int): La taille estimée de la valeur (voir octets_max).
+        """
+        if expire_a is None:
+            ttl = self.ttl if ttl is None else ttl
+            expire_a = time.time() + ttl if ttl is not None else None
+        with self._verrou:
+            self._retirer(cle)
+            self._entrees[cle] = (valeur, expire_a)
+            if octets:
+                self._octets[cle] = octets
+                self._total_octets += octets
+            self._evincer()
+
+    def _retirer(self, cle):
+        if self._entrees.pop(cle, _ABSENT) is _ABSENT:
+            return False
+        self._total_octets -= self._octets.pop(cle, 0)
+        return True
+
+    def supprimer(self, cle):
+        with self._verrou:
+            if self._retirer(cle):
+                self._stats["invalidations"] += 1
+
+    def supprimer_si(self, predicat):
+        """
+        Supprime toutes les entrées pour lesquelles predicat(cle, valeur)
+        est vrai.
+        """
+        with self._verrou:
+            cles = [cle for cle, (valeur, _) in self._entrees.items()
+                    if predicat(cle, valeur)]
+            for cle in cles:
+                self._retirer(cle)
+            self._stats["invalidations"] += len(cles)
+
+    def vider(self):
+        with self._verrou:
+            self._stats["invalidations"] += len(self._entrees)
+            self._entrees.clear()
+            self._octets.clear()
+            self._total_octets = 0
+
+    def _evincer(self):
+        while self._entrees and (
+                len(self._entrees) > self.taille_max
+                or (self.octets_max is not None
+                    and self._total_octets > self.octets_max)):
+            self._retirer(next(iter(self._entrees)))
+            self._stats["evictions"] += 1
+
+    def __len__(self):
+        return len(self._entrees)
+
+    def statistiques(self):
+        with self._verrou:
+            stats = dict(self._stats, taille=len(self._entrees),
+                         taille_max=self.taille_max,
+                         octets=self._total_octets,
+                         octets_max=self.octets_max)
+        demandes = stats["succes"] + stats["echecs"]
+        stats["taux_succes"] = stats["succes"] / demandes if demandes else 0.0
+        return stats
+
+
+# id_session -> username des sessions valides (compte actif)
+sessions = CacheLRU(taille_max=10000, ttl=60)
+
+# Pages publiques rendues, par route (et identifiant de l'article) :
+# (version, date de modification, page). La version identifie la page
+# (ETag) sans relire la base ; les écritures retirent les pages touchées.
+pages = CacheLRU(taille_max=500)
+
+# (ETag de la page, encodage) -> corps compressé (voir compression.py)
+compressions = CacheLRU(taille_max=1000)
+
+# Pages de résultats de recherche, par saisie normalisée et pagination,
+# bornées en mémoire. Vidées à chaque écriture d'article.
+recherches = CacheLRU(taille_max=1000, octets_max=16 * 1024 * 1024)
+
+# username -> résumé de l'auteur affiché avec ses articles (None : aucun
+# utilisateur de ce nom)
+auteurs = CacheLRU(taille_max=1000)
+
+# identifiant d'article -> username de son auteur : dit, avant de lire
+# l'article, si le résumé de l'auteur est en cache. Vérifié à la lecture.
+auteurs_articles = CacheLRU(taille_max=1000)
+
+# Incrémenté à chaque écriture d'article : une page rendue à partir d'une
+# version antérieure n'est pas mise en cache.
+_version_articles = 0
+_verrou_articles = threading.Lock()
+# Idem pour les résumés des auteurs, à chaque écriture d'utilisateur
+_version_auteurs = 0
+_verrou_auteurs = threading.Lock()
+
+
+def version_articles():
+    return _version_articles
+
+
+def article_modifie(*identifiants):
+    """
+    Invalide les pages qui affichent les articles donnés (tous les
+    articles sans argument), ainsi que la page d'accueil. Appelée après
+    chaque écriture dans articles.
+    """
+    global _version_articles
+    with _verrou_articles:
+        _version_articles += 1
+        recherches.vider()
+        pages.supprimer_si(
+            lambda cle, _: cle[0] == "accueil"
+            or (cle[0] == "article"
+                and (not identifiants or cle[1] in identifiants)))
+
+
+def version_auteurs():
+    return _version_auteurs
+
+
+def auteur_modifie(*usernames):
+    """
+    Invalide le résumé des auteurs donnés (de tous les auteurs sans
+    argument) et les pages d'article, qui affichent ce résumé. Appelée
+    après la création d'un utilisateur ou le changement de son état.
+    """
+    global _version_auteurs
+    with _verrou_auteurs:
+        _version_auteurs += 1
+        if usernames:
+            for username in usernames:
+                auteurs.supprimer(username)
+        else:
+            auteurs.vider()
+    pages.supprimer_si(lambda cle, _: cle[0] == "article")
+
+
+def definir_auteur(username, resume, version):
+    """
+    Met le résumé d'un auteur en cache si aucun utilisateur n'a été
+    modifié depuis `version`, c'est-à-dire pendant sa lecture.
+    """
+    with _verrou_auteurs:
+        if version == _version_auteurs:
+            auteurs.definir(username, resume)
+
+
+def definir_page(cle, page, version, expire_a=None, version_auteurs=None):
+    """
+    Met une page en cache si aucun article n'a été écrit depuis
+    `version`, c'est-à-dire pendant son rendu (ni aucun utilisateur depuis
+    `version_auteurs`, si elle est donnée).
+    """
+    with _verrou_articles:
+        if version == _version_articles and version_auteurs in (
+                None, _version_auteurs):
+            pages.definir(cle, page, expire_a=expire_a)
+
+
+def get_recherche(cle):
+    """
+    Retourne les résultats en cache pour `cle` s'ils ont été calculés
+    depuis la dernière écriture d'article (génération courante).
+    """
+    entree = recherches.get(cle)
+    if entree is None or entree[0] != _version_articles:
+        return None
+    return entree[1]
+
+
+def definir_recherche(cle, resultat, version, octets):
+    """
+    Met des résultats en cache si aucun article n'a été écrit depuis
+    `version`, c'est-à-dire pendant la recherche.
+    """
+    with _verrou_articles:
+        if version == _version_articles:
+            recherches.definir(cle, (version, resultat), octets=octets)
+
+
+def prochain_minuit():
+    """
+    Retourne l'horodatage du prochain minuit UTC, moment où
+    DATE('now') de SQLite change de valeur.
+    """
+    demain = datetime.now(timezone.utc).date() + timedelta(days=1)
+    minuit = datetime(demain.year, demain.month, demain.day,
+                      tzinfo=timezone.utc)
+    return minuit.timestamp()
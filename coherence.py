@@ -0,0 +1,143 @@
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime, timezone
+
+from . import base_de_donnees
+
+# Caches des autres processus : chaque écriture incrémente la génération
+# de son domaine (déclencheurs de la table generations). Une fois par
+# requête, verifier() lit PRAGMA data_version, qui change dès qu'une autre
+# connexion a validé une transaction, et, seulement dans ce cas, les
+# générations : les réactions des domaines modifiés vident les caches
+# locaux. Les écritures de ce processus, qui a déjà mis ses caches à jour,
+# sont ignorées.
+_reactions = {}
+_verrou = threading.Lock()
+# domaine -> {génération avant: génération après} des écritures de ce
+# processus (voir base_de_donnees.suivre_ecritures)
+_propres = {}
+_verrou_propres = threading.Lock()
+# Connexion propre au processus (rouverte après un fork)
+_etat = {"pid": None, "chemin": None, "connexion": None,
+         "data_version": None, "generations": None}
+_stats = {"verifications": 0, "lectures_generations": 0, "invalidations": {},
+          "ecritures_propres": 0, "retard_max_s": 0.0, "retard_total_s": 0.0,
+          "duree_max_ms": 0.0}
+
+
+def abonner(domaine, *fonctions):
+    """
+    Cette fonction enregistre les fonctions (sans argument) à appeler
+    quand la génération de `domaine` a changé dans un autre processus.
+    """
+    _reactions.setdefault(domaine, []).extend(fonctions)
+    base_de_donnees.suivre_ecritures(_noter_ecriture)
+
+
+def _noter_ecriture(avant, apres):
+    with _verrou_propres:
+        for domaine, valeur in apres.items():
+            if avant.get(domaine) != valeur:
+                _propres.setdefault(domaine, {})[avant.get(domaine)] = valeur
+
+
+def _propre(domaine, ancienne, nouvelle):
+    # Vrai si toutes les générations de `ancienne` à `nouvelle` viennent
+    # des écritures de ce processus
+    with _verrou_propres:
+        intervalles = _propres.get(domaine, {})
+        valeur = ancienne
+        while valeur != nouvelle and valeur in intervalles:
+            valeur = intervalles.pop(valeur)
+        # Les intervalles plus anciens ne serviront plus
+        for debut in [debut for debut in intervalles
+                      if debut is None or debut < nouvelle]:
+            del intervalles[debut]
+        return valeur == nouvelle
+
+
+def _connexion():
+    chemin = base_de_donnees.get_pool().chemin
+    if _etat["pid"] != os.getpid() or _etat["chemin"] != chemin:
+        # Une connexion héritée d'un fork ne doit pas être utilisée
+        _etat["connexion"] = sqlite3.connect(
+            chemin, isolation_level=None, check_same_thread=False)
+        _etat["pid"], _etat["chemin"] = os.getpid(), chemin
+        _etat["data_version"] = None
+        _etat["generations"] = None
+        # Les écritures propres notées concernaient l'autre base
+        with _verrou_propres:
+            _propres.clear()
+    return _etat["connexion"]
+
+
+def _retard(date_modification):
+    # date_modification : DATETIME('now') de SQLite, en UTC à la seconde
+    ecrit_a = datetime.fromisoformat(date_modification).replace(
+        tzinfo=timezone.utc).timestamp()
+    return max(0.0, time.time() - ecrit_a)
+
+
+def verifier():
+    """
+    Cette fonction applique les réactions des domaines modifiés depuis la
+    dernière vérification. Si un autre fil vérifie déjà, elle ne fait rien.
+
+    Returns:
+        list: Les domaines invalidés.
+    """
+    if not _verrou.acquire(blocking=False):
+        return []
+    try:
+        debut = time.perf_counter()
+        connexion = _connexion()
+        _stats["verifications"] += 1
+        data_version = connexion.execute("PRAGMA data_version").fetchone()[0]
+        if data_version == _etat["data_version"]:
+            return []
+        _etat["data_version"] = data_version
+        _stats["lectures_generations"] += 1
+        generations = {domaine: (valeur, date_modification)
+                       for domaine, valeur, date_modification in
+                       connexion.execute("""SELECT domaine, valeur,
+                        date_modification FROM generations""")}
+        anciennes, _etat["generations"] = _etat["generations"], generations
+        if anciennes is None:
+            # Première vérification : les caches viennent d'être remplis
+            return []
+
+        modifies = []
+        for domaine, generation in generations.items():
+            ancienne = anciennes.get(domaine, (None,))[0]
+            if ancienne == generation[0]:
+                continue
+            if (ancienne is not None
+                    and _propre(domaine, ancienne, generation[0])):
+                _stats["ecritures_propres"] += 1
+                continue
+            modifies.append(domaine)
+        for domaine in modifies:
+            for fonction in _reactions.get(domaine, []):
+                fonction()
+            retard = _retard(generations[domaine][1])
+            _stats["invalidations"][domaine] = (
+                _stats["invalidations"].get(domaine, 0) + 1)
+            _stats["retard_total_s"] += retard
+            _stats["retard_max_s"] = max(_stats["retard_max_s"], retard)
+        _stats["duree_max_ms"] = max(_stats["duree_max_ms"],
+                                     (time.perf_counter() - debut) * 1000)
+        return modifies
+    finally:
+        _verrou.release()
+
+
+def statistiques():
+    with _verrou:
+        stats = dict(_stats, invalidations=dict(_stats["invalidations"]))
+    total = sum(stats["invalidations"].values())
+    stats["retard_moyen_s"] = (stats["retard_total_s"] / total
+                               if total else None)
+    stats["domaines"] = sorted(_reactions)
+    return stats
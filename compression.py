@@ -0,0 +1,107 @@
+import gzip
+import threading
+import time
+
+from . import cache
+
+# brotli est facultatif : sans lui, seul gzip est proposé.
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Les variantes sont compressées une fois par version de page : autant
+# viser le meilleur taux.
+NIVEAU_GZIP = 9
+QUALITE_BROTLI = 9
+
+_verrou = threading.Lock()
+_stats = {"reponses_compressees": 0, "sous_seuil": 0, "non_acceptees": 0,
+          "compressions": 0, "octets_origine": 0, "octets_compresses": 0,
+          "cpu_ms": 0.0}
+
+
+def encodages():
+    """
+    Retourne les encodages proposés, du préféré au moins préféré.
+    """
+    return ["br", "gzip"] if brotli is not None else ["gzip"]
+
+
+def compresser(donnees, encodage):
+    debut = time.thread_time()
+    if encodage == "br":
+        resultat = brotli.compress(donnees, quality=QUALITE_BROTLI)
+    else:
+        # mtime=0 : le même contenu donne toujours les mêmes octets
+        resultat = gzip.compress(donnees, compresslevel=NIVEAU_GZIP,
+                                 mtime=0)
+    duree = time.thread_time() - debut
+    with _verrou:
+        _stats["compressions"] += 1
+        _stats["octets_origine"] += len(donnees)
+        _stats["octets_compresses"] += len(resultat)
+        _stats["cpu_ms"] += duree * 1000
+    return resultat
+
+
+def variante(cle, donnees, encodage):
+    """
+    Retourne `donnees` compressées avec `encodage`, depuis
+    cache.compressions si possible. `cle` doit changer avec le contenu
+    (ETag de la page, qui suit la révision des articles).
+    """
+    resultat = cache.compressions.get((cle, encodage))
+    if resultat is None:
+        resultat = compresser(donnees, encodage)
+        cache.compressions.definir((cle, encodage), resultat)
+    return resultat
+
+
+def compresser_reponse(response, request, cle, seuil=1024):
+    """
+    Cette fonction remplace le corps de `response` par sa variante
+    compressée si le client en accepte une (Accept-Encoding) et si le
+    corps fait au moins `seuil` octets. L'ETag reçoit le suffixe de
+    l'encodage : chaque variante a le sien.
+    """
+    response.vary.add("Accept-Encoding")
+    if (response.status_code != 200 or response.is_streamed
+            or "Content-Encoding" in response.headers):
+        return response
+    donnees = response.get_data()
+    if len(donnees) < seuil:
+        with _verrou:
+            _stats["sous_seuil"] += 1
+        return response
+    encodage = request.accept_encodings.best_match(encodages())
+    if encodage is None:
+        with _verrou:
+            _stats["non_acceptees"] += 1
+        return response
+
+    response.set_data(variante(cle, donnees, encodage))
+    response.headers["Content-Encoding"] = encodage
+    etag, _ = response.get_etag()
+    if etag:
+        response.set_etag(f"{etag}-{encodage}")
+    with _verrou:
+        _stats["reponses_compressees"] += 1
+    return response
+
+
+def etags_variantes(etag):
+    """
+    Retourne l'ETag d'une page et ceux de ses variantes compressées.
+    """
+    return [etag] + [f"{etag}-{encodage}" for encodage in encodages()]
+
+
+def statistiques():
+    with _verrou:
+        stats = dict(_stats)
+    stats["encodages"] = encodages()
+    stats["taux"] = (stats["octets_compresses"] / stats["octets_origine"]
+                     if stats["octets_origine"] else None)
+    stats["cache"] = cache.compressions.statistiques()
+    return stats
@@ -0,0 +1,162 @@
+import json
+import os
+import shutil
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+
+from flask import render_template
+
+from . import base_de_donnees
+
+# Fichier du dossier de sortie qui décrit la dernière génération.
+MANIFESTE = ".manifeste.json"
+
+
+def chemin_article(dossier, identifiant):
+    # /article/<identifiant> : nginx sert <uri>/index.html
+    return os.path.join(dossier, "article", identifiant, "index.html")
+
+
+def _ecrire(chemin, contenu):
+    # Écriture atomique : nginx ne sert jamais une page à moitié écrite
+    os.makedirs(os.path.dirname(chemin), exist_ok=True)
+    temporaire = chemin + ".tmp"
+    with open(temporaire, "w", encoding="utf-8") as fichier:
+        fichier.write(contenu)
+    os.replace(temporaire, chemin)
+
+
+def lire_manifeste(dossier):
+    try:
+        with open(os.path.join(dossier, MANIFESTE), encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def _rendre_articles(app, dossier, identifiants):
+    database = base_de_donnees.Database()
+    rendus = 0
+    try:
+        for identifiant in identifiants:
+            resultat = database.get_article_et_auteur(identifiant)
+            if resultat is None:
+                continue
+            article, auteur = resultat
+            # Page vue par un visiteur non connecté
+            with app.test_request_context(f"/article/{identifiant}"):
+                page = render_template("article.html", article=article,
+                                       auteur=auteur)
+            _ecrire(chemin_article(dossier, identifiant), page)
+            rendus += 1
+    finally:
+        database.deconnecter()
+    return rendus
+
+
+def _initialiser_processus(chemin):
+    # Chaque processus ouvre ses propres connexions
+    base_de_donnees.configurer_pool(chemin=chemin, taille=1)
+
+
+def _rendre_lot(dossier, identifiants):
+    from .app import app
+    return _rendre_articles(app, dossier, identifiants)
+
+
+def geler(app, dossier, processus=None, complet=False, taille_lot=200):
+    """
+    Cette fonction écrit dans `dossier` la page d'accueil et la page de
+    chaque article publié, telles qu'un visiteur non connecté les voit.
+
+    D'une exécution à l'autre, le manifeste garde la révision et la date
+    de publication de chaque page écrite : seuls sont refaits les articles
+    modifiés ou nouvellement publiés (date de publication atteinte), la
+    page d'accueil si les articles ont changé ou si la date a changé, et
+    les pages des articles supprimés ou dépubliés sont retirées.
+
+    Args:
+        app (Flask): L'application, pour les modèles et url_for.
+        processus (int): Le nombre de processus de rendu (par défaut un
+            par cœur ; 1 pour tout rendre dans ce processus).
+        complet (bool): Tout refaire, sans tenir compte des révisions du
+            manifeste. Les pages des articles qui ne sont plus publiés
+            sont retirées, même absentes du manifeste.
+    Returns:
+        dict: Le nombre d'articles rendus et supprimés, et si la page
+        d'accueil a été refaite.
+    """
+    manifeste = lire_manifeste(dossier)
+    # Même jour que DATE('now') de SQLite, en UTC
+    aujourd_hui = datetime.now(timezone.utc).date().isoformat()
+
+    database = base_de_donnees.Database()
+    try:
+        publies = database.get_revisions_publiees()
+        generations = database.get_generations()
+    finally:
+        database.deconnecter()
+    generation_articles = generations["articles"][0]
+    generation_utilisateurs = generations["utilisateurs"][0]
+
+    anciens = {}
+    if (not complet and manifeste is not None
+            and manifeste.get("generation_utilisateurs")
+            == generation_utilisateurs):
+        # Le résumé des auteurs n'a pas changé : les pages à jour restent
+        anciens = manifeste["articles"]
+    a_rendre = [identifiant for identifiant, version in publies.items()
+                if anciens.get(identifiant) != list(version)]
+    ecrits = set((manifeste or {}).get("articles", {}))
+    if complet:
+        # Pages laissées par une génération sans manifeste (ou interrompue)
+        try:
+            ecrits.update(os.listdir(os.path.join(dossier, "article")))
+        except FileNotFoundError:
+            pass
+    a_supprimer = sorted(ecrits.difference(publies))
+
+    rendus = 0
+    if a_rendre:
+        lots = [a_rendre[i:i + taille_lot]
+                for i in range(0, len(a_rendre), taille_lot)]
+        if processus == 1 or len(lots) == 1:
+            rendus = sum(_rendre_articles(app, dossier, lot)
+                         for lot in lots)
+        else:
+            # Aucune connexion ouverte ne doit être héritée par les
+            # processus de rendu
+            base_de_donnees.get_pool().fermer()
+            with ProcessPoolExecutor(
+                    max_workers=processus,
+                    initializer=_initialiser_processus,
+                    initargs=(base_de_donnees.get_pool().chemin,)
+            ) as executeur:
+                rendus = sum(executeur.map(_rendre_lot,
+                                           [dossier] * len(lots), lots))
+
+    for identifiant in a_supprimer:
+        shutil.rmtree(os.path.dirname(chemin_article(dossier, identifiant)),
+                      ignore_errors=True)
+
+    accueil = [generation_articles, aujourd_hui]
+    accueil_refait = (complet or manifeste is None
+                      or manifeste.get("accueil") != accueil)
+    if accueil_refait:
+        database = base_de_donnees.Database()
+        try:
+            cinq_articles = database.get_derniers_articles()
+        finally:
+            database.deconnecter()
+        with app.test_request_context("/"):
+            page = render_template("index.html", cinq_articles=cinq_articles)
+        _ecrire(os.path.join(dossier, "index.html"), page)
+
+    _ecrire(os.path.join(dossier, MANIFESTE), json.dumps({
+        "accueil": accueil,
+        "generation_utilisateurs": generation_utilisateurs,
+        "articles": {identifiant: list(version)
+                     for identifiant, version in publies.items()},
+    }, ensure_ascii=False))
+    return {"rendus": rendus, "supprimes": len(a_supprimer),
+            "accueil": accueil_refait}
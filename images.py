@@ -0,0 +1,128 @@
+import functools
+import hashlib
+import io
+import os
+
+from PIL import Image, ImageOps
+
+# Taille maximale d'une image reçue, en octets et en pixels (avant
+# décodage : protège des images qui se décompressent en gigaoctets)
+OCTETS_MAX = 5 * 1024 * 1024
+PIXELS_MAX = 40 * 1000 * 1000
+# Plus grand côté de l'image gardée et de sa miniature (les listes
+# affichent les photos à 150 pixels)
+DIMENSION_MAX = 1024
+DIMENSION_MINIATURE = 150
+QUALITE_JPEG = 85
+
+PHOTO_PAR_DEFAUT = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                "static", "robot.jpeg")
+
+_ORIENTATION_EXIF = 0x0112
+
+
+class ImageInvalide(ValueError):
+    pass
+
+
+def type_image(donnees):
+    """
+    Détermine le type MIME d'une image d'après sa signature.
+    """
+    if donnees.startswith(b"\xff\xd8\xff"):
+        return "image/jpeg"
+    if donnees.startswith(b"\x89PNG\r\n\x1a\n"):
+        return "image/png"
+    if donnees[:6] in (b"GIF87a", b"GIF89a"):
+        return "image/gif"
+    if donnees[:4] == b"RIFF" and donnees[8:12] == b"WEBP":
+        return "image/webp"
+    return "application/octet-stream"
+
+
+def empreinte(donnees):
+    """
+    Retourne une image telle qu'elle est rangée dans la table photos :
+    son hash SHA-256 (la clé), son type et son contenu.
+    """
+    return {"hash": hashlib.sha256(donnees).hexdigest(),
+            "type": type_image(donnees), "donnees": donnees}
+
+
+def _ouvrir(donnees):
+    try:
+        with Image.open(io.BytesIO(donnees)) as image:
+            if image.width * image.height > PIXELS_MAX:
+                raise ImageInvalide(
+                    f"image trop grande ({image.width}x{image.height})")
+            image.verify()
+        # verify() rend l'image inutilisable : la rouvrir pour la décoder
+        image = Image.open(io.BytesIO(donnees))
+        image.load()
+    except ImageInvalide:
+        raise
+    except Exception as e:
+        raise ImageInvalide(f"image illisible : {e}")
+    return image
+
+
+def _encoder(image, dimension, format_image):
+    image = image.copy()
+    image.thumbnail((dimension, dimension))
+    if format_image == "JPEG" and image.mode not in ("RGB", "L"):
+        image = image.convert("RGB")
+    elif format_image == "PNG" and image.mode not in ("1", "L", "LA", "P",
+                                                      "RGB", "RGBA"):
+        image = image.convert("RGBA")
+    sortie = io.BytesIO()
+    if format_image == "JPEG":
+        image.save(sortie, "JPEG", quality=QUALITE_JPEG, optimize=True)
+    else:
+        image.save(sortie, "PNG", optimize=True)
+    return sortie.getvalue()
+
+
+def preparer(donnees):
+    """
+    Cette fonction valide une image reçue et prépare ce qui est rangé en
+    base : l'image, réduite à DIMENSION_MAX pixels de côté (et redressée
+    selon son orientation EXIF) si besoin, et sa miniature de
+    DIMENSION_MINIATURE pixels (JPEG, ou PNG si l'image est transparente).
+
+    Returns:
+        tuple: (image, miniature), voir empreinte(). Si l'image est déjà
+        assez petite, la miniature est l'image elle-même.
+    Raises:
+        ImageInvalide: Ce n'est pas une image JPEG, PNG, GIF ou WebP
+            lisible, ou elle est trop grande.
+    """
+    if len(donnees) > OCTETS_MAX:
+        raise ImageInvalide(f"image de plus de {OCTETS_MAX} octets")
+    if type_image(donnees) == "application/octet-stream":
+        raise ImageInvalide("format non reconnu (JPEG, PNG, GIF ou WebP)")
+
+    image = _ouvrir(donnees)
+    redressee = image
+    if image.getexif().get(_ORIENTATION_EXIF, 1) != 1:
+        redressee = ImageOps.exif_transpose(image)
+    if redressee is not image or max(image.size) > DIMENSION_MAX:
+        donnees = _encoder(redressee, DIMENSION_MAX,
+                           "JPEG" if image.format == "JPEG" else "PNG")
+    originale = empreinte(donnees)
+    if max(redressee.size) <= DIMENSION_MINIATURE:
+        return originale, originale
+    transparente = (redressee.mode in ("RGBA", "LA")
+                    or "transparency" in redressee.info)
+    miniature = _encoder(redressee, DIMENSION_MINIATURE,
+                         "PNG" if transparente else "JPEG")
+    return originale, empreinte(miniature)
+
+
+@functools.lru_cache(maxsize=1)
+def photo_par_defaut():
+    """
+    Retourne la photo des utilisateurs qui n'en donnent pas, préparée
+    une fois pour toutes (voir preparer()).
+    """
+    with open(PHOTO_PAR_DEFAUT, "rb") as fichier_photo:
+        return preparer(fichier_photo.read())
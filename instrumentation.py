@@ -0,0 +1,209 @@
+import functools
+import inspect
+import logging
+import sqlite3
+import threading
+import time
+from collections import Counter
+
+from flask import g, has_request_context, request
+
+from . import base_de_donnees
+from . import migrations
+
+journal = logging.getLogger(__name__)
+
+# Méthodes de Database qui ne lisent ni n'écrivent de données
+_NON_MESUREES = {"get_connexion", "deconnecter"}
+
+_local = threading.local()
+_verrou = threading.Lock()
+_par_methode = {}
+_par_route = {}
+_seuil_lent = 0.1
+
+
+def _tracer(requete):
+    appel = getattr(_local, "appel", None)
+    if appel is not None and not migrations.REQUETE_INTERNE.search(requete):
+        appel["sql"].append(requete)
+
+
+def _nombre_lignes(resultat):
+    if resultat is None:
+        return 0
+    if isinstance(resultat, list):
+        return len(resultat)
+    if isinstance(resultat, dict) and isinstance(resultat.get("articles"),
+                                                 list):
+        return len(resultat["articles"])
+    return 1
+
+
+def _mesurer(nom, methode):
+    @functools.wraps(methode)
+    def mesuree(database, *args, **kwargs):
+        # Les appels imbriqués sont comptés dans l'appel englobant
+        if getattr(_local, "appel", None) is not None:
+            return methode(database, *args, **kwargs)
+        appel = {"methode": nom, "sql": []}
+        _local.appel = appel
+        debut = time.perf_counter()
+        try:
+            resultat = methode(database, *args, **kwargs)
+        finally:
+            appel["duree"] = time.perf_counter() - debut
+            _local.appel = None
+        if inspect.isgenerator(resultat):
+            return _mesurer_generateur(database, appel, resultat)
+        appel["lignes"] = _nombre_lignes(resultat)
+        _enregistrer(database, appel)
+        return resultat
+    return mesuree
+
+
+def _mesurer_generateur(database, appel, generateur):
+    # Les requêtes d'un générateur (parcourir_utilisateurs, ...) sont
+    # faites pendant son parcours, souvent dans une page diffusée : chaque
+    # élément est mesuré et compté dans l'appel, enregistré à la fin
+    if has_request_context():
+        g.setdefault("_appels_sql", []).append(appel)
+    appel["lignes"] = 0
+    try:
+        while True:
+            precedent = getattr(_local, "appel", None)
+            _local.appel = precedent or appel
+            debut = time.perf_counter()
+            try:
+                element = next(generateur)
+            except StopIteration:
+                return
+            finally:
+                appel["duree"] += time.perf_counter() - debut
+                _local.appel = precedent
+            appel["lignes"] += 1
+            yield element
+    finally:
+        generateur.close()
+        _enregistrer(database, appel, dans_requete=False)
+
+
+def _enregistrer(database, appel, dans_requete=True):
+    with _verrou:
+        stats = _par_methode.setdefault(appel["methode"], {
+            "appels": 0, "duree_totale_ms": 0.0, "duree_max_ms": 0.0,
+            "lignes": 0, "requetes_sql": 0})
+        duree_ms = appel["duree"] * 1000
+        stats["appels"] += 1
+        stats["duree_totale_ms"] += duree_ms
+        stats["duree_max_ms"] = max(stats["duree_max_ms"], duree_ms)
+        stats["lignes"] += appel["lignes"]
+        stats["requetes_sql"] += len(appel["sql"])
+
+    if dans_requete and has_request_context():
+        g.setdefault("_appels_sql", []).append(appel)
+
+    if appel["duree"] >= _seuil_lent:
+        _journaliser_lent(database, appel)
+
+
+def _journaliser_lent(database, appel):
+    lignes = [f"{appel['methode']} : {appel['duree'] * 1000:.1f} ms, "
+              f"{appel['lignes']} ligne(s)"]
+    connexion = database.get_connexion()
+    for requete in appel["sql"]:
+        lignes.append(f"  {' '.join(requete.split())}")
+        if not requete.lstrip().upper().startswith("SELECT"):
+            continue
+        try:
+            plan = connexion.execute("EXPLAIN QUERY PLAN " + requete)
+            lignes.extend(f"    {ligne[-1]}" for ligne in plan.fetchall())
+        except sqlite3.Error as e:
+            lignes.append(f"    (plan indisponible : {e})")
+    journal.warning("Requête lente\n%s", "\n".join(lignes))
+
+
+def _apres_requete(response):
+    # Les pages diffusées (stream_template) appellent encore la base après
+    # ce point : l'en-tête ne compte que les appels déjà faits, les cumuls
+    # de la route sont faits à la fermeture de la réponse
+    appels = g.setdefault("_appels_sql", [])
+    if appels:
+        total = sum(appel["duree"] for appel in appels) * 1000
+        nombre = sum(len(appel["sql"]) for appel in appels)
+        par_methode = Counter()
+        for appel in appels:
+            par_methode[appel["methode"]] += appel["duree"] * 1000
+        mesures = [f'sql;dur={total:.2f};desc="{nombre} requetes SQL"']
+        mesures.extend(f"{nom};dur={duree:.2f}"
+                       for nom, duree in par_methode.items())
+        response.headers.add("Server-Timing", ", ".join(mesures))
+
+    route = request.endpoint or request.path
+    response.call_on_close(lambda: _cumuler(route, appels))
+    return response
+
+
+def _cumuler(route, appels):
+    if not appels:
+        return
+    total = sum(appel["duree"] for appel in appels) * 1000
+    nombre = sum(len(appel["sql"]) for appel in appels)
+    sequence = " > ".join(appel["methode"] for appel in appels)
+    with _verrou:
+        stats = _par_route.setdefault(route, {
+            "requetes": 0, "appels": 0, "requetes_sql": 0,
+            "duree_sql_ms": 0.0, "sequences": Counter()})
+        stats["requetes"] += 1
+        stats["appels"] += len(appels)
+        stats["requetes_sql"] += nombre
+        stats["duree_sql_ms"] += total
+        stats["sequences"][sequence] += 1
+
+
+def activer(app, seuil_lent=0.1, fichier_journal=None):
+    """
+    Cette fonction active la mesure de toutes les méthodes de Database :
+    en-tête Server-Timing sur chaque réponse, journal des appels plus longs
+    que `seuil_lent` secondes (avec leur plan d'exécution) et statistiques
+    cumulées (voir statistiques()).
+
+    Doit être appelée au démarrage, avant la première requête.
+    """
+    global _seuil_lent
+    _seuil_lent = seuil_lent
+    if fichier_journal:
+        gestionnaire = logging.FileHandler(fichier_journal, encoding="utf-8")
+        gestionnaire.setFormatter(
+            logging.Formatter("%(asctime)s %(message)s"))
+        journal.addHandler(gestionnaire)
+
+    classe = base_de_donnees.Database
+    for nom, methode in list(vars(classe).items()):
+        if (callable(methode) and not nom.startswith("_")
+                and nom not in _NON_MESUREES
+                and not hasattr(methode, "__wrapped__")):
+            setattr(classe, nom, _mesurer(nom, methode))
+
+    base_de_donnees.ajouter_traceur(_tracer)
+    app.after_request(_apres_requete)
+
+
+def statistiques():
+    """
+    Retourne les statistiques cumulées par méthode de Database et par
+    route. Pour chaque route, les séquences d'appels les plus fréquentes
+    font ressortir les allers-retours évitables (N+1).
+    """
+    with _verrou:
+        methodes = {nom: dict(stats) for nom, stats in _par_methode.items()}
+        routes = {}
+        for nom, stats in _par_route.items():
+            routes[nom] = dict(stats)
+            routes[nom]["sql_par_requete"] = (stats["requetes_sql"]
+                                              / stats["requetes"])
+            routes[nom]["sequences"] = dict(
+                stats["sequences"].most_common(5))
+    for stats in methodes.values():
+        stats["duree_moyenne_ms"] = stats["duree_totale_ms"] / stats["appels"]
+    return {"methodes": methodes, "routes": routes}
@@ -0,0 +1,108 @@
+import threading
+import time
+import uuid
+
+from itsdangerous import BadSignature, URLSafeTimedSerializer
+
+# Révocations en mémoire, chargées au démarrage depuis la table revocations
+# et tenues à jour par revoquer_jeton() et revoquer_utilisateur() :
+# identifiant de jeton -> expiration, username -> date de révocation.
+_jetons_revoques = {}
+_utilisateurs_revoques = {}
+_verrou = threading.Lock()
+
+
+def _serialiseur(secret):
+    return URLSafeTimedSerializer(secret, salt="id_session")
+
+
+def creer_jeton(secret, username, identifiant=None):
+    """
+    Cette fonction retourne un jeton de session signé et horodaté qui
+    porte le username et un identifiant unique (pour la révocation).
+    Un jeton renouvelé garde l'`identifiant` du jeton qu'il remplace :
+    révoquer l'un révoque aussi l'autre.
+    """
+    return _serialiseur(secret).dumps(
+        {"u": username, "j": identifiant or uuid.uuid4().hex})
+
+
+def lire_jeton(secret, jeton, duree):
+    """
+    Cette fonction vérifie un jeton sans consulter la base : signature,
+    âge (au plus `duree` secondes) et révocations.
+
+    Returns:
+        tuple: (username, date d'émission, identifiant du jeton), ou None
+        si le jeton est invalide, expiré ou révoqué.
+    """
+    try:
+        contenu, emis_le = _serialiseur(secret).loads(
+            jeton, max_age=duree, return_timestamp=True)
+        username, identifiant = contenu["u"], contenu["j"]
+    except (BadSignature, KeyError, TypeError):
+        return None
+    emis_a = emis_le.timestamp()
+    with _verrou:
+        if identifiant in _jetons_revoques:
+            return None
+        revoque_a = _utilisateurs_revoques.get(username)
+    if revoque_a is not None and emis_a <= revoque_a:
+        return None
+    return username, emis_a, identifiant
+
+
+def revoquer_jeton(database, secret, jeton, duree):
+    """
+    Cette fonction révoque un jeton (déconnexion), et avec lui les jetons
+    dont il est le renouvellement ou qui le renouvellent (même
+    identifiant). Le dernier d'entre eux a été émis au plus tard
+    maintenant : la révocation dure `duree` secondes à partir de
+    maintenant.
+    """
+    try:
+        identifiant = _serialiseur(secret).loads(jeton)["j"]
+    except (BadSignature, KeyError, TypeError):
+        return
+    expiration = int(time.time()) + duree
+    database.revoquer("jeton", identifiant, int(time.time()), expiration)
+    with _verrou:
+        _jetons_revoques[identifiant] = expiration
+
+
+def revoquer_utilisateur(database, username, duree):
+    """
+    Cette fonction révoque tous les jetons déjà émis pour `username`
+    (compte désactivé). Les jetons émis ensuite restent valides.
+    """
+    maintenant = int(time.time())
+    database.revoquer("utilisateur", username, maintenant,
+                      maintenant + duree)
+    with _verrou:
+        _utilisateurs_revoques[username] = maintenant
+
+
+def charger(database):
+    """
+    Cette fonction remplace les révocations en mémoire par celles,
+    encore utiles, de la base. À appeler au démarrage.
+    """
+    jetons, utilisateurs = {}, {}
+    for type_revocation, cle, date_revocation, expiration in (
+            database.get_revocations()):
+        if type_revocation == "jeton":
+            jetons[cle] = expiration
+        else:
+            utilisateurs[cle] = max(date_revocation,
+                                    utilisateurs.get(cle, 0))
+    with _verrou:
+        _jetons_revoques.clear()
+        _jetons_revoques.update(jetons)
+        _utilisateurs_revoques.clear()
+        _utilisateurs_revoques.update(utilisateurs)
+
+
+def statistiques():
+    with _verrou:
+        return {"jetons_revoques": len(_jetons_revoques),
+                "utilisateurs_revoques": len(_utilisateurs_revoques)}
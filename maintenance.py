@@ -0,0 +1,137 @@
+import logging
+import os
+import sqlite3
+import time
+
+from . import base_de_donnees
+
+journal = logging.getLogger(__name__)
+
+# Lignes lues par index pour ANALYZE : des statistiques approchées, mais
+# une durée bornée quelle que soit la taille des tables
+LIMITE_ANALYSE = 1000
+
+# PRAGMA auto_vacuum
+_AUTO_VACUUM = {0: "none", 1: "full", 2: "incremental"}
+
+
+def _taille(chemin):
+    try:
+        return os.path.getsize(chemin)
+    except OSError:
+        return 0
+
+
+def etat(connexion, chemin):
+    """
+    Cette fonction décrit le fichier de la base : tailles (base et WAL,
+    en octets), pages libres et mode auto_vacuum.
+    """
+    return {
+        "taille": _taille(chemin),
+        "taille_wal": _taille(chemin + "-wal"),
+        "pages_libres": connexion.execute(
+            "PRAGMA freelist_count").fetchone()[0],
+        "auto_vacuum": _AUTO_VACUUM[connexion.execute(
+            "PRAGMA auto_vacuum").fetchone()[0]],
+    }
+
+
+def _connexion(chemin):
+    connexion = sqlite3.connect(chemin, isolation_level=None, timeout=30)
+    # Ne pas attendre longtemps les autres connexions : la maintenance
+    # reprendra à la prochaine exécution
+    connexion.execute("PRAGMA busy_timeout = 1000")
+    return connexion
+
+
+def maintenir(chemin=None, analyser=True, pages_par_etape=200, pause=0.05):
+    """
+    Cette fonction entretient la base, par étapes courtes pour ne pas
+    bloquer les requêtes :
+
+    1. ANALYZE (LIMITE_ANALYSE lignes par index) puis PRAGMA optimize :
+       statistiques du planificateur de requêtes ;
+    2. PRAGMA incremental_vacuum, `pages_par_etape` pages à la fois avec
+       une pause entre deux étapes, si la base est en auto_vacuum
+       incrémental (voir convertir_vacuum_incremental) ;
+    3. points de contrôle du WAL : PASSIVE, puis TRUNCATE pour ramener le
+       fichier WAL à zéro si aucune lecture n'est en cours.
+
+    Returns:
+        dict: La durée, l'état du fichier avant et après (voir etat()),
+        les pages rendues au système et le résultat du point de contrôle.
+    """
+    chemin = chemin or base_de_donnees.get_pool().chemin
+    connexion = _connexion(chemin)
+    debut = time.perf_counter()
+    try:
+        avant = etat(connexion, chemin)
+        if analyser:
+            connexion.execute(f"PRAGMA analysis_limit = {LIMITE_ANALYSE}")
+            connexion.execute("ANALYZE")
+            connexion.execute("PRAGMA optimize")
+
+        pages_rendues = 0
+        if avant["auto_vacuum"] == "incremental":
+            libres = avant["pages_libres"]
+            while libres:
+                # Chaque étape est sa propre transaction d'écriture.
+                # executescript va jusqu'au bout de l'instruction, qui
+                # rend une page par pas (execute s'arrêterait au premier).
+                connexion.executescript(
+                    f"PRAGMA incremental_vacuum({pages_par_etape});")
+                restantes = connexion.execute(
+                    "PRAGMA freelist_count").fetchone()[0]
+                if restantes >= libres:
+                    # Des écritures libèrent des pages en même temps
+                    break
+                pages_rendues += libres - restantes
+                libres = restantes
+                time.sleep(pause)
+
+        connexion.execute("PRAGMA wal_checkpoint(PASSIVE)").fetchone()
+        bloque, pages_wal, pages_copiees = connexion.execute(
+            "PRAGMA wal_checkpoint(TRUNCATE)").fetchone()
+        apres = etat(connexion, chemin)
+    finally:
+        connexion.close()
+
+    resultat = {
+        "duree_s": round(time.perf_counter() - debut, 3),
+        "avant": avant,
+        "apres": apres,
+        "pages_rendues": pages_rendues,
+        "checkpoint": {"bloque": bool(bloque), "pages_wal": pages_wal,
+                       "pages_copiees": pages_copiees},
+    }
+    journal.info(
+        "Maintenance en %.3f s : %d -> %d octets, WAL %d -> %d octets, "
+        "%d -> %d pages libres", resultat["duree_s"], avant["taille"],
+        apres["taille"], avant["taille_wal"], apres["taille_wal"],
+        avant["pages_libres"], apres["pages_libres"])
+    return resultat
+
+
+def convertir_vacuum_incremental(chemin=None):
+    """
+    Cette fonction passe une base existante en auto_vacuum incrémental.
+    Le changement ne prend effet qu'avec un VACUUM complet, qui réécrit
+    toute la base et bloque les écritures pendant ce temps : à lancer une
+    fois, hors des heures d'affluence. Les bases créées par
+    migrations.migrer le sont déjà.
+
+    Returns:
+        bool: False si la base l'était déjà.
+    """
+    chemin = chemin or base_de_donnees.get_pool().chemin
+    connexion = _connexion(chemin)
+    try:
+        if etat(connexion, chemin)["auto_vacuum"] == "incremental":
+            return False
+        connexion.execute("PRAGMA busy_timeout = 30000")
+        connexion.execute("PRAGMA auto_vacuum = INCREMENTAL")
+        connexion.execute("VACUUM")
+    finally:
+        connexion.close()
+    return True
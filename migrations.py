@@ -0,0 +1,454 @@
+import re
+import sqlite3
+from collections.abc import Iterator
+
+from . import base_de_donnees
+from . import images
+
+
+def _tables_initiales(connexion):
+    connexion.execute("""
+        CREATE TABLE IF NOT EXISTS articles (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        titre TEXT NOT NULL,
+        identifiant TEXT UNIQUE NOT NULL CHECK(
+            identifiant GLOB '[A-Za-z0-9_ éèàçôù-][A-Za-z0-9_ éèàçôù-]*'
+            AND TRIM(identifiant) != ''
+            AND LENGTH(TRIM(identifiant)) >= 2
+        ),
+        auteur TEXT NOT NULL,
+        date_publication DATE NOT NULL,
+        contenu TEXT NOT NULL,
+        FOREIGN KEY (auteur) REFERENCES utilisateurs(username)
+        );
+        """)
+    connexion.execute("""
+        CREATE TABLE IF NOT EXISTS utilisateurs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            username TEXT UNIQUE NOT NULL,
+            password_hash TEXT NOT NULL,
+            salt varchar(32),
+            nom TEXT NOT NULL,
+            prenom TEXT NOT NULL,
+            photo_profil BLOB,
+            etat INTEGER NOT NULL DEFAULT 1
+        );
+        """)
+    connexion.execute("""
+        CREATE TABLE IF NOT EXISTS sessions(
+            id_session TEXT UNIQUE NOT NULL,
+            username TEXT UNIQUE NOT NULL
+        );
+        """)
+
+
+def _index_recherche(connexion):
+    base_de_donnees.creer_index_recherche(connexion)
+    connexion.execute(
+        "INSERT INTO articles_fts(articles_fts) VALUES ('rebuild')")
+
+
+def _index_articles(connexion):
+    # Tri de toutes les listes et pagination par clé
+    connexion.execute("""CREATE INDEX IF NOT EXISTS
+        idx_articles_date_publication ON articles(date_publication, id)""")
+    connexion.execute("""CREATE INDEX IF NOT EXISTS
+        idx_articles_auteur ON articles(auteur)""")
+
+
+def _cle_primaire_sessions(connexion):
+    connexion.execute("""
+        CREATE TABLE sessions_nouvelle(
+            id_session TEXT PRIMARY KEY NOT NULL,
+            username TEXT UNIQUE NOT NULL
+        );
+        """)
+    connexion.execute("""INSERT INTO sessions_nouvelle(id_session, username)
+        SELECT id_session, username FROM sessions""")
+    connexion.execute("DROP TABLE sessions")
+    connexion.execute("ALTER TABLE sessions_nouvelle RENAME TO sessions")
+
+
+def _revisions_et_generations(connexion):
+    # Les articles existants n'ont pas d'historique : ils sont datés de
+    # la migration, ce qui invalide sans risque les copies des clients.
+    connexion.execute("""ALTER TABLE articles
+        ADD COLUMN date_modification TEXT""")
+    connexion.execute("""ALTER TABLE articles
+        ADD COLUMN revision INTEGER NOT NULL DEFAULT 1""")
+    connexion.execute(
+        "UPDATE articles SET date_modification = DATETIME('now')")
+
+    # Compteur global par domaine, incrémenté par déclencheur à chaque
+    # écriture, quelle qu'en soit l'origine (application, import, SQL).
+    connexion.execute("""
+        CREATE TABLE generations(
+            domaine TEXT PRIMARY KEY NOT NULL,
+            valeur INTEGER NOT NULL,
+            date_modification TEXT NOT NULL
+        );
+        """)
+    connexion.execute("""INSERT INTO generations(domaine, valeur,
+        date_modification) VALUES ('articles', 1, DATETIME('now')),
+        ('utilisateurs', 1, DATETIME('now'))""")
+    evenements = {
+        "articles": ["INSERT", "UPDATE", "DELETE"],
+        # Seules les colonnes affichées avec les articles
+        "utilisateurs": ["INSERT", "UPDATE OF nom, prenom, photo_profil, etat",
+                         "DELETE"],
+    }
+    for table, liste in evenements.items():
+        for evenement in liste:
+            nom = evenement.split()[0].lower()
+            connexion.execute(f"""
+                CREATE TRIGGER generation_{table}_{nom}
+                AFTER {evenement} ON {table} BEGIN
+                    UPDATE generations SET valeur = valeur + 1,
+                     date_modification = DATETIME('now')
+                    WHERE domaine = '{table}';
+                END;
+                """)
+
+
+def _sessions_expirantes(connexion):
+    # Plusieurs sessions par utilisateur, chacune avec son expiration
+    # (secondes depuis l'époque Unix). Les sessions existantes reçoivent
+    # la durée par défaut de 7 jours.
+    connexion.execute("""
+        CREATE TABLE sessions_nouvelle(
+            id_session TEXT PRIMARY KEY NOT NULL,
+            username TEXT NOT NULL,
+            date_creation INTEGER NOT NULL,
+            date_expiration INTEGER NOT NULL
+        );
+        """)
+    connexion.execute("""INSERT INTO sessions_nouvelle(id_session, username,
+        date_creation, date_expiration)
+        SELECT id_session, username, CAST(STRFTIME('%s', 'now') AS INTEGER),
+         CAST(STRFTIME('%s', 'now') AS INTEGER) + 7 * 86400
+        FROM sessions""")
+    connexion.execute("DROP TABLE sessions")
+    connexion.execute("ALTER TABLE sessions_nouvelle RENAME TO sessions")
+    connexion.execute("""CREATE INDEX idx_sessions_expiration
+        ON sessions(date_expiration)""")
+    connexion.execute("""CREATE INDEX idx_sessions_username
+        ON sessions(username)""")
+
+
+def _revocations(connexion):
+    # Révocations des jetons de session (voir jetons.py), gardées jusqu'à
+    # l'expiration des jetons qu'elles visent.
+    connexion.execute("""
+        CREATE TABLE revocations(
+            type TEXT NOT NULL CHECK(type IN ('jeton', 'utilisateur')),
+            cle TEXT NOT NULL,
+            date_revocation INTEGER NOT NULL,
+            date_expiration INTEGER NOT NULL,
+            PRIMARY KEY (type, cle)
+        );
+        """)
+    connexion.execute("""CREATE INDEX idx_revocations_expiration
+        ON revocations(date_expiration)""")
+
+
+def _generations_sessions(connexion):
+    # Pour coherence.py : les autres processus oublient les sessions
+    # supprimées (déconnexion, purge) et rechargent les révocations.
+    connexion.execute("""INSERT INTO generations(domaine, valeur,
+        date_modification) VALUES ('sessions', 1, DATETIME('now')),
+        ('revocations', 1, DATETIME('now'))""")
+    evenements = {"sessions": "DELETE", "revocations": "INSERT"}
+    for table, evenement in evenements.items():
+        connexion.execute(f"""
+            CREATE TRIGGER generation_{table}_{evenement.lower()}
+            AFTER {evenement} ON {table} BEGIN
+                UPDATE generations SET valeur = valeur + 1,
+                 date_modification = DATETIME('now')
+                WHERE domaine = '{table}';
+            END;
+            """)
+
+
+def _photos(connexion):
+    # Images rangées une seule fois, par hash de leur contenu ; chacune
+    # désigne sa miniature (elle-même si elle est assez petite).
+    connexion.execute("""
+        CREATE TABLE photos(
+            hash TEXT PRIMARY KEY NOT NULL,
+            type TEXT NOT NULL,
+            donnees BLOB NOT NULL,
+            miniature TEXT NOT NULL
+        );
+        """)
+    connexion.execute("""ALTER TABLE utilisateurs
+        ADD COLUMN photo_hash TEXT REFERENCES photos(hash)""")
+    connexion.execute("DROP TRIGGER generation_utilisateurs_update")
+    connexion.execute("""
+        CREATE TRIGGER generation_utilisateurs_update
+        AFTER UPDATE OF nom, prenom, photo_profil, photo_hash, etat
+        ON utilisateurs BEGIN
+            UPDATE generations SET valeur = valeur + 1,
+             date_modification = DATETIME('now')
+            WHERE domaine = 'utilisateurs';
+        END;
+        """)
+    # Une photo à la fois : la mémoire reste bornée
+    ids = [ligne[0] for ligne in connexion.execute(
+        "SELECT id FROM utilisateurs WHERE photo_profil IS NOT NULL")]
+    for id_utilisateur in ids:
+        donnees = bytes(connexion.execute(
+            "SELECT photo_profil FROM utilisateurs WHERE id = ?",
+            (id_utilisateur,)).fetchone()[0])
+        try:
+            photo, miniature = images.preparer(donnees)
+        except images.ImageInvalide:
+            # Gardée telle quelle : elle était déjà servie ainsi
+            photo = miniature = images.empreinte(donnees)
+        photo_hash = base_de_donnees.enregistrer_photo(connexion, photo,
+                                                       miniature)
+        connexion.execute("""UPDATE utilisateurs SET photo_hash = ?,
+         photo_profil = NULL WHERE id = ?""", (photo_hash, id_utilisateur))
+
+
+def _extraits_articles(connexion):
+    # Colonnes lues par les listes à la place du contenu (voir
+    # base_de_donnees.resumer_contenu), calculées par lots d'articles
+    connexion.execute("""ALTER TABLE articles
+        ADD COLUMN extrait TEXT NOT NULL DEFAULT ''""")
+    connexion.execute("""ALTER TABLE articles
+        ADD COLUMN nombre_mots INTEGER NOT NULL DEFAULT 0""")
+    connexion.execute("""ALTER TABLE articles
+        ADD COLUMN temps_lecture INTEGER NOT NULL DEFAULT 1""")
+    dernier = 0
+    while True:
+        lot = connexion.execute("""SELECT id, contenu FROM articles
+         WHERE id > ? ORDER BY id LIMIT 500""", (dernier,)).fetchall()
+        if not lot:
+            break
+        connexion.executemany("""UPDATE articles SET extrait = ?,
+         nombre_mots = ?, temps_lecture = ? WHERE id = ?""",
+                              [(*base_de_donnees.resumer_contenu(contenu),
+                                id_article) for id_article, contenu in lot])
+        dernier = lot[-1][0]
+
+
+def _miniatures_photos(connexion):
+    # Les photos sans miniature (rangées sans Pillow quand il était
+    # facultatif, ou telles quelles par une version intermédiaire de
+    # _photos) sont réduites avec leur miniature ; une photo réduite
+    # change de hash
+    hashes = [ligne[0] for ligne in connexion.execute(
+        "SELECT hash FROM photos WHERE miniature = hash")]
+    for ancien in hashes:
+        donnees = bytes(connexion.execute(
+            "SELECT donnees FROM photos WHERE hash = ?",
+            (ancien,)).fetchone()[0])
+        try:
+            photo, miniature = images.preparer(donnees)
+        except images.ImageInvalide:
+            # Gardée telle quelle : elle était déjà servie ainsi
+            continue
+        if photo["hash"] == miniature["hash"] == ancien:
+            # Déjà assez petite
+            continue
+        nouveau = base_de_donnees.enregistrer_photo(connexion, photo,
+                                                    miniature)
+        connexion.execute("UPDATE photos SET miniature = ? WHERE hash = ?",
+                          (miniature["hash"], nouveau))
+        if nouveau != ancien:
+            connexion.execute(
+                "UPDATE utilisateurs SET photo_hash = ? WHERE photo_hash = ?",
+                (nouveau, ancien))
+            connexion.execute("""DELETE FROM photos WHERE hash = ?
+             AND NOT EXISTS (SELECT 1 FROM photos WHERE miniature = ?
+             AND hash != ?)""", (ancien, ancien, ancien))
+
+
+# Étapes du schéma, dans l'ordre. Une étape déjà publiée ne doit plus
+# être modifiée : toute évolution se fait en ajoutant une étape.
+MIGRATIONS = [
+    (1, "Tables articles, utilisateurs et sessions", _tables_initiales),
+    (2, "Index plein texte des articles", _index_recherche),
+    (3, "Index sur articles.date_publication et articles.auteur",
+     _index_articles),
+    (4, "Clé primaire de la table sessions", _cle_primaire_sessions),
+    (5, "Révision des articles et générations du contenu",
+     _revisions_et_generations),
+    (6, "Sessions multiples avec expiration", _sessions_expirantes),
+    (7, "Révocations des jetons de session", _revocations),
+    (8, "Générations des sessions et des révocations",
+     _generations_sessions),
+    (9, "Photos rangées par hash, avec miniatures", _photos),
+    (10, "Extrait, nombre de mots et temps de lecture des articles",
+     _extraits_articles),
+    (11, "Photos réduites et miniatures", _miniatures_photos),
+]
+
+
+def version_schema(connexion):
+    """
+    Cette fonction retourne la version du schéma de la base
+    (0 pour une base qui n'a jamais été migrée).
+    """
+    connexion.execute("""CREATE TABLE IF NOT EXISTS schema_version(
+        version INTEGER PRIMARY KEY,
+        description TEXT NOT NULL,
+        date_application TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
+        )""")
+    version = connexion.execute(
+        "SELECT MAX(version) FROM schema_version").fetchone()[0]
+    return version or 0
+
+
+def migrer(chemin=None, cible=None):
+    """
+    Cette fonction applique, dans l'ordre, les migrations qui ne l'ont pas
+    encore été. Chaque migration est appliquée dans sa propre transaction.
+
+    Args:
+        chemin (str): La base à migrer (par défaut celle du pool).
+        cible (int): La version à atteindre (par défaut la dernière).
+    Returns:
+        list: Les (version, description) appliquées.
+    """
+    chemin = chemin or base_de_donnees.get_pool().chemin
+    connexion = sqlite3.connect(chemin, isolation_level=None, timeout=30)
+    appliquees = []
+    try:
+        # Une base neuve est créée en auto_vacuum incrémental (voir
+        # maintenance.py) : ce mode ne peut plus changer sans VACUUM
+        if not connexion.execute(
+                "SELECT COUNT(*) FROM sqlite_master").fetchone()[0]:
+            connexion.execute("PRAGMA auto_vacuum = INCREMENTAL")
+        for version, description, etape in MIGRATIONS:
+            if cible is not None and version > cible:
+                break
+            # BEGIN IMMEDIATE : un seul processus migre à la fois,
+            # les autres relisent la version une fois le verrou obtenu.
+            connexion.execute("BEGIN IMMEDIATE")
+            try:
+                if version <= version_schema(connexion):
+                    connexion.execute("COMMIT")
+                    continue
+                etape(connexion)
+                connexion.execute("""INSERT INTO schema_version(version,
+                 description) VALUES (?, ?)""", (version, description))
+                connexion.execute("COMMIT")
+            except Exception:
+                connexion.execute("ROLLBACK")
+                raise
+            appliquees.append((version, description))
+    finally:
+        connexion.close()
+    return appliquees
+
+
+# Lectures de Database dont le plan d'exécution est vérifié, avec des
+# arguments d'exemple. Les curseurs de pagination sont ajoutés ensuite.
+LECTURES_A_VERIFIER = [
+    ("verifier_username_db", ("prof",), {}),
+    ("verifier_article_db", ("article1",), {}),
+    ("get_user_login_info", ("prof",), {}),
+    ("get_session", ("0" * 32,), {}),
+    ("get_articles", (), {}),
+    ("get_utilisateurs", (), {}),
+    ("parcourir_utilisateurs", (), {}),
+    ("parcourir_articles", (), {}),
+    ("get_info_utilisateurs", ("prof",), {}),
+    ("get_photo_profil", ("prof",), {}),
+    ("get_derniers_articles", (), {}),
+    ("get_article", ("article1",), {}),
+    ("get_article_et_auteur", ("article1",), {}),
+    ("get_version_article", ("article1",), {}),
+    ("get_generations", (), {}),
+    ("get_revisions_publiees", (), {}),
+    ("get_revocations", (), {}),
+    ("parcourir_titres", (), {}),
+    ("rechercher_article", ("article",), {}),
+]
+
+# Lectures qui parcourent toute une table par définition
+BALAYAGES_ATTENDUS = {
+    "get_utilisateurs",
+    "parcourir_utilisateurs",
+    "get_generations",
+    "parcourir_titres",
+}
+
+# Requêtes tracées qui ne viennent pas de Database : sous-programmes
+# (préfixés par « -- ») et requêtes internes de FTS5 sur ses tables d'ombre
+REQUETE_INTERNE = re.compile(
+    r"^\s*--|'\w+'\.'\w+_(config|data|idx|docsize|content)'"
+    r"|PRAGMA '\w+'\.data_version")
+
+_CURSEUR_EXEMPLE = base_de_donnees.encoder_curseur(["2000-01-01", 1])
+
+
+def _consommer(resultat):
+    # Les variantes paresseuses n'exécutent leurs requêtes qu'à la lecture
+    if isinstance(resultat, dict) and "articles" in resultat:
+        resultat = resultat["articles"]
+    if isinstance(resultat, Iterator):
+        for _ in resultat:
+            pass
+
+
+def _plan_contient_balayage(plan):
+    """
+    Un balayage complet est une ligne « SCAN <table> » qui n'utilise
+    aucun index (les tables virtuelles FTS5 et les sous-requêtes
+    ont leur propre accès).
+    """
+    for ligne in plan:
+        detail = ligne[-1]
+        if not detail.startswith("SCAN "):
+            continue
+        if ("USING" in detail or "VIRTUAL TABLE" in detail
+                or "SUBQUERY" in detail.upper() or "CONSTANT ROW" in detail):
+            continue
+        return True
+    return False
+
+
+def verifier_plans(database=None):
+    """
+    Cette fonction exécute chaque lecture de Database, capture le SQL
+    réellement envoyé à SQLite et en vérifie le plan avec
+    EXPLAIN QUERY PLAN.
+
+    Returns:
+        list: Les (méthode, requête, plan) qui font un balayage complet
+        sans être dans BALAYAGES_ATTENDUS.
+    """
+    database = database or base_de_donnees.Database()
+    lectures = list(LECTURES_A_VERIFIER)
+    lectures.append(("get_articles", (), {"apres": _CURSEUR_EXEMPLE}))
+    lectures.append(("get_articles", (), {"avant": _CURSEUR_EXEMPLE}))
+    lectures.append(("parcourir_articles", (),
+                     {"apres": _CURSEUR_EXEMPLE}))
+    lectures.append(("rechercher_article", ("article",),
+                     {"apres": base_de_donnees.encoder_curseur([0.0, 1])}))
+
+    connexion = database.get_connexion()
+    problemes = []
+    try:
+        for nom, args, kwargs in lectures:
+            requetes = []
+            connexion.set_trace_callback(requetes.append)
+            try:
+                _consommer(getattr(database, nom)(*args, **kwargs))
+            finally:
+                connexion.set_trace_callback(None)
+            for requete in requetes:
+                if (not requete.lstrip().upper().startswith("SELECT")
+                        or REQUETE_INTERNE.search(requete)):
+                    continue
+                plan = connexion.execute(
+                    "EXPLAIN QUERY PLAN " + requete).fetchall()
+                if (_plan_contient_balayage(plan)
+                        and nom not in BALAYAGES_ATTENDUS):
+                    problemes.append((nom, requete,
+                                      [ligne[-1] for ligne in plan]))
+    finally:
+        database.deconnecter()
+    return problemes
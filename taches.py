@@ -0,0 +1,136 @@
+import atexit
+import logging
+import os
+import threading
+import time
+
+from apscheduler.schedulers.background import BackgroundScheduler
+
+# fcntl n'existe pas sous Windows : sans lui, pas de verrou entre processus
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+from . import base_de_donnees
+from . import maintenance
+
+journal = logging.getLogger(__name__)
+
+# Tâches de fond de l'application, dans un fil d'exécution du processus.
+planificateur = BackgroundScheduler(daemon=True)
+
+# Un seul processus, celui qui tient le verrou, fait les tâches ; les
+# autres réessaient toutes les ATTENTE_VERROU secondes de le prendre (si
+# ce processus s'arrête, un autre le remplace)
+ATTENTE_VERROU = 60
+_etat = {"verrou": None, "attente": None}
+_verrou = threading.Lock()
+
+
+def purger_sessions(taille_lot=500, pause=0.05):
+    """
+    Cette fonction supprime les sessions expirées par petits lots, chacun
+    dans sa propre transaction, avec une pause entre deux lots : le verrou
+    d'écriture de SQLite n'est jamais gardé longtemps. Les révocations de
+    jetons expirées sont supprimées ensuite.
+
+    Returns:
+        int: Le nombre de sessions supprimées.
+    """
+    database = base_de_donnees.Database()
+    total = 0
+    try:
+        while True:
+            nombre = database.purger_sessions(taille_lot)
+            total += nombre
+            if nombre < taille_lot:
+                break
+            time.sleep(pause)
+        database.purger_revocations()
+    finally:
+        database.deconnecter()
+    if total:
+        journal.info("%d session(s) expirée(s) supprimée(s)", total)
+    return total
+
+
+def prendre_verrou(chemin):
+    """
+    Cette fonction prend, sans attendre, le verrou exclusif du fichier
+    `chemin`, gardé jusqu'à la fin du processus (ou os.close).
+
+    Returns:
+        int: Le descripteur du fichier verrouillé, ou None si un autre
+        processus tient déjà le verrou.
+    """
+    descripteur = os.open(chemin, os.O_RDWR | os.O_CREAT, 0o644)
+    if fcntl is None:
+        return descripteur
+    try:
+        fcntl.flock(descripteur, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        os.close(descripteur)
+        return None
+    return descripteur
+
+
+def demarrer(app, chemin_verrou=None):
+    """
+    Cette fonction démarre les tâches de fond dans ce processus s'il est
+    le seul à le faire (verrou `chemin_verrou`, à côté de la base par
+    défaut), ou attend en tâche de fond que le verrou se libère. Sans
+    effet si elle a déjà été appelée.
+
+    Returns:
+        bool: True si le planificateur tourne dans ce processus.
+    """
+    if planificateur.running or _etat["attente"] is not None:
+        return planificateur.running
+    with _verrou:
+        if planificateur.running or _etat["attente"] is not None:
+            return planificateur.running
+        chemin_verrou = (chemin_verrou
+                         or base_de_donnees.get_pool().chemin + ".taches")
+        _etat["verrou"] = prendre_verrou(chemin_verrou)
+        if _etat["verrou"] is not None:
+            _planifier(app)
+            return True
+
+        def attendre():
+            while _etat["verrou"] is None:
+                time.sleep(ATTENTE_VERROU)
+                _etat["verrou"] = prendre_verrou(chemin_verrou)
+            with _verrou:
+                _planifier(app)
+        _etat["attente"] = threading.Thread(target=attendre, daemon=True)
+        _etat["attente"].start()
+        return False
+
+
+def _planifier(app):
+    journal.info("Tâches de fond démarrées (processus %d)", os.getpid())
+    planificateur.add_job(
+        purger_sessions, "interval", id="purger_sessions",
+        seconds=app.config["SESSIONS_PURGE_INTERVALLE"],
+        kwargs={"taille_lot": app.config["SESSIONS_PURGE_LOT"]},
+        # Une exécution en retard n'est faite qu'une fois
+        max_instances=1, coalesce=True, replace_existing=True)
+    if app.config["MAINTENANCE_HEURE"] is not None:
+        # Chaque jour, aux heures creuses
+        planificateur.add_job(
+            maintenance.maintenir, "cron", id="maintenance",
+            hour=app.config["MAINTENANCE_HEURE"],
+            minute=app.config["MAINTENANCE_MINUTE"],
+            max_instances=1, coalesce=True, replace_existing=True,
+            misfire_grace_time=3600)
+    planificateur.start()
+    atexit.register(arreter)
+
+
+def arreter():
+    if planificateur.running:
+        planificateur.shutdown(wait=False)
+    if _etat["verrou"] is not None:
+        os.close(_etat["verrou"])
+        _etat["verrou"] = None
@@ -0,0 +1,74 @@
+import os
+import shutil
+import sqlite3
+import sys
+
+import pytest
+
+RACINE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# L'application s'importe comme un paquet : package.app
+sys.path.insert(0, os.path.dirname(RACINE))
+os.environ.setdefault("SECRET_KEY", "tests")
+os.environ["TACHES_PLANIFIEES"] = "0"
+
+
+def copier_base(source, destination):
+    # backup() : copie cohérente même si la source est en mode WAL
+    origine = sqlite3.connect(source)
+    copie = sqlite3.connect(destination)
+    try:
+        origine.backup(copie)
+    finally:
+        copie.close()
+        origine.close()
+    return destination
+
+
+@pytest.fixture(scope="session")
+def application(tmp_path_factory):
+    """
+    L'application, sur une copie migrée de database.db (jamais la base
+    du dépôt).
+    """
+    chemin = str(tmp_path_factory.mktemp("bd") / "modele.db")
+    shutil.copy(os.path.join(RACINE, "database.db"), chemin)
+    from package import base_de_donnees
+    base_de_donnees.CHEMIN_BD = chemin
+    from package.app import app
+    app.config["TESTING"] = True
+    return app
+
+
+@pytest.fixture
+def bd(application, tmp_path):
+    """
+    Une copie neuve de la base pour chaque test, caches vidés.
+
+    Returns:
+        str: Le chemin de la copie.
+    """
+    from package import base_de_donnees, cache, coherence
+    chemin = copier_base(base_de_donnees.CHEMIN_BD,
+                         str(tmp_path / "database.db"))
+    base_de_donnees.configurer_pool(chemin=chemin, taille=2)
+    for cache_lru in (cache.sessions, cache.pages, cache.auteurs,
+                      cache.auteurs_articles, cache.recherches,
+                      cache.compressions):
+        cache_lru.vider()
+    cache.article_modifie()
+    coherence.verifier()
+    yield chemin
+    base_de_donnees.get_pool().fermer()
+
+
+@pytest.fixture
+def client(application, bd):
+    return application.test_client()
+
+
+@pytest.fixture
+def client_connecte(client):
+    reponse = client.post("/admin", data={"username": "prof",
+                                          "password": "secret1234"})
+    assert reponse.status_code == 302
+    return client
@@ -0,0 +1,82 @@
+import pytest
+
+from package import base_de_donnees, cache, migrations
+
+
+@pytest.fixture
+def requetes(bd):
+    """
+    Les requêtes SQL envoyées par le pool pendant le test.
+    """
+    envoyees = []
+
+    def tracer(requete):
+        if not migrations.REQUETE_INTERNE.search(requete):
+            envoyees.append(requete)
+    base_de_donnees.ajouter_traceur(tracer)
+    base_de_donnees.configurer_pool(chemin=bd, taille=2)
+    yield envoyees
+    base_de_donnees.retirer_traceur(tracer)
+
+
+def test_auteur_en_cache_seul_article_lu(application, requetes):
+    database = base_de_donnees.Database()
+    try:
+        # Auteur inconnu : article et auteur en une requête
+        article, auteur = database.get_article_et_auteur("article1")
+        assert auteur["username"] == "prof"
+        assert len(requetes) == 1
+        assert "utilisateurs" in requetes[0]
+
+        del requetes[:]
+        article, auteur = database.get_article_et_auteur("article1")
+        assert article["identifiant"] == "article1"
+        assert auteur["username"] == "prof"
+        assert len(requetes) == 1
+        assert "utilisateurs" not in requetes[0]
+    finally:
+        database.deconnecter()
+
+
+def test_auteur_modifie_pendant_la_lecture(application, bd):
+    version = cache.version_auteurs()
+    cache.auteur_modifie("prof")
+    cache.definir_auteur("prof", {"username": "prof"}, version)
+    assert cache.auteurs.get("prof") is None
+
+    cache.definir_auteur("prof", {"username": "prof"},
+                         cache.version_auteurs())
+    assert cache.auteurs.get("prof") == {"username": "prof"}
+
+
+def test_etat_change_relu(client_connecte):
+    database = base_de_donnees.Database()
+    try:
+        _, auteur = database.get_article_et_auteur("article1")
+    finally:
+        database.deconnecter()
+    nouvel_etat = 0 if auteur["etat"] else 1
+    reponse = client_connecte.post("/changer_etat_utilisateur/prof",
+                                   data={"etat": str(nouvel_etat)})
+    assert reponse.status_code == 302
+
+    database = base_de_donnees.Database()
+    try:
+        _, auteur = database.get_article_et_auteur("article1")
+    finally:
+        database.deconnecter()
+    assert auteur["etat"] == nouvel_etat
+
+
+def test_auteur_change_relu(application, requetes):
+    database = base_de_donnees.Database()
+    try:
+        database.get_article_et_auteur("article1")
+        database.get_info_utilisateurs("adam")
+        database.get_connexion().execute(
+            "UPDATE articles SET auteur = 'adam' WHERE identifiant = ?",
+            ("article1",))
+        _, auteur = database.get_article_et_auteur("article1")
+    finally:
+        database.deconnecter()
+    assert auteur["username"] == "adam"
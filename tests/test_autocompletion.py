@@ -0,0 +1,93 @@
+import random
+
+import pytest
+
+from package import autocompletion, base_de_donnees
+
+
+class _Titres:
+    def __init__(self, articles):
+        self.articles = articles
+
+    def parcourir_titres(self):
+        return iter(self.articles)
+
+
+@pytest.fixture
+def index(bd):
+    aleatoire = random.Random(0)
+    mots = ["école", "ecran", "été", "etat", "avenir", "art", "eau"]
+    # Un article sur dix est à paraître
+    articles = [{"identifiant": f"article-{numero}",
+                 "titre": " ".join(aleatoire.choice(mots) for _ in range(3)),
+                 "date_publication": (f"{2999 if numero % 10 == 0 else 2020}"
+                                      f"-01-{aleatoire.randint(1, 28):02}"),
+                 "id": numero}
+                for numero in range(2000)]
+    autocompletion.construire(_Titres(articles))
+    yield articles
+    database = base_de_donnees.Database()
+    try:
+        autocompletion.construire(database)
+    finally:
+        database.deconnecter()
+
+
+def _attendus(articles, saisie, limite):
+    prefixe = autocompletion.normaliser(saisie)
+    publies = [a for a in articles
+               if a["date_publication"] <= autocompletion._aujourd_hui()]
+    trouves = [a for a in publies
+               if any(cle.startswith(prefixe) for cle, _ in
+                      autocompletion._cles_article(a["identifiant"],
+                                                   a["titre"]))]
+    trouves.sort(key=lambda a: (a["date_publication"], a["id"]),
+                 reverse=True)
+    return [(a["identifiant"], a["titre"], a["date_publication"])
+            for a in trouves[:limite]]
+
+
+# Tri de toutes les clés, parcours des plus récents, ou les deux (parcours
+# abandonné : correspondances trop dispersées)
+@pytest.mark.parametrize("balayage_max", [2, 50, 500, 10 ** 6])
+@pytest.mark.parametrize("saisie", ["e", "é", "ec", "art", "eau art",
+                                    "article-1", "zzz"])
+def test_plus_recents_exacts(index, monkeypatch, balayage_max, saisie):
+    monkeypatch.setattr(autocompletion, "BALAYAGE_MAX", balayage_max)
+    assert (autocompletion.completer(saisie, 10)
+            == _attendus(index, saisie, 10))
+
+
+def test_index_tenu_a_jour(index):
+    autocompletion.article_ajoute("tout-neuf", "École neuve", "2025-01-01",
+                                  5000)
+    assert autocompletion.completer("e", 1)[0][0] == "tout-neuf"
+    autocompletion.article_modifie("tout-neuf", "renomme", "Zèbre")
+    assert autocompletion.completer("e", 1)[0][0] != "renomme"
+    assert autocompletion.completer("zebre", 1)[0][0] == "renomme"
+    autocompletion.article_supprime("renomme")
+    assert autocompletion.completer("zebre") == []
+
+
+def test_article_a_paraitre_propose_a_sa_date(index, monkeypatch):
+    autocompletion.article_ajoute("a-paraitre", "Zèbre futur", "3000-01-01",
+                                  5001)
+    assert autocompletion.completer("zebre") == []
+    monkeypatch.setattr(autocompletion, "_aujourd_hui", lambda: "3000-01-01")
+    assert autocompletion.completer("zebre") == [
+        ("a-paraitre", "Zèbre futur", "3000-01-01")]
+
+
+def test_rafraichir_seulement_les_changements(index):
+    articles = [dict(article) for article in index[1:]]
+    articles[0]["titre"] = "Zèbre renommé"
+    articles.append({"identifiant": "nouveau", "titre": "Zèbre nouveau",
+                     "date_publication": "2021-01-01", "id": 9000})
+    assert autocompletion.rafraichir(_Titres(articles)) == 3
+    trouves = [identifiant for identifiant, _, _
+               in autocompletion.completer("zebre")]
+    assert trouves == ["nouveau", articles[0]["identifiant"]]
+    for saisie in ("e", "art", "article-0", "zebre"):
+        assert (autocompletion.completer(saisie, 10)
+                == _attendus(articles, saisie, 10))
+    assert autocompletion.rafraichir(_Titres(articles)) == 0
@@ -0,0 +1,68 @@
+from package import base_de_donnees, cache, migrations
+
+
+def test_borne_en_octets():
+    recherches = cache.CacheLRU(taille_max=100, octets_max=1000)
+    for numero in range(5):
+        recherches.definir(numero, "page", octets=300)
+    statistiques = recherches.statistiques()
+    assert statistiques["octets"] == 900
+    assert statistiques["evictions"] == 2
+    assert [recherches.get(numero) for numero in range(5)] == [
+        None, None, "page", "page", "page"]
+    recherches.supprimer(4)
+    assert recherches.statistiques()["octets"] == 600
+
+
+def test_borne_en_nombre():
+    recherches = cache.CacheLRU(taille_max=3, octets_max=10 ** 6)
+    for numero in range(10):
+        recherches.definir(numero, "page", octets=1)
+    assert len(recherches) == 3
+    assert recherches.statistiques()["octets"] == 3
+
+
+def _rechercher(recherche):
+    database = base_de_donnees.Database()
+    try:
+        return database.rechercher_article(recherche)
+    finally:
+        database.deconnecter()
+
+
+def test_saisies_equivalentes_lues_une_fois(bd):
+    premiere = _rechercher("article")
+    requetes = []
+
+    def tracer(requete):
+        if not migrations.REQUETE_INTERNE.search(requete):
+            requetes.append(requete)
+    base_de_donnees.ajouter_traceur(tracer)
+    base_de_donnees.configurer_pool(chemin=bd, taille=2)
+    try:
+        for saisie in ("article", "ARTICLE", "article !", "  Article"):
+            assert _rechercher(saisie) == premiere
+    finally:
+        base_de_donnees.retirer_traceur(tracer)
+    assert requetes == []
+    assert base_de_donnees.recherche_en_cache("Article") == premiere
+
+
+def test_videe_a_l_ecriture_d_un_article(bd):
+    nombre = len(_rechercher("pangolin")["articles"])
+    database = base_de_donnees.Database()
+    try:
+        database.ajout_article("Le pangolin", "pangolin", "prof",
+                               "2020-01-01", "Contenu.")
+    finally:
+        database.deconnecter()
+    assert base_de_donnees.recherche_en_cache("pangolin") is None
+    assert len(_rechercher("pangolin")["articles"]) == nombre + 1
+
+
+def test_resultat_calcule_pendant_une_ecriture_non_garde(bd):
+    cle = base_de_donnees.cle_recherche("article")
+    version = cache.version_articles()
+    cache.article_modifie("article1")
+    cache.definir_recherche(cle, {"articles": []}, version, 10)
+    assert cache.get_recherche(cle) is None
@@ -0,0 +1,29 @@
+import os
+import subprocess
+import sys
+
+# Le dossier qui contient le paquet
+PARENT = os.path.dirname(os.path.dirname(os.path.dirname(
+    os.path.abspath(__file__))))
+
+
+def test_application_sans_benchmark(bd):
+    # Dans un processus neuf (les tests ont pu importer benchmark), sur
+    # une copie de la base
+    script = ("import sys\n"
+              "from package import base_de_donnees\n"
+              "base_de_donnees.CHEMIN_BD = sys.argv[1]\n"
+              "from package import app\n"
+              "print(any(nom.startswith('package.benchmark')\n"
+              "          for nom in sys.modules))\n")
+    sortie = subprocess.run(
+        [sys.executable, "-c", script, bd], check=True, capture_output=True,
+        text=True, cwd=PARENT).stdout
+    assert sortie.strip() == "False"
+
+
+def test_commande_bench_chargee_a_l_usage(application):
+    resultat = application.test_cli_runner().invoke(args=["bench", "--help"])
+    assert resultat.exit_code == 0, resultat.output
+    assert "generer" in resultat.output
+    assert "executer" in resultat.output
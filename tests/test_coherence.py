@@ -0,0 +1,102 @@
+import subprocess
+import sys
+
+import pytest
+
+from package import base_de_donnees, cache, coherence
+
+
+def ecrire_ailleurs(chemin, requete, *parametres):
+    """
+    Exécute une écriture dans un autre processus.
+    """
+    script = ("import sqlite3, sys\n"
+              "connexion = sqlite3.connect(sys.argv[1])\n"
+              "connexion.execute(sys.argv[2], sys.argv[3:])\n"
+              "connexion.commit()\n")
+    subprocess.run([sys.executable, "-c", script, chemin, requete,
+                    *parametres], check=True)
+
+
+@pytest.fixture
+def reactions(bd, monkeypatch):
+    """
+    Les domaines dont les réactions ont été appelées.
+    """
+    appels = []
+    for domaine in ("articles", "utilisateurs", "sessions"):
+        monkeypatch.setitem(coherence._reactions, domaine,
+                            [lambda domaine=domaine: appels.append(domaine)])
+    return appels
+
+
+def test_page_article_relue_apres_ecriture_ailleurs(client, bd):
+    assert "Nouveau titre" not in client.get(
+        "/article/article1").get_data(as_text=True)
+    ecrire_ailleurs(bd, "UPDATE articles SET titre = ? "
+                    "WHERE identifiant = 'article1'", "Nouveau titre")
+    page = client.get("/article/article1").get_data(as_text=True)
+    assert "Nouveau titre" in page
+
+
+def test_ecritures_propres_ignorees(reactions, bd):
+    database = base_de_donnees.Database()
+    try:
+        database.supprimer_article("article1")
+    finally:
+        database.deconnecter()
+    assert coherence.verifier() == []
+    assert reactions == []
+
+    ecrire_ailleurs(bd, "DELETE FROM articles WHERE identifiant = ?",
+                    "article2")
+    assert coherence.verifier() == ["articles"]
+    assert reactions == ["articles"]
+
+
+def test_ecritures_propres_et_d_ailleurs_melangees(reactions, bd):
+    database = base_de_donnees.Database()
+    try:
+        database.supprimer_article("article1")
+        ecrire_ailleurs(bd, "DELETE FROM articles WHERE identifiant = ?",
+                        "article2")
+        database.supprimer_article("article4")
+    finally:
+        database.deconnecter()
+    assert coherence.verifier() == ["articles"]
+
+
+def test_ecrivain_unique(reactions, bd):
+    base_de_donnees.configurer_ecrivain(chemin=bd)
+    database = base_de_donnees.Database()
+    try:
+        database.supprimer_article("article1")
+    finally:
+        database.deconnecter()
+        base_de_donnees.configurer_ecrivain(actif=False)
+    assert coherence.verifier() == []
+    assert reactions == []
+
+
+def test_deconnexion_ne_vide_pas_les_sessions(client_connecte):
+    cache.sessions.definir("autre-session", ("adam", 0))
+    client_connecte.get("/logout")
+    client_connecte.get("/")
+    assert cache.sessions.get("autre-session") == ("adam", 0)
+
+
+def test_ecritures_propres_oubliees_avec_la_base(reactions, bd, tmp_path):
+    from conftest import copier_base
+    autre = copier_base(bd, str(tmp_path / "autre.db"))
+    database = base_de_donnees.Database()
+    try:
+        # Notée comme propre, mais pas encore vérifiée
+        database.supprimer_article("article1")
+    finally:
+        database.deconnecter()
+    base_de_donnees.configurer_pool(chemin=autre, taille=2)
+    coherence.verifier()
+    # La même génération, atteinte dans l'autre base par un autre processus
+    ecrire_ailleurs(autre, "DELETE FROM articles WHERE identifiant = ?",
+                    "article1")
+    assert coherence.verifier() == ["articles"]
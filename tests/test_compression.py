@@ -0,0 +1,55 @@
+import gzip
+import types
+
+import pytest
+
+from package import compression
+
+
+@pytest.fixture
+def seuil_bas(application, monkeypatch):
+    monkeypatch.setitem(application.config, "COMPRESSION_SEUIL", 1)
+
+
+def test_gzip_si_accepte(client, seuil_bas):
+    brute = client.get("/article/article1")
+    compressee = client.get("/article/article1",
+                            headers={"Accept-Encoding": "gzip, deflate"})
+    assert "Content-Encoding" not in brute.headers
+    assert compressee.headers["Content-Encoding"] == "gzip"
+    assert gzip.decompress(compressee.get_data()) == brute.get_data()
+    assert compressee.headers["ETag"] == brute.headers["ETag"][:-1] + '-gzip"'
+    assert "Accept-Encoding" in compressee.headers["Vary"]
+
+
+@pytest.mark.parametrize("accept_encoding", ["", "identity", "gzip;q=0"])
+def test_sans_encodage_accepte(client, seuil_bas, accept_encoding):
+    reponse = client.get("/article/article1",
+                         headers={"Accept-Encoding": accept_encoding})
+    assert "Content-Encoding" not in reponse.headers
+
+
+def test_sous_le_seuil(client, application, monkeypatch):
+    monkeypatch.setitem(application.config, "COMPRESSION_SEUIL", 10 ** 7)
+    reponse = client.get("/article/article1",
+                         headers={"Accept-Encoding": "gzip"})
+    assert "Content-Encoding" not in reponse.headers
+
+
+def test_compressee_une_fois_par_version(client, seuil_bas):
+    client.get("/article/article1", headers={"Accept-Encoding": "gzip"})
+    compressions = compression.statistiques()["compressions"]
+    for _ in range(3):
+        client.get("/article/article1", headers={"Accept-Encoding": "gzip"})
+    assert compression.statistiques()["compressions"] == compressions
+
+
+def test_brotli_prefere(client, seuil_bas, monkeypatch):
+    monkeypatch.setattr(compression, "brotli", types.SimpleNamespace(
+        compress=lambda donnees, quality: b"br:" + donnees))
+    reponse = client.get("/article/article1",
+                         headers={"Accept-Encoding": "gzip, br"})
+    assert reponse.headers["Content-Encoding"] == "br"
+    assert reponse.get_data().startswith(b"br:")
+    assert client.get("/article/article1", headers={
+        "Accept-Encoding": "gzip"}).headers["Content-Encoding"] == "gzip"
@@ -0,0 +1,78 @@
+import pytest
+
+from package import base_de_donnees, migrations
+
+
+def test_304_si_etag_connu(client):
+    premiere = client.get("/article/article1")
+    assert premiere.status_code == 200
+    etag = premiere.headers["ETag"]
+    reponse = client.get("/article/article1",
+                         headers={"If-None-Match": etag})
+    assert reponse.status_code == 304
+    assert reponse.get_data() == b""
+    assert reponse.headers["ETag"] == etag
+
+
+def test_304_si_non_modifie_depuis(client):
+    premiere = client.get("/")
+    reponse = client.get("/", headers={
+        "If-Modified-Since": premiere.headers["Last-Modified"]})
+    assert reponse.status_code == 304
+
+
+def test_nouvelle_version_apres_modification(client):
+    etag = client.get("/article/article1").headers["ETag"]
+    database = base_de_donnees.Database()
+    try:
+        database.modifier_article("article1", "Titre modifié", "article1",
+                                  "Contenu modifié")
+    finally:
+        database.deconnecter()
+    reponse = client.get("/article/article1",
+                         headers={"If-None-Match": etag})
+    assert reponse.status_code == 200
+    assert reponse.headers["ETag"] != etag
+    assert "Titre modifié" in reponse.get_data(as_text=True)
+
+
+def test_variante_compressee(client, application, monkeypatch):
+    monkeypatch.setitem(application.config, "COMPRESSION_SEUIL", 1)
+    compressee = client.get("/article/article1",
+                            headers={"Accept-Encoding": "gzip"})
+    assert compressee.headers["Content-Encoding"] == "gzip"
+    etag = compressee.headers["ETag"]
+    reponse = client.get("/article/article1", headers={
+        "Accept-Encoding": "gzip", "If-None-Match": etag})
+    assert reponse.status_code == 304
+
+
+def test_etag_depend_de_la_connexion(client):
+    anonyme = client.get("/article/article1").headers["ETag"]
+    client.post("/admin", data={"username": "prof",
+                                "password": "secret1234"})
+    connecte = client.get("/article/article1")
+    assert connecte.status_code == 200
+    assert connecte.headers["ETag"] != anonyme
+    assert client.get("/article/article1", headers={
+        "If-None-Match": anonyme}).status_code == 200
+
+
+@pytest.mark.parametrize("url", ["/", "/article/article1"])
+def test_page_en_cache_sans_requete(client, bd, url):
+    premiere = client.get(url)
+    requetes = []
+
+    def tracer(requete):
+        if not migrations.REQUETE_INTERNE.search(requete):
+            requetes.append(requete)
+    base_de_donnees.ajouter_traceur(tracer)
+    base_de_donnees.configurer_pool(chemin=bd, taille=2)
+    try:
+        reponse = client.get(url, headers={
+            "If-None-Match": premiere.headers["ETag"]})
+        assert reponse.status_code == 304
+        assert client.get(url).get_data() == premiere.get_data()
+    finally:
+        base_de_donnees.retirer_traceur(tracer)
+    assert requetes == []
@@ -0,0 +1,41 @@
+import base64
+import json
+
+import pytest
+
+from package import base_de_donnees
+
+
+def _forger(texte):
+    return base64.urlsafe_b64encode(texte.encode("utf-8")).decode("ascii")
+
+
+@pytest.mark.parametrize("valeurs", [["2024-01-01", 3], [0.25, 7],
+                                     ["b", "a"]])
+def test_aller_retour(valeurs):
+    curseur = base_de_donnees.encoder_curseur(valeurs)
+    assert base_de_donnees.decoder_curseur(curseur) == valeurs
+
+
+@pytest.mark.parametrize("texte", [
+    "[{},1]", "[[1],[2]]", "[null,1]", "[true,1]", "[1]", "[1,2,3]",
+    '{"a":1}', "[NaN,1]", "[Infinity,1]", "pas du json",
+])
+def test_curseur_forge(texte):
+    assert base_de_donnees.decoder_curseur(_forger(texte)) is None
+
+
+@pytest.mark.parametrize("curseur", [None, "", "%%%", "é"])
+def test_curseur_illisible(curseur):
+    assert base_de_donnees.decoder_curseur(curseur) is None
+
+
+@pytest.mark.parametrize("route", ["/recherche?q=article&apres={}",
+                                   "/recherche?q=article&avant={}",
+                                   "/liste-articles?apres={}"])
+def test_routes_curseur_forge(client_connecte, route):
+    curseur = _forger(json.dumps([{}, 1]))
+    reponse = client_connecte.get(route.format(curseur))
+    assert reponse.status_code == 200
+    # Le corps diffusé doit aller jusqu'au bout
+    assert reponse.get_data(as_text=True).rstrip().endswith("</html>")
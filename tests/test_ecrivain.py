@@ -0,0 +1,90 @@
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from package import base_de_donnees
+
+
+@pytest.fixture
+def ecrivain(bd):
+    connexion = sqlite3.connect(bd)
+    connexion.execute("CREATE TABLE ordre(valeur INTEGER NOT NULL)")
+    connexion.commit()
+    connexion.close()
+    ecrivain = base_de_donnees.EcrivainUnique(chemin=bd, latence=0.05,
+                                              taille_lot=50)
+    yield ecrivain
+    ecrivain.fermer()
+
+
+def _inserer(valeur):
+    def operation(connexion):
+        connexion.execute("INSERT INTO ordre(valeur) VALUES (?)", (valeur,))
+        return valeur
+    return operation
+
+
+def _valeurs(bd):
+    connexion = sqlite3.connect(bd)
+    try:
+        return [valeur for valeur, in connexion.execute(
+            "SELECT valeur FROM ordre ORDER BY rowid")]
+    finally:
+        connexion.close()
+
+
+def test_ordre_de_soumission_et_lots(ecrivain, bd):
+    futures = [ecrivain.soumettre(_inserer(valeur)) for valeur in range(120)]
+    assert [future.result(5) for future in futures] == list(range(120))
+    assert _valeurs(bd) == list(range(120))
+    statistiques = ecrivain.statistiques()
+    assert statistiques["operations"] == 120
+    # Soumises plus vite que la latence : regroupées par lots complets
+    assert statistiques["transactions"] <= 3
+
+
+def test_operation_en_erreur_isolee(ecrivain, bd):
+    def en_erreur(connexion):
+        connexion.execute("INSERT INTO ordre(valeur) VALUES (1)")
+        connexion.execute("INSERT INTO ordre(valeur) VALUES (NULL)")
+
+    futures = [ecrivain.soumettre(_inserer(0)),
+               ecrivain.soumettre(en_erreur),
+               ecrivain.soumettre(_inserer(2))]
+    assert futures[0].result(5) == 0
+    with pytest.raises(sqlite3.IntegrityError):
+        futures[1].result(5)
+    assert futures[2].result(5) == 2
+    assert _valeurs(bd) == [0, 2]
+    assert ecrivain.statistiques()["erreurs"] == 1
+
+
+def test_fermer_apres_les_operations_soumises(ecrivain, bd):
+    futures = [ecrivain.soumettre(_inserer(valeur)) for valeur in range(10)]
+    ecrivain.fermer()
+    assert all(future.done() for future in futures)
+    assert _valeurs(bd) == list(range(10))
+
+
+def test_ecritures_concurrentes_de_database(bd):
+    base_de_donnees.configurer_ecrivain(chemin=bd)
+
+    def ajouter(numero):
+        database = base_de_donnees.Database()
+        try:
+            database.ajout_article(f"Titre {numero}", f"concurrent-{numero}",
+                                   "prof", "2020-01-01", "Contenu.")
+        finally:
+            database.deconnecter()
+    try:
+        with ThreadPoolExecutor(8) as executeur:
+            list(executeur.map(ajouter, range(40)))
+    finally:
+        base_de_donnees.configurer_ecrivain(actif=False)
+    connexion = sqlite3.connect(bd)
+    try:
+        assert connexion.execute("""SELECT COUNT(*) FROM articles
+         WHERE identifiant LIKE 'concurrent-%'""").fetchone()[0] == 40
+    finally:
+        connexion.close()
@@ -0,0 +1,60 @@
+import pytest
+
+from package import base_de_donnees, migrations
+
+
+@pytest.fixture
+def database(bd):
+    database = base_de_donnees.Database()
+    yield database
+    database.deconnecter()
+
+
+@pytest.mark.parametrize("taille", [1, 2, 100])
+def test_pages_identiques_a_get_articles(database, taille):
+    attendue = database.get_articles(limite=taille)
+    page = database.parcourir_articles(limite=taille)
+    articles = list(page["articles"])
+    assert articles == [{cle: article[cle] for cle in articles[0]}
+                        for article in attendue["articles"]]
+    assert "contenu" not in articles[0]
+    assert page["suivant"] == attendue["suivant"]
+    assert page["precedent"] == attendue["precedent"]
+    if page["suivant"]:
+        suivante = database.parcourir_articles(apres=page["suivant"],
+                                               limite=taille)
+        assert list(suivante["articles"]) == [
+            {cle: article[cle] for cle in articles[0]} for article
+            in database.get_articles(apres=page["suivant"],
+                                     limite=taille)["articles"]]
+
+
+def test_lu_au_fil_du_parcours(database, bd):
+    requetes = []
+
+    def tracer(requete):
+        if not migrations.REQUETE_INTERNE.search(requete):
+            requetes.append(requete)
+    base_de_donnees.ajouter_traceur(tracer)
+    base_de_donnees.configurer_pool(chemin=bd, taille=2)
+    try:
+        page = database.parcourir_articles()
+        assert requetes == []
+        next(page["articles"])
+        assert len(requetes) == 1
+    finally:
+        base_de_donnees.retirer_traceur(tracer)
+
+
+@pytest.mark.parametrize("url", ["/liste-articles", "/utilisateurs"])
+def test_listes_envoyees_en_flux(client_connecte, url):
+    reponse = client_connecte.get(url)
+    assert reponse.status_code == 200
+    assert reponse.is_streamed
+    page = reponse.get_data(as_text=True)
+    assert page.rstrip().endswith("</html>")
+    assert ("article1" if url == "/liste-articles" else "prof") in page
+    reponse.close()
+    # La connexion de la requête est rendue une fois la réponse envoyée
+    statistiques = base_de_donnees.get_pool().statistiques()
+    assert statistiques["libres"] == statistiques["ouvertes"]
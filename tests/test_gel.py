@@ -0,0 +1,48 @@
+import os
+
+import pytest
+
+from package import base_de_donnees, gel
+
+
+def _supprimer(identifiant):
+    database = base_de_donnees.Database()
+    try:
+        database.supprimer_article(identifiant)
+    finally:
+        database.deconnecter()
+
+
+@pytest.fixture
+def dossier(application, bd, tmp_path):
+    dossier = str(tmp_path / "public")
+    resultat = gel.geler(application, dossier, processus=1)
+    assert resultat["rendus"] > 0
+    assert os.path.exists(gel.chemin_article(dossier, "article1"))
+    return dossier
+
+
+def test_suppression_incrementale(application, dossier):
+    _supprimer("article1")
+    resultat = gel.geler(application, dossier, processus=1)
+    assert resultat == {"rendus": 0, "supprimes": 1, "accueil": True}
+    assert not os.path.exists(gel.chemin_article(dossier, "article1"))
+
+
+def test_suppression_complete(application, dossier):
+    _supprimer("article1")
+    resultat = gel.geler(application, dossier, processus=1, complet=True)
+    assert resultat["supprimes"] == 1
+    assert not os.path.exists(gel.chemin_article(dossier, "article1"))
+    # Une nouvelle exécution complète ne retire plus rien
+    assert gel.geler(application, dossier, processus=1,
+                     complet=True)["supprimes"] == 0
+
+
+def test_suppression_complete_sans_manifeste(application, dossier):
+    os.remove(os.path.join(dossier, gel.MANIFESTE))
+    _supprimer("article1")
+    resultat = gel.geler(application, dossier, processus=1, complet=True)
+    assert resultat["supprimes"] == 1
+    assert not os.path.exists(gel.chemin_article(dossier, "article1"))
+    assert os.path.exists(gel.chemin_article(dossier, "article2"))
@@ -0,0 +1,72 @@
+import io
+import sqlite3
+
+import pytest
+from PIL import Image
+
+from package import base_de_donnees, images, migrations
+
+
+def _jpeg(largeur, hauteur):
+    sortie = io.BytesIO()
+    Image.new("RGB", (largeur, hauteur), (200, 30, 30)).save(sortie, "JPEG")
+    return sortie.getvalue()
+
+
+def test_miniature_reduite():
+    photo, miniature = images.preparer(_jpeg(800, 600))
+    assert photo["hash"] != miniature["hash"]
+    with Image.open(io.BytesIO(miniature["donnees"])) as image:
+        assert max(image.size) == images.DIMENSION_MINIATURE
+    assert len(miniature["donnees"]) < len(photo["donnees"])
+
+
+def test_grande_image_reduite():
+    photo, _ = images.preparer(_jpeg(3000, 1500))
+    with Image.open(io.BytesIO(photo["donnees"])) as image:
+        assert image.size == (images.DIMENSION_MAX, images.DIMENSION_MAX // 2)
+
+
+def test_petite_image_sans_miniature():
+    photo, miniature = images.preparer(_jpeg(100, 100))
+    assert photo == miniature
+
+
+@pytest.mark.parametrize("donnees", [
+    # Signature JPEG, mais pas une image
+    b"\xff\xd8\xff\xe0" + bytes(2000),
+    b"pas une image",
+    _jpeg(400, 300)[:300],
+])
+def test_image_invalide(donnees):
+    with pytest.raises(images.ImageInvalide):
+        images.preparer(donnees)
+
+
+def test_migration_des_miniatures(bd):
+    moyenne = images.empreinte(_jpeg(800, 600))
+    grande = images.empreinte(_jpeg(2000, 1000))
+    connexion = sqlite3.connect(bd)
+    try:
+        # Photos rangées sans miniature (migration 9)
+        for photo, username in ((moyenne, "prof"), (grande, "adam")):
+            base_de_donnees.enregistrer_photo(connexion, photo, photo)
+            connexion.execute("""UPDATE utilisateurs SET photo_hash = ?
+             WHERE username = ?""", (photo["hash"], username))
+        migrations._miniatures_photos(connexion)
+        connexion.commit()
+
+        photos = dict(connexion.execute("""SELECT u.username,
+         p.hash != p.miniature
+         FROM utilisateurs u JOIN photos p ON p.hash = u.photo_hash
+         WHERE u.username IN ('prof', 'adam')""").fetchall())
+        assert photos == {"prof": 1, "adam": 1}
+        hash_prof, = connexion.execute("""SELECT photo_hash FROM utilisateurs
+         WHERE username = 'prof'""").fetchone()
+        # Assez petite : seule la miniature est ajoutée
+        assert hash_prof == moyenne["hash"]
+        # Réduite : l'ancienne n'est plus gardée
+        assert connexion.execute("SELECT COUNT(*) FROM photos WHERE hash = ?",
+                                 (grande["hash"],)).fetchone()[0] == 0
+    finally:
+        connexion.close()
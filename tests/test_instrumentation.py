@@ -0,0 +1,41 @@
+from flask import Response, g
+
+from package import instrumentation
+
+
+def _appel(methode):
+    return {"methode": methode, "sql": ["SELECT 1"], "duree": 0.001,
+            "lignes": 1}
+
+
+def test_cumuls_a_la_fermeture(application):
+    with application.test_request_context("/diffusee"):
+        g._appels_sql = [_appel("avant")]
+        reponse = instrumentation._apres_requete(Response("page"))
+        assert "avant;dur=" in reponse.headers["Server-Timing"]
+        # Appel fait pendant la diffusion de la page
+        g._appels_sql.append(_appel("pendant"))
+        assert "/diffusee" not in instrumentation.statistiques()["routes"]
+        reponse.close()
+
+    stats = instrumentation.statistiques()["routes"]["/diffusee"]
+    assert stats["appels"] == 2
+    assert stats["requetes_sql"] == 2
+    assert stats["sequences"] == {"avant > pendant": 1}
+
+
+def test_generateur_mesure_pendant_son_parcours(application):
+    def parcourir(database):
+        for numero in range(3):
+            instrumentation._tracer(f"SELECT {numero}")
+            yield numero
+
+    mesuree = instrumentation._mesurer("parcourir_test", parcourir)
+    with application.test_request_context("/generateur"):
+        assert list(mesuree(None)) == [0, 1, 2]
+        appel, = g._appels_sql
+    assert appel["lignes"] == 3
+    assert appel["sql"] == ["SELECT 0", "SELECT 1", "SELECT 2"]
+    stats = instrumentation.statistiques()["methodes"]["parcourir_test"]
+    assert stats["appels"] == 1
+    assert stats["requetes_sql"] == 3
@@ -0,0 +1,72 @@
+import time
+
+import pytest
+from itsdangerous import TimestampSigner
+
+from package import jetons
+
+
+@pytest.fixture
+def mode_jeton(application, monkeypatch):
+    monkeypatch.setitem(application.config, "MODE_SESSION", "jeton")
+    monkeypatch.setitem(application.config, "SESSION_DUREE", 3600)
+    monkeypatch.setattr(jetons, "_jetons_revoques", {})
+    monkeypatch.setattr(jetons, "_utilisateurs_revoques", {})
+    return application
+
+
+def _jeton_ancien(secret, username, age):
+    """
+    Un jeton émis il y a `age` secondes.
+    """
+    emis_a = int(time.time()) - age
+    original = TimestampSigner.get_timestamp
+    TimestampSigner.get_timestamp = lambda signeur: emis_a
+    try:
+        return jetons.creer_jeton(secret, username)
+    finally:
+        TimestampSigner.get_timestamp = original
+
+
+def test_jeton_renouvele_garde_son_identifiant(mode_jeton, client):
+    ancien = _jeton_ancien(mode_jeton.secret_key, "prof", 3000)
+    client.set_cookie("id_session", ancien)
+    assert client.get("/liste-articles").status_code == 200
+    nouveau = client.get_cookie("id_session").value
+    assert nouveau != ancien
+    _, emis_ancien, identifiant = jetons.lire_jeton(
+        mode_jeton.secret_key, ancien, 3600)
+    _, emis_nouveau, identifiant_nouveau = jetons.lire_jeton(
+        mode_jeton.secret_key, nouveau, 3600)
+    assert emis_nouveau > emis_ancien
+    assert identifiant_nouveau == identifiant
+
+
+def test_deconnexion_apres_renouvellement(mode_jeton, client):
+    ancien = _jeton_ancien(mode_jeton.secret_key, "prof", 3000)
+    client.set_cookie("id_session", ancien)
+    client.get("/liste-articles")
+    assert client.get_cookie("id_session").value != ancien
+    client.get("/logout")
+    assert jetons.lire_jeton(mode_jeton.secret_key, ancien, 3600) is None
+
+    # Le jeton d'avant le renouvellement ne connecte plus
+    client.set_cookie("id_session", ancien)
+    assert client.get("/liste-articles").status_code == 302
+
+
+def test_jeton_revoque_refuse(mode_jeton, bd):
+    from package import base_de_donnees
+    jeton = jetons.creer_jeton(mode_jeton.secret_key, "prof")
+    assert jetons.lire_jeton(mode_jeton.secret_key, jeton, 3600)[0] == "prof"
+    database = base_de_donnees.Database()
+    try:
+        jetons.revoquer_jeton(database, mode_jeton.secret_key, jeton, 3600)
+        # Rechargées depuis la base, comme au démarrage
+        jetons._jetons_revoques.clear()
+        jetons.charger(database)
+    finally:
+        database.deconnecter()
+    assert jetons.lire_jeton(mode_jeton.secret_key, jeton, 3600) is None
+    autre = jetons.creer_jeton(mode_jeton.secret_key, "prof")
+    assert jetons.lire_jeton(mode_jeton.secret_key, autre, 3600) is not None
@@ -0,0 +1,87 @@
+import sqlite3
+
+import pytest
+
+from package import base_de_donnees, maintenance, migrations, taches
+
+
+@pytest.fixture
+def base_fragmentee(tmp_path):
+    """
+    Une base neuve (auto_vacuum incrémental) dont la moitié des pages
+    sont libres.
+    """
+    chemin = str(tmp_path / "fragmentee.db")
+    migrations.migrer(chemin)
+    connexion = sqlite3.connect(chemin)
+    connexion.execute("PRAGMA journal_mode = WAL")
+    connexion.execute("CREATE TABLE remplissage(donnees BLOB)")
+    connexion.executemany("INSERT INTO remplissage VALUES (?)",
+                          [(bytes(4000),) for _ in range(500)])
+    connexion.commit()
+    connexion.execute("DELETE FROM remplissage WHERE rowid % 2 = 0")
+    connexion.commit()
+    connexion.close()
+    return chemin
+
+
+def test_pages_libres_rendues(base_fragmentee):
+    resultat = maintenance.maintenir(base_fragmentee, pages_par_etape=50,
+                                     pause=0)
+    assert resultat["avant"]["auto_vacuum"] == "incremental"
+    assert resultat["avant"]["pages_libres"] > 0
+    assert resultat["apres"]["pages_libres"] == 0
+    assert resultat["pages_rendues"] == resultat["avant"]["pages_libres"]
+    assert resultat["apres"]["taille"] < resultat["avant"]["taille"]
+    # WAL ramené à zéro : aucune lecture en cours
+    assert resultat["apres"]["taille_wal"] == 0
+    assert not resultat["checkpoint"]["bloque"]
+
+
+def test_statistiques_du_planificateur(bd):
+    maintenance.maintenir(bd)
+    connexion = sqlite3.connect(bd)
+    try:
+        assert connexion.execute(
+            "SELECT COUNT(*) FROM sqlite_stat1").fetchone()[0] > 0
+    finally:
+        connexion.close()
+
+
+def test_conversion_en_vacuum_incremental(bd):
+    base_de_donnees.get_pool().fermer()
+    # Une base créée avant l'auto_vacuum incrémental, comme celle du dépôt
+    assert maintenance.convertir_vacuum_incremental(bd)
+    assert not maintenance.convertir_vacuum_incremental(bd)
+    connexion = sqlite3.connect(bd)
+    try:
+        assert maintenance.etat(connexion, bd)["auto_vacuum"] == (
+            "incremental")
+    finally:
+        connexion.close()
+
+
+@pytest.fixture
+def planificateur_arrete(application, monkeypatch):
+    monkeypatch.setattr(taches.planificateur, "start", lambda: None)
+    yield taches.planificateur
+    taches.planificateur.remove_all_jobs()
+
+
+def test_maintenance_planifiee_chaque_jour(application, monkeypatch,
+                                           planificateur_arrete):
+    monkeypatch.setitem(application.config, "MAINTENANCE_HEURE", 3)
+    monkeypatch.setitem(application.config, "MAINTENANCE_MINUTE", 15)
+    taches._planifier(application)
+    tache = planificateur_arrete.get_job("maintenance")
+    assert tache.func is maintenance.maintenir
+    champs = {champ.name: str(champ) for champ in tache.trigger.fields}
+    assert (champs["hour"], champs["minute"]) == ("3", "15")
+
+
+def test_maintenance_desactivee(application, monkeypatch,
+                                planificateur_arrete):
+    monkeypatch.setitem(application.config, "MAINTENANCE_HEURE", None)
+    taches._planifier(application)
+    assert planificateur_arrete.get_job("maintenance") is None
+    assert planificateur_arrete.get_job("purger_sessions") is not None
@@ -0,0 +1,74 @@
+import os
+import shutil
+import sqlite3
+
+import pytest
+
+from package import migrations
+
+# La base du dépôt, jamais migrée : copiée avant chaque usage
+BASE_DU_DEPOT = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    "database.db")
+
+
+def _lire(chemin, requete):
+    connexion = sqlite3.connect(chemin)
+    try:
+        return connexion.execute(requete).fetchall()
+    finally:
+        connexion.close()
+
+
+@pytest.fixture
+def copie_du_depot(tmp_path):
+    return shutil.copy(BASE_DU_DEPOT, tmp_path / "depot.db")
+
+
+def test_migration_appliquee_une_seule_fois(copie_du_depot):
+    articles = _lire(copie_du_depot, "SELECT identifiant FROM articles")
+    appliquees = migrations.migrer(str(copie_du_depot))
+    assert ([version for version, _ in appliquees]
+            == [version for version, _, _ in migrations.MIGRATIONS])
+    assert migrations.migrer(str(copie_du_depot)) == []
+    assert _lire(copie_du_depot, "SELECT identifiant FROM articles") == (
+        articles)
+    index = {nom for nom, in _lire(
+        copie_du_depot, "SELECT name FROM sqlite_master WHERE type='index'")}
+    assert {"idx_articles_date_publication",
+            "idx_articles_auteur"} <= index
+
+
+def test_migration_jusqu_a_une_cible(copie_du_depot):
+    assert [version for version, _ in migrations.migrer(
+        str(copie_du_depot), cible=3)] == [1, 2, 3]
+    assert [version for version, _ in migrations.migrer(
+        str(copie_du_depot))][0] == 4
+
+
+def test_base_neuve(tmp_path):
+    chemin = str(tmp_path / "neuve.db")
+    migrations.migrer(chemin)
+    # Incrémental (voir maintenance.py)
+    assert _lire(chemin, "PRAGMA auto_vacuum") == [(2,)]
+    assert _lire(chemin, "SELECT MAX(version) FROM schema_version") == [
+        (migrations.MIGRATIONS[-1][0],)]
+
+
+def test_etape_en_erreur_annulee(copie_du_depot, monkeypatch):
+    def en_erreur(connexion):
+        connexion.execute("CREATE TABLE temporaire(x)")
+        raise RuntimeError("étape en erreur")
+    derniere = migrations.MIGRATIONS[-1][0]
+    monkeypatch.setattr(migrations, "MIGRATIONS", migrations.MIGRATIONS + [
+        (derniere + 1, "Étape en erreur", en_erreur)])
+    with pytest.raises(RuntimeError):
+        migrations.migrer(str(copie_du_depot))
+    assert _lire(copie_du_depot,
+                 "SELECT MAX(version) FROM schema_version") == [(derniere,)]
+    assert _lire(copie_du_depot, """SELECT name FROM sqlite_master
+     WHERE name = 'temporaire'""") == []
+
+
+def test_lectures_sans_balayage(bd):
+    assert migrations.verifier_plans() == []
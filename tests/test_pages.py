@@ -0,0 +1,57 @@
+from datetime import datetime, timezone
+
+from package import base_de_donnees, cache
+
+
+def _cles_pages():
+    return {cle[:2] for cle in cache.pages._entrees}
+
+
+def _ecrire(methode, *arguments):
+    database = base_de_donnees.Database()
+    try:
+        getattr(database, methode)(*arguments)
+    finally:
+        database.deconnecter()
+
+
+def test_nouvel_article_sur_l_accueil(client):
+    assert "Tout nouveau" not in client.get("/").get_data(as_text=True)
+    assert ("accueil", False) in _cles_pages()
+    _ecrire("ajout_article", "Tout nouveau", "tout-nouveau", "prof",
+            datetime.now(timezone.utc).date().isoformat(), "Contenu.")
+    assert "Tout nouveau" in client.get("/").get_data(as_text=True)
+
+
+def test_seule_la_page_modifiee_est_retiree(client):
+    client.get("/article/article1")
+    client.get("/article/article2")
+    _ecrire("modifier_article", "article2", "Titre modifié", "article2",
+            "Contenu modifié")
+    assert _cles_pages() == {("article", "article1")}
+    assert "Titre modifié" in client.get(
+        "/article/article2").get_data(as_text=True)
+
+
+def test_auteur_modifie_retire_les_pages_d_article(client):
+    client.get("/")
+    client.get("/article/article1")
+    _ecrire("changer_etat_utilisateur", "prof", 0)
+    assert _cles_pages() == {("accueil", False)}
+
+
+def test_page_rendue_pendant_une_ecriture_non_gardee(application):
+    version = cache.version_articles()
+    cache.article_modifie("article1")
+    cache.definir_page(("article", "article1", False), "ancienne", version)
+    assert cache.pages.get(("article", "article1", False)) is None
+
+
+def test_pages_distinctes_selon_la_connexion(client):
+    anonyme = client.get("/").get_data(as_text=True)
+    client.post("/admin", data={"username": "prof",
+                                "password": "secret1234"})
+    connecte = client.get("/").get_data(as_text=True)
+    assert connecte != anonyme
+    assert {("accueil", False), ("accueil", True)} <= {
+        cle for cle in cache.pages._entrees}
@@ -0,0 +1,42 @@
+import re
+
+
+def _url_miniature(client):
+    page = client.get("/utilisateurs").get_data(as_text=True)
+    urls = re.findall(r'src="(/photo/prof/miniature[^"]*)"', page)
+    assert urls
+    return urls[0].replace("&amp;", "&")
+
+
+def test_url_versionnee_immuable(client_connecte):
+    url = _url_miniature(client_connecte)
+    assert "v=" in url
+    reponse = client_connecte.get(url)
+    assert reponse.status_code == 200
+    assert reponse.cache_control.immutable
+    assert reponse.cache_control.max_age == 31536000
+    assert reponse.headers["ETag"]
+
+
+def test_url_sans_version_revalidee(client):
+    reponse = client.get("/photo/prof")
+    assert reponse.status_code == 200
+    assert reponse.cache_control.no_cache
+    assert not reponse.cache_control.immutable
+
+    ancienne = client.get("/photo/prof?v=ancien-hash")
+    assert ancienne.cache_control.no_cache
+
+
+def test_304_si_etag_connu(client):
+    etag = client.get("/photo/prof").headers["ETag"]
+    reponse = client.get("/photo/prof", headers={"If-None-Match": etag})
+    assert reponse.status_code == 304
+    assert reponse.get_data() == b""
+
+    autre = client.get("/photo/prof", headers={"If-None-Match": '"autre"'})
+    assert autre.status_code == 200
+
+
+def test_photo_inconnue(client):
+    assert client.get("/photo/personne").status_code == 404
@@ -0,0 +1,63 @@
+import sqlite3
+import threading
+
+import pytest
+
+from package import base_de_donnees
+
+
+@pytest.fixture
+def pool(bd):
+    return base_de_donnees.configurer_pool(chemin=bd, taille=2,
+                                           delai_attente=0.1)
+
+
+def test_connexion_reutilisee(pool):
+    for _ in range(5):
+        database = base_de_donnees.Database()
+        try:
+            assert database.get_article("article1") is not None
+        finally:
+            database.deconnecter()
+    statistiques = pool.statistiques()
+    assert statistiques["creees"] == 1
+    assert statistiques["acquises"] == 5
+    assert statistiques["libres"] == 1
+
+
+def test_fil_reprend_sa_connexion(pool):
+    premiere = pool.acquerir()
+    seconde = pool.acquerir()
+    pool.liberer(seconde)
+    pool.liberer(premiere)
+    # La dernière connexion acquise par ce fil, pas la dernière rendue
+    connexion = pool.acquerir()
+    assert connexion is seconde
+    pool.liberer(connexion)
+
+
+def test_attente_puis_erreur_si_pool_plein(pool):
+    prises = [pool.acquerir(), pool.acquerir()]
+    with pytest.raises(sqlite3.OperationalError):
+        pool.acquerir()
+    assert pool.statistiques()["attentes"] == 1
+
+    # Une connexion rendue par un autre fil débloque l'attente
+    threading.Timer(0.02, pool.liberer, (prises.pop(),)).start()
+    pool.delai_attente = 5
+    prises.append(pool.acquerir())
+    assert pool.statistiques()["ouvertes"] == 2
+    for connexion in prises:
+        pool.liberer(connexion)
+
+
+def test_transaction_ouverte_annulee(pool):
+    connexion = pool.acquerir()
+    connexion.execute("DELETE FROM articles WHERE identifiant = 'article1'")
+    assert connexion.in_transaction
+    pool.liberer(connexion)
+    database = base_de_donnees.Database()
+    try:
+        assert database.get_article("article1") is not None
+    finally:
+        database.deconnecter()
@@ -0,0 +1,118 @@
+import pytest
+
+
+@pytest.fixture
+def recherches_occupees(application):
+    """
+    Toutes les places de recherche prises, comme par des recherches
+    en cours.
+    """
+    # Après la fixture application, qui choisit la base
+    from package import app as module_app
+    prises = 0
+    while module_app._recherches.acquire(blocking=False):
+        prises += 1
+    yield
+    for _ in range(prises):
+        module_app._recherches.release()
+
+
+def test_page_en_cache_servie_sans_place(client, request):
+    assert client.get("/recherche?q=article").status_code == 200
+    request.getfixturevalue("recherches_occupees")
+    assert client.get("/recherche?q=article").status_code == 200
+    reponse = client.get("/recherche?q=autre")
+    assert reponse.status_code == 503
+    assert reponse.headers["Retry-After"]
+
+
+def test_resultats_sans_contenu(bd):
+    from package import base_de_donnees
+    database = base_de_donnees.Database()
+    try:
+        page = database.rechercher_article("article")
+    finally:
+        database.deconnecter()
+    assert page["articles"]
+    for article in page["articles"]:
+        assert "contenu" not in article
+        assert article["surlignage"]
+
+
+def test_delai_depasse_distinct_de_la_limite(client, monkeypatch):
+    from package import base_de_donnees
+
+    def trop_longue(self, *args, **kwargs):
+        raise base_de_donnees.DelaiDepasse("interrupted")
+    monkeypatch.setattr(base_de_donnees.Database, "rechercher_article",
+                        trop_longue)
+    reponse = client.get("/recherche?q=article")
+    assert reponse.status_code == 503
+    assert reponse.headers["Retry-After"]
+    assert "trop de temps" in reponse.get_data(as_text=True)
+    assert "Trop de recherches" not in reponse.get_data(as_text=True)
+
+
+def _rechercher(recherche, **pagination):
+    from package import base_de_donnees
+    database = base_de_donnees.Database()
+    try:
+        return database.rechercher_article(recherche, **pagination)
+    finally:
+        database.deconnecter()
+
+
+@pytest.fixture
+def xylophones(bd):
+    from package import base_de_donnees
+    database = base_de_donnees.Database()
+    try:
+        database.ajout_article("Le xylophone", "titre-x", "prof",
+                               "2020-01-01", "Un instrument.")
+        database.ajout_article("Autre sujet", "contenu-x", "prof",
+                               "2024-01-01",
+                               "Il est question de xylophone ici.")
+        database.ajout_article("Sans rapport", "rien-x", "prof",
+                               "2024-06-01", "Rien à voir.")
+    finally:
+        database.deconnecter()
+
+
+def test_titre_classe_avant_contenu(xylophones):
+    from package import base_de_donnees
+    page = _rechercher("XYLOPHONE")
+    assert [a["identifiant"] for a in page["articles"]] == ["titre-x",
+                                                            "contenu-x"]
+    assert (base_de_donnees.DEBUT_SURLIGNAGE + "xylophone"
+            in page["articles"][1]["surlignage"])
+
+
+def test_prefixe_et_syntaxe_neutralisee(xylophones):
+    assert len(_rechercher("xylo")["articles"]) == 2
+    # Opérateurs et guillemets FTS5 cherchés comme des mots
+    assert _rechercher('xylophone OR "rien')["articles"] == []
+    assert _rechercher("xylophone NEAR(")["articles"] == []
+    assert len(_rechercher('"xylophone"* :-')["articles"]) == 2
+
+
+def test_pages_successives(xylophones):
+    premiere = _rechercher("xylophone", limite=1)
+    assert premiere["suivant"] and premiere["precedent"] is None
+    seconde = _rechercher("xylophone", limite=1, apres=premiere["suivant"])
+    assert seconde["suivant"] is None
+    assert ([a["identifiant"] for a in premiere["articles"]
+             + seconde["articles"]] == ["titre-x", "contenu-x"])
+    retour = _rechercher("xylophone", limite=1, avant=seconde["precedent"])
+    assert retour["articles"] == premiere["articles"]
+
+
+def test_index_suit_les_modifications(xylophones):
+    from package import base_de_donnees
+    database = base_de_donnees.Database()
+    try:
+        database.modifier_article("rien-x", "Un marimba", "rien-x",
+                                  "Rien à voir.")
+    finally:
+        database.deconnecter()
+    assert [a["identifiant"] for a in _rechercher("marimba")["articles"]
+            ] == ["rien-x"]
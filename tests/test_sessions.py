@@ -0,0 +1,102 @@
+import pytest
+
+from package import base_de_donnees, cache, migrations
+
+
+class Horloge:
+    def __init__(self, maintenant):
+        self.maintenant = maintenant
+
+    def __call__(self):
+        return self.maintenant
+
+
+@pytest.fixture
+def horloge(monkeypatch):
+    horloge = Horloge(1000000.0)
+    monkeypatch.setattr(cache.time, "time", horloge)
+    return horloge
+
+
+def test_entree_expiree_apres_ttl(horloge):
+    sessions = cache.CacheLRU(taille_max=10, ttl=60)
+    sessions.definir("a", "prof")
+    horloge.maintenant += 59
+    assert sessions.get("a") == "prof"
+    horloge.maintenant += 1
+    assert sessions.get("a") is None
+    assert sessions.statistiques()["expirations"] == 1
+
+
+def test_plus_ancienne_entree_evincee():
+    sessions = cache.CacheLRU(taille_max=2)
+    sessions.definir("a", 1)
+    sessions.definir("b", 2)
+    sessions.get("a")
+    sessions.definir("c", 3)
+    assert sessions.get("b") is None
+    assert (sessions.get("a"), sessions.get("c")) == (1, 3)
+
+
+@pytest.fixture
+def session_prof(bd):
+    database = base_de_donnees.Database()
+    try:
+        database.save_session("session-prof", "prof")
+    finally:
+        database.deconnecter()
+    return "session-prof"
+
+
+def _get_session(id_session):
+    database = base_de_donnees.Database()
+    try:
+        return database.get_session(id_session)
+    finally:
+        database.deconnecter()
+
+
+def test_session_lue_une_fois(session_prof, bd):
+    assert _get_session(session_prof) == "prof"
+    requetes = []
+
+    def tracer(requete):
+        if not migrations.REQUETE_INTERNE.search(requete):
+            requetes.append(requete)
+    base_de_donnees.ajouter_traceur(tracer)
+    base_de_donnees.configurer_pool(chemin=bd, taille=2)
+    try:
+        assert _get_session(session_prof) == "prof"
+    finally:
+        base_de_donnees.retirer_traceur(tracer)
+    assert requetes == []
+
+
+def test_session_en_cache_bornee_par_le_ttl(session_prof, monkeypatch):
+    monkeypatch.setattr(cache.sessions, "ttl", 60)
+    _get_session(session_prof)
+    # Relue en base au plus tard après le TTL, même si elle dure plus
+    monkeypatch.setattr(cache.time, "time",
+                        Horloge(cache.time.time() + 61))
+    assert cache.sessions.get(session_prof) is None
+
+
+def test_compte_desactive_invalide_ses_sessions(session_prof):
+    assert _get_session(session_prof) == "prof"
+    database = base_de_donnees.Database()
+    try:
+        database.changer_etat_utilisateur("prof", 0)
+    finally:
+        database.deconnecter()
+    assert cache.sessions.get(session_prof) is None
+    assert _get_session(session_prof) is None
+
+
+def test_deconnexion_retire_la_session(client_connecte):
+    id_session = client_connecte.get_cookie("id_session").value
+    assert client_connecte.get("/liste-articles").status_code == 200
+    assert cache.sessions.get(id_session) == "prof"
+    client_connecte.get("/logout")
+    assert cache.sessions.get(id_session) is None
+    client_connecte.set_cookie("id_session", id_session)
+    assert client_connecte.get("/liste-articles").status_code == 302
@@ -0,0 +1,32 @@
+import os
+
+from package import taches
+
+
+def test_verrou_exclusif(tmp_path):
+    chemin = str(tmp_path / "verrou")
+    premier = taches.prendre_verrou(chemin)
+    assert premier is not None
+    assert taches.prendre_verrou(chemin) is None
+    os.close(premier)
+    second = taches.prendre_verrou(chemin)
+    assert second is not None
+    os.close(second)
+
+
+def test_demarrer_apres_liberation_du_verrou(application, tmp_path,
+                                             monkeypatch):
+    monkeypatch.setattr(taches, "ATTENTE_VERROU", 0.01)
+    chemin = str(tmp_path / "verrou")
+    autre_processus = taches.prendre_verrou(chemin)
+    try:
+        assert not taches.demarrer(application, chemin)
+        assert not taches.planificateur.running
+        os.close(autre_processus)
+        taches._etat["attente"].join(5)
+        assert taches.planificateur.running
+        assert taches.prendre_verrou(chemin) is None
+    finally:
+        taches.arreter()
+        taches.planificateur.remove_all_jobs()
+        taches._etat["attente"] = None
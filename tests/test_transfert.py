@@ -0,0 +1,88 @@
+import base64
+import io
+import json
+
+import pytest
+from PIL import Image
+
+from package import base_de_donnees, images, transfert
+
+
+def _jpeg(couleur):
+    sortie = io.BytesIO()
+    Image.new("RGB", (300, 200), couleur).save(sortie, "JPEG")
+    return base64.b64encode(sortie.getvalue()).decode("ascii")
+
+
+def _utilisateur(username, **champs):
+    return dict({"username": username, "password": "secret1234",
+                 "nom": "nom", "prenom": "prenom"}, **champs)
+
+
+def _importer(lignes, strict=False):
+    database = base_de_donnees.Database()
+    try:
+        return database.importer_utilisateurs(
+            transfert.valider(enumerate(lignes, start=1),
+                              transfert.valider_utilisateur),
+            taille_lot=10, strict=strict)
+    finally:
+        database.deconnecter()
+
+
+def _photos(bd):
+    database = base_de_donnees.Database()
+    try:
+        return {ligne[0] for ligne in database.get_connexion().execute(
+            "SELECT hash FROM photos")}
+    finally:
+        database.deconnecter()
+
+
+@pytest.mark.parametrize("password", [1234, ["secret"], {"a": 1}])
+def test_mot_de_passe_non_texte(password):
+    with pytest.raises(transfert.LigneInvalide):
+        transfert.valider_utilisateur(_utilisateur("x", password=password))
+
+
+def test_photo_d_une_ligne_refusee_non_gardee(bd):
+    avant = _photos(bd)
+    photo = images.preparer(base64.b64decode(_jpeg((0, 0, 255))))[0]
+    nombre, erreurs = _importer([
+        _utilisateur("nouveau", photo_profil=_jpeg((255, 0, 0))),
+        _utilisateur("nouveau", photo_profil=_jpeg((0, 0, 255)))])
+    assert nombre == 1
+    assert [numero for numero, _ in erreurs] == [2]
+    apres = _photos(bd)
+    assert len(apres - avant) == 2
+    assert photo["hash"] not in apres
+
+
+def test_aller_retour_utilisateurs(application, bd, tmp_path):
+    runner = application.test_cli_runner()
+    export = tmp_path / "utilisateurs.jsonl"
+    resultat = runner.invoke(args=["exporter-utilisateurs", str(export),
+                                   "--avec-photos"])
+    assert resultat.exit_code == 0, resultat.output
+    lignes = [json.loads(texte) for texte in export.read_text().splitlines()]
+    assert lignes
+
+    copie = tmp_path / "copie.jsonl"
+    copie.write_text("".join(
+        json.dumps(dict(ligne, username="copie_" + ligne["username"])) + "\n"
+        for ligne in lignes))
+    resultat = runner.invoke(args=["importer-utilisateurs", str(copie),
+                                   "--strict"])
+    assert resultat.exit_code == 0, resultat.output
+
+    reexport = tmp_path / "reexport.jsonl"
+    runner.invoke(args=["exporter-utilisateurs", str(reexport),
+                        "--avec-photos"])
+    relues = {ligne["username"]: ligne for ligne in map(
+        json.loads, reexport.read_text().splitlines())}
+    for ligne in lignes:
+        # Noms et prénoms importés avec une majuscule à chaque mot
+        attendue = dict(ligne, username="copie_" + ligne["username"],
+                        nom=ligne["nom"].title(),
+                        prenom=ligne["prenom"].title())
+        assert relues[attendue["username"]] == attendue
@@ -0,0 +1,181 @@
+import base64
+import csv
+import hashlib
+import json
+import re
+import uuid
+from datetime import date
+
+from . import images
+
+# Même règle que la contrainte CHECK de articles.identifiant
+_CARACTERES_IDENTIFIANT = re.compile(r"[A-Za-z0-9_ éèàçôù-]+")
+
+CHAMPS_ARTICLE = ["titre", "identifiant", "auteur", "date_publication",
+                  "contenu"]
+CHAMPS_UTILISATEUR = ["username", "password_hash", "salt", "nom", "prenom",
+                      "etat", "photo_profil"]
+
+
+class LigneInvalide(ValueError):
+    pass
+
+
+def format_fichier(nom, format_demande=None):
+    """
+    Cette fonction retourne le format d'un fichier (jsonl ou csv),
+    d'après `format_demande` ou à défaut l'extension du fichier.
+    """
+    if format_demande:
+        return format_demande
+    return "csv" if nom.lower().endswith(".csv") else "jsonl"
+
+
+def lire_lignes(fichier, format_fichier):
+    """
+    Cette fonction lit un fichier JSONL ou CSV ligne par ligne.
+
+    Yields:
+        tuple: (numéro de ligne, dictionnaire ou LigneInvalide)
+    """
+    if format_fichier == "csv":
+        # La ligne 1 est l'en-tête
+        for numero, ligne in enumerate(csv.DictReader(fichier), start=2):
+            yield numero, ligne
+        return
+    for numero, texte in enumerate(fichier, start=1):
+        if not texte.strip():
+            continue
+        try:
+            ligne = json.loads(texte)
+        except ValueError as e:
+            yield numero, LigneInvalide(f"JSON invalide : {e}")
+            continue
+        if not isinstance(ligne, dict):
+            yield numero, LigneInvalide("un objet JSON est attendu")
+            continue
+        yield numero, ligne
+
+
+def _champ(ligne, nom):
+    valeur = ligne.get(nom)
+    if valeur is None or not str(valeur).strip():
+        raise LigneInvalide(f"le champ « {nom} » est obligatoire")
+    return str(valeur)
+
+
+def valider_identifiant(identifiant):
+    """
+    Cette fonction vérifie un identifiant d'article selon la contrainte
+    CHECK de la table articles.
+
+    Raises:
+        LigneInvalide: L'identifiant serait refusé par la base.
+    """
+    if not _CARACTERES_IDENTIFIANT.fullmatch(identifiant):
+        raise LigneInvalide(
+            f"identifiant « {identifiant} » : seuls les lettres non "
+            "accentuées, chiffres, espaces, _, - et éèàçôù sont permis")
+    if len(identifiant.strip()) < 2:
+        raise LigneInvalide(
+            f"identifiant « {identifiant} » : au moins 2 caractères")
+
+
+def valider_article(ligne):
+    """
+    Returns:
+        tuple: (titre, identifiant, auteur, date_publication, contenu)
+    """
+    titre, identifiant, auteur, date_publication, contenu = (
+        _champ(ligne, nom) for nom in CHAMPS_ARTICLE)
+    valider_identifiant(identifiant)
+    try:
+        date.fromisoformat(date_publication)
+    except ValueError:
+        raise LigneInvalide(
+            f"date_publication « {date_publication} » : format AAAA-MM-JJ")
+    return titre, identifiant, auteur, date_publication, contenu
+
+
+def valider_utilisateur(ligne, photo_defaut=None):
+    """
+    Le mot de passe est donné en clair (« password ») ou déjà haché
+    (« password_hash » et « salt »). La photo est facultative
+    (« photo_profil » en base64) : `photo_defaut` la remplace. Elle est
+    préparée par images.preparer.
+
+    Returns:
+        tuple: (username, password_hash, salt, nom, prenom,
+        photo_profil, etat)
+    """
+    username = _champ(ligne, "username")
+    nom = _champ(ligne, "nom").title()
+    prenom = _champ(ligne, "prenom").title()
+    password = ligne.get("password")
+    if password:
+        if not isinstance(password, str):
+            raise LigneInvalide("password : texte attendu")
+        salt = uuid.uuid4().hex
+        password_hash = hashlib.sha512(
+            str(password + salt).encode("utf-8")
+        ).hexdigest()
+    else:
+        password_hash = _champ(ligne, "password_hash")
+        salt = _champ(ligne, "salt")
+
+    photo_profil = photo_defaut
+    if ligne.get("photo_profil"):
+        try:
+            photo_profil = base64.b64decode(ligne["photo_profil"],
+                                            validate=True)
+        except ValueError:
+            raise LigneInvalide("photo_profil : base64 invalide")
+        try:
+            photo_profil = images.preparer(photo_profil)
+        except images.ImageInvalide as e:
+            raise LigneInvalide(f"photo_profil : {e}")
+
+    etat = ligne.get("etat")
+    etat = "1" if etat is None or etat == "" else str(etat)
+    if etat not in ("0", "1"):
+        raise LigneInvalide("etat : 0 ou 1 attendu")
+    etat = int(etat)
+    return username, password_hash, salt, nom, prenom, photo_profil, etat
+
+
+def valider(lignes, validation):
+    """
+    Cette fonction applique `validation` à chaque ligne lue.
+
+    Yields:
+        tuple: (numéro, valeurs validées ou None, message d'erreur ou None)
+    """
+    for numero, ligne in lignes:
+        if isinstance(ligne, LigneInvalide):
+            yield numero, None, str(ligne)
+            continue
+        try:
+            yield numero, validation(ligne), None
+        except LigneInvalide as e:
+            yield numero, None, str(e)
+
+
+def ecrire_lignes(fichier, format_fichier, champs, lignes):
+    """
+    Cette fonction écrit les lignes au fur et à mesure qu'elles sont lues.
+
+    Returns:
+        int: Le nombre de lignes écrites.
+    """
+    nombre = 0
+    if format_fichier == "csv":
+        ecrivain = csv.DictWriter(fichier, fieldnames=champs)
+        ecrivain.writeheader()
+        for ligne in lignes:
+            ecrivain.writerow(ligne)
+            nombre += 1
+        return nombre
+    for ligne in lignes:
+        fichier.write(json.dumps(ligne, ensure_ascii=False) + "\n")
+        nombre += 1
+    return nombre